@@ -4,3 +4,19 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        from core import checks, signals  # noqa: F401
+        from core.db import configure_sqlite
+        from core.instrumentation import install_query_recorder
+
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(install_query_recorder)
+        # Connections opened before the app was ready
+        for connection in connections.all(initialized_only=True):
+            if connection.connection is not None:
+                configure_sqlite(sender=connection.__class__, connection=connection)
+            install_query_recorder(sender=connection.__class__, connection=connection)
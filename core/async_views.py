@@ -0,0 +1,166 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+def has_credentials(request):
+    """Whether the request carries credentials (token or session), authenticating them may need a query"""
+    return 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES
+
+
+def is_asgi_request(request):
+    """
+    Whether the request is served by the ASGI handler, where a streaming response needs an async iterator: Django
+    reads a sync one whole before sending it. The META of a WSGI request is its environ, with `wsgi.input`.
+    """
+    return 'wsgi.input' not in request.META
+
+
+class AsyncReadMixin:
+    """
+    Async counterparts of the list and retrieve actions of a model viewset, named `alist` and `aretrieve`.
+
+    The rows are fetched with the async ORM and serialized from the loaded instances, so the serializer
+    must not trigger queries of its own (use `select_related` in `get_queryset`). The actions are served
+    by the views built with `async_read_view`.
+    """
+
+    async def aget_object(self):
+        """
+        Same as `GenericAPIView.get_object`, with the async ORM
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        """
+        :return: List with the rows of the page, or None when pagination is disabled
+        """
+        if self.paginator is None:
+            return None
+        if hasattr(self.paginator, 'apaginate_queryset'):
+            return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+        return await sync_to_async(self.paginator.paginate_queryset)(queryset, self.request, view=self)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer([instance async for instance in queryset.aiterator()], many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+
+def async_read_view(viewset_class, actions, **initkwargs):
+    """
+    Build an async view for a viewset, the GET actions are served by their async counterparts (`alist`,
+    `aretrieve`, see `AsyncReadMixin`) without leaving the event loop, the other methods and the non JSON
+    renderers (e.g. the browsable API) by the regular sync view in a thread.
+
+    Requests without credentials are not authenticated, so anonymous reads do not touch the database before
+    the action; requests with credentials are authenticated in a thread.
+    :param viewset_class: Viewset class with `AsyncReadMixin`
+    :param actions: Dict with the action of each method, as in `ViewSetMixin.as_view`
+    :return: Async view function
+    """
+    sync_view = sync_to_async(viewset_class.as_view(dict(actions), **initkwargs))
+
+    async def view(request, *args, **kwargs):
+        action = actions.get('get') if request.method in ('GET', 'HEAD') else None
+        if action is None:
+            return await sync_view(request, *args, **kwargs)
+
+        self = viewset_class(**initkwargs)
+        self.action_map = {'get': action, 'head': action}
+        self.args = args
+        self.kwargs = kwargs
+        self.headers = self.default_response_headers
+        if not has_credentials(request):
+            self.authentication_classes = ()
+        drf_request = self.initialize_request(request, *args, **kwargs)
+        self.request = drf_request
+
+        try:
+            self.format_kwarg = self.get_format_suffix(**kwargs)
+            renderer, media_type = self.perform_content_negotiation(drf_request)
+            if not isinstance(renderer, JSONRenderer):
+                return await sync_view(request, *args, **kwargs)
+            drf_request.accepted_renderer, drf_request.accepted_media_type = renderer, media_type
+            drf_request.version, drf_request.versioning_scheme = self.determine_version(drf_request, *args, **kwargs)
+
+            if self.authentication_classes:
+                await sync_to_async(self.perform_authentication)(drf_request)
+            self.check_permissions(drf_request)
+            self.check_throttles(drf_request)
+            response = await getattr(self, 'a' + action)(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return render_response(self, drf_request, response, *args, **kwargs)
+
+    view.cls = viewset_class
+    view.initkwargs = initkwargs
+    view.actions = actions
+    return csrf_exempt(view)
+
+
+def async_create_view(view_class, **initkwargs):
+    """
+    Build an async view for a create view with an `acreate` action (e.g. `core.views.ChefCreateView`), the
+    POST requests are served by `acreate` in the event loop, the other methods by the regular sync view in a
+    thread. Authentication, permissions and throttles may query the database, they are checked in a thread.
+    :param view_class: `APIView` class with an `acreate` method
+    :return: Async view function
+    """
+    sync_view = sync_to_async(view_class.as_view(**initkwargs))
+
+    async def view(request, *args, **kwargs):
+        if request.method != 'POST':
+            return await sync_view(request, *args, **kwargs)
+
+        self = view_class(**initkwargs)
+        self.args = args
+        self.kwargs = kwargs
+        self.headers = self.default_response_headers
+        drf_request = self.initialize_request(request, *args, **kwargs)
+        self.request = drf_request
+
+        try:
+            await sync_to_async(self.initial)(drf_request, *args, **kwargs)
+            response = await self.acreate(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return render_response(self, drf_request, response, *args, **kwargs)
+
+    view.cls = view_class
+    view.initkwargs = initkwargs
+    return csrf_exempt(view)
+
+
+def render_response(view, request, response, *args, **kwargs):
+    """
+    Finalize and render the response of an async action
+    :param view: Instance of the view
+    :param request: DRF request
+    """
+    response = view.finalize_response(request, response, *args, **kwargs)
+    if not isinstance(response, Response):
+        return response
+    # Rendered here, Django would render a deferred response in a thread
+    content = response.rendered_content
+    return HttpResponse(content, status=response.status_code, headers=response.headers)
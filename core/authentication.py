@@ -0,0 +1,127 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    Bounded LRU of token key -> (user, token) with a time to live, shared by the threads of the process.
+
+    The size and the time to live are read from the `AUTH_TOKEN_CACHE_SIZE` and `AUTH_TOKEN_CACHE_TTL`
+    settings. Entries are removed by the `Token`/`User` signals (see `core.signals`); the time to live bounds
+    how long other processes may keep serving a stale entry. `QuerySet.update()` and `QuerySet.delete()` of the
+    tokens without loading them send no signal, e.g. `User.objects.filter(...).update(is_active=False)`: call
+    `delete_user` for each user (or `clear`) after them, else their tokens stay valid until the time to live.
+
+    Each removal moves the generation of the cache: a lookup started before it (see `generation`) is not stored,
+    it may have read the user before the change.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        """
+        :return: Number of removals so far, to be passed to `set` by a lookup started now
+        """
+        return self._generation
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 300)
+
+    def get(self, key):
+        """
+        :return: Tuple with the user and the token, or None when the key is not cached or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, token, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return user, token
+
+    def set(self, key, user, token, generation=None):
+        """
+        :param generation: `generation` read before the lookup of the user, the entry is not stored when an entry
+                           was removed since
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._remove(key)
+            self._entries[key] = (user, token, time.monotonic() + self.ttl)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._generation += 1
+            self._remove(key)
+
+    def delete_user(self, user_id):
+        """Remove every token of the user"""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_keys = self._keys_by_user.get(entry[0].pk)
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[entry[0].pk]
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that keeps the token -> user lookup in an in-process cache, so authenticated
+    requests do not query `authtoken_token` every time.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            user, token = cached
+            # Each request gets its own copy, so changes made to `request.user` are not shared
+            return copy.copy(user), token
+
+        generation = token_cache.generation
+        user, token = super(CachedTokenAuthentication, self).authenticate_credentials(key)
+        token_cache.set(key, user, token, generation)
+        return copy.copy(user), token
@@ -0,0 +1,92 @@
+"""
+Write-behind batching (group commit) of the writes of concurrent requests, e.g. many recipes created at the same
+time are inserted with one `bulk_create` and one commit instead of one transaction each
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+
+class WriteBatcher:
+    """
+    Coalesce the items submitted by concurrent threads into batches written by a single call of `flush`.
+
+    There is no background thread: the first thread submitting an item to an empty batch is the leader of the
+    batch. The leader waits until the batch has `max_size` items or `max_wait` seconds passed, and until the
+    previous batch is written, then writes the batch in its own thread (and with its own database connection)
+    while the other threads of the batch wait for their result. The items submitted meanwhile form the next batch.
+
+    When the whole batch fails, its items are written one at a time, so each thread gets its own result or
+    exception. `flush` must be atomic, e.g. wrapped in `transaction.atomic`, for that retry to be safe.
+
+    :param flush: Function receiving the list of items of a batch and returning the list of their results,
+                  in the same order
+    :param max_size: Maximum number of items of a batch
+    :param max_wait: Maximum time in seconds the leader waits for other items, added to the latency of the writes
+    """
+
+    def __init__(self, flush, max_size=100, max_wait=0.005):
+        self.flush = flush
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.condition = threading.Condition()
+        # Open batch, list of (item, future), None when the next item starts a new batch
+        self.batch = None
+        # Held while a batch is written, batches are written one after the other
+        self.flush_lock = threading.Lock()
+
+    def submit(self, item):
+        """
+        Add an item to the open batch and wait until it is written
+        :return: Result of the item returned by `flush`
+        """
+        future = Future()
+        with self.condition:
+            leader = self.batch is None
+            if leader:
+                self.batch = []
+            batch = self.batch
+            batch.append((item, future))
+            if len(batch) >= self.max_size:
+                self.batch = None
+                self.condition.notify_all()
+        if leader:
+            self.lead(batch)
+        return future.result()
+
+    def lead(self, batch):
+        """
+        Wait for the batch to be full, or for the end of the time window, and write it
+        """
+        deadline = time.monotonic() + self.max_wait
+        with self.condition:
+            while self.batch is batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+        with self.flush_lock:
+            with self.condition:
+                # Items kept coming while the previous batch was written
+                if self.batch is batch:
+                    self.batch = None
+            self.write(batch)
+
+    def write(self, batch):
+        items = [item for item, future in batch]
+        try:
+            results = self.flush(items)
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            # Each item on its own, so only the failing ones get the error
+            for entry in batch:
+                self.write([entry])
+            return
+        except BaseException as exc:
+            for item, future in batch:
+                future.set_exception(exc)
+            raise
+        for (item, future), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,222 @@
+import gc
+import json
+import platform
+import subprocess
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import autodiscover_modules
+
+from core.utils import percentile
+
+# Registered scenarios by name, see `register`
+SCENARIOS = {}
+
+
+class BenchmarkError(Exception):
+    """A request of a scenario failed"""
+
+
+class Scenario:
+    """
+    Operation measured by the benchmarks, e.g. a request to an endpoint
+    :param name: Name of the scenario, e.g. `recipe.list`
+    :param description: Text shown in the report
+    :param setup: Function receiving the `BenchmarkContext` and returning the operation, a function receiving
+                  the number of the iteration. The setup is not measured.
+    :param operations: Number of operations (e.g. requests) done by each call of the operation, for the
+                       throughput
+    """
+
+    def __init__(self, name, description, setup, operations=1):
+        self.name = name
+        self.description = description
+        self.setup = setup
+        self.operations = operations
+
+
+class BenchmarkContext:
+    """
+    State shared by the scenarios of a run
+    :param client: Client of the API, e.g. `APIClient`
+    :param options: Dict with the options of the run
+    """
+
+    def __init__(self, client, **options):
+        self.client = client
+        self.options = options
+        self.run_id = time.time_ns()
+
+
+def register(name, description='', operations=1):
+    """
+    Decorator registering the setup function of a scenario, in the `benchmarks` module of an app
+    """
+    def decorator(setup):
+        SCENARIOS[name] = Scenario(name, description or (setup.__doc__ or '').strip(), setup, operations)
+        return setup
+    return decorator
+
+
+def autodiscover():
+    """Import the `benchmarks` module of every installed app"""
+    autodiscover_modules('benchmarks')
+    return SCENARIOS
+
+
+class QueryCounter:
+    """`connection.execute_wrapper` counting the queries sent to the database"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all(initialized_only=True):
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+def check_response(scenario, response):
+    status_code = getattr(response, 'status_code', None)
+    if status_code is not None and status_code >= 400:
+        content = getattr(response, 'content', b'')[:500]
+        raise BenchmarkError('%s failed with status %d: %r' % (scenario.name, status_code, content))
+
+
+def run_concurrently(calls):
+    """
+    Call the functions at the same time, each in its own thread as with a threaded server, e.g. to measure
+    requests competing for the database. Each thread opens its own database connections and closes them.
+    :param calls: List of functions without arguments
+    :return: List with their results, in the same order
+    """
+    results = [None] * len(calls)
+    errors = []
+
+    def run(index, call):
+        try:
+            results[index] = call()
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=run, args=(index, call)) for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise BenchmarkError('%d of the %d concurrent calls failed: %r' % (len(errors), len(calls), errors[0]))
+    return results
+
+
+def first_failure(responses):
+    """
+    :return: The first response with an error status, else the last response
+    """
+    return next((response for response in responses if response.status_code >= 400), responses[-1])
+
+
+def run_scenario(scenario, context, iterations=100, warmup=10, memory_iterations=10):
+    """
+    Measure a scenario: latency and queries over `iterations`, then the peak of memory allocated by a
+    single operation in a separate pass, since tracing the allocations slows the operations down
+    :return: Dict with the results
+    """
+    operation = scenario.setup(context)
+    iteration = 0
+    for iteration in range(warmup):
+        check_response(scenario, operation(iteration))
+
+    timings = []
+    with QueryCounter() as counter:
+        for iteration in range(warmup, warmup + iterations):
+            start = time.perf_counter()
+            response = operation(iteration)
+            timings.append(time.perf_counter() - start)
+            check_response(scenario, response)
+
+    peak_memory = 0
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for iteration in range(warmup + iterations, warmup + iterations + memory_iterations):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            operation(iteration)
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'description': scenario.description,
+        'iterations': iterations,
+        'mean_ms': sum(timings) / len(timings) * 1000 if timings else None,
+        'p50_ms': percentile(timings, 50) * 1000 if timings else None,
+        'p99_ms': percentile(timings, 99) * 1000 if timings else None,
+        # Operations per second of a single client, one operation after the other
+        'per_second': scenario.operations * len(timings) / sum(timings) if timings and sum(timings) else None,
+        'queries_per_request': counter.count / iterations if iterations else None,
+        'peak_memory_kb': peak_memory / 1024,
+    }
+
+
+def get_metadata(**extra):
+    """
+    :return: Dict describing the environment of the run, to compare results across commits
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    connection = connections['default']
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'database_profile': getattr(settings, 'DATABASE_PROFILE', None),
+        **extra,
+    }
+
+
+def write_results(path, results, metadata):
+    with open(path, 'w') as file:
+        json.dump({'metadata': metadata, 'results': results}, file, indent=2, sort_keys=True)
+
+
+def read_results(path):
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def compare_results(results, baseline, metric='p50_ms'):
+    """
+    :param results: Dict with the results of each scenario
+    :param baseline: Dict with the results of a previous run
+    :return: Dict with the relative change of the metric for the scenarios present in both, e.g. 0.1 for 10% slower
+    """
+    changes = {}
+    for name, result in results.items():
+        previous = baseline.get(name, {}).get(metric)
+        if previous and result.get(metric) is not None:
+            changes[name] = result[metric] / previous - 1
+    return changes
@@ -0,0 +1,51 @@
+"""
+Benchmark scenarios of the core endpoints, see `core.benchmarking`
+"""
+import asyncio
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from core.benchmarking import register
+from core.hashing import ahash_password
+
+# Passwords hashed at the same time by `chef.signup_hash_burst`
+SIGNUP_BURST = 16
+
+
+@register('chef.signup', 'Signup of a chef through `ChefCreateView`')
+def chef_signup(context):
+    # `ChefCreateView` has the default `DjangoModelPermissionsOrAnonReadOnly`, creating users needs `auth.add_user`
+    client = APIClient()
+    client.force_authenticate(User.objects.create_superuser(username='signup-admin-%d' % context.run_id))
+    return lambda iteration: client.post('/chefs/create/', {
+        'username': 'signup-%d-%d' % (context.run_id, iteration),
+        'password': 'benchmark-password',
+    }, format='json')
+
+
+@register(
+    'chef.signup_hash_burst', 'Burst of %d signup password hashes through the pool of `core.hashing`' % SIGNUP_BURST,
+    operations=SIGNUP_BURST,
+)
+def chef_signup_hash_burst(context):
+    async def burst():
+        return await asyncio.gather(*(ahash_password('benchmark-password') for _ in range(SIGNUP_BURST)))
+    return lambda iteration: asyncio.run(burst())
+
+
+@register('schema.precomputed', 'OpenAPI schema of `/api/schema/`, computed once (`API_SCHEMA_PRECOMPUTED`)')
+def schema_precomputed(context):
+    client = APIClient()
+    return lambda iteration: client.get('/api/schema/', HTTP_ACCEPT_ENCODING='gzip')
+
+
+@register('schema.generated', 'OpenAPI schema of `/api/schema/`, generated on each request')
+def schema_generated(context):
+    client = APIClient()
+
+    def get(iteration):
+        with override_settings(API_SCHEMA_PRECOMPUTED=False):
+            return client.get('/api/schema/')
+    return get
@@ -0,0 +1,215 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date
+from rest_framework.response import Response
+
+from core.routers import get_replicas, reads_from_replica
+
+KEY_PREFIX = 'api'
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def is_shared_cache(alias=None):
+    """
+    :param alias: Alias of the cache, `API_CACHE_ALIAS` by default
+    :return: Whether the entries of the cache are seen by every process, unlike the local-memory cache
+    """
+    cache = caches[alias] if alias is not None else get_cache()
+    return not isinstance(cache, LocMemCache)
+
+
+def version_key(scope):
+    return '%s:version:%s' % (KEY_PREFIX, scope)
+
+
+def written_key(scope):
+    return '%s:written:%s' % (KEY_PREFIX, scope)
+
+
+def get_versions(scopes):
+    """
+    Get the current version of each scope, in a single round trip to the cache
+    :param scopes: List with the scopes, e.g. `['recipes', 'chef:john']`
+    :return: List with the versions, in the same order as `scopes`
+    """
+    cache = get_cache()
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A missing counter (never set or evicted) starts from a unique value, so entries stored under
+            # an evicted version can never be served again
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(scopes):
+    """
+    Same as `get_versions`, with the async API of the cache
+    """
+    cache = get_cache()
+    keys = [version_key(scope) for scope in scopes]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(scopes):
+    """
+    Invalidate every response cached under the given scopes, now so the transaction of the caller reads its
+    writes, and again once it is committed: until then the other connections still read the previous rows, and
+    the responses they build meanwhile are cached under the first bump
+    :param scopes: List with the scopes
+    """
+    scopes = set(scopes)
+    _bump_versions(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_versions(scopes))
+
+
+def _bump_versions(scopes):
+    cache = get_cache()
+    for scope in scopes:
+        key = version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+    if get_replicas():
+        # The replicas may not have the write yet, see `can_store`
+        cache.set_many(
+            {written_key(scope): True for scope in scopes}, timeout=settings.DATABASE_REPLICA_STICKY_SECONDS,
+        )
+
+
+def can_store(scopes):
+    """
+    Check a response built by the request being handled can be cached: not when it may have been read from a
+    replica lagging behind a recent write of its scopes, the stale response would be served to every client
+    :param scopes: List with the scopes of the response
+    """
+    return not reads_from_replica() or not get_cache().get_many([written_key(scope) for scope in scopes])
+
+
+async def acan_store(scopes):
+    """
+    Same as `can_store`, with the async API of the cache
+    """
+    return not reads_from_replica() or not await get_cache().aget_many([written_key(scope) for scope in scopes])
+
+
+class CacheResponseMixin:
+    """
+    Cache the serialized data of the read-only actions of a viewset.
+
+    Entries are keyed on the path, the normalized query string and the versions of the scopes returned by
+    `get_cache_scopes`; bumping a scope version (see `bump_versions`) invalidates every entry stored under it.
+    The ETag and Last-Modified of the wrapped response (see `core.conditional.ConditionalGetMixin`) are
+    stored with the entry, so cached responses are revalidated with a 304 without touching the database.
+    """
+    # Query parameters that do not change the serialized data
+    cache_ignored_params = ('format',)
+
+    def get_cache_scopes(self, request, *args, **kwargs):
+        """
+        Get the scopes the response depends on
+        :return: List with the scopes
+        """
+        return []
+
+    async def aget_cache_scopes(self, request, *args, **kwargs):
+        """
+        Same as `get_cache_scopes` for the async actions, override it when the scopes need a query
+        """
+        return self.get_cache_scopes(request, *args, **kwargs)
+
+    def make_cache_key(self, request, versions):
+        params = sorted(
+            (key, value) for key, values in request.query_params.lists() for value in values
+            if key not in self.cache_ignored_params
+        )
+        raw_key = '%s?%s#%s' % (request.path, urlencode(params), ':'.join(map(str, versions)))
+        return '%s:response:%s' % (KEY_PREFIX, hashlib.md5(raw_key.encode('utf-8')).hexdigest())
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """
+        Serve the response from the cache or store the response of the handler
+        :param handler: Method of the action, e.g. `super().list`
+        """
+        if not getattr(settings, 'API_CACHE_ENABLED', True):
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        scopes = self.get_cache_scopes(request, *args, **kwargs)
+        key = self.make_cache_key(request, get_versions(scopes))
+        entry = cache.get(key)
+        if entry is None:
+            # Stored with its validators, see `core.conditional.ConditionalGetMixin`
+            self.caching_response = True
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200 and can_store(scopes):
+                cache.set(key, self.make_cache_entry(response), getattr(settings, 'API_CACHE_TIMEOUT', 300))
+            return response
+        return self.get_cached_response(request, entry)
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        """
+        Same as `cached_response` for the async actions
+        :param handler: Coroutine method of the action, e.g. `super().alist`
+        """
+        if not getattr(settings, 'API_CACHE_ENABLED', True):
+            return await handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        scopes = await self.aget_cache_scopes(request, *args, **kwargs)
+        key = self.make_cache_key(request, await aget_versions(scopes))
+        entry = await cache.aget(key)
+        if entry is None:
+            self.caching_response = True
+            response = await handler(request, *args, **kwargs)
+            if response.status_code == 200 and await acan_store(scopes):
+                await cache.aset(key, self.make_cache_entry(response), getattr(settings, 'API_CACHE_TIMEOUT', 300))
+            return response
+        return self.get_cached_response(request, entry)
+
+    @staticmethod
+    def make_cache_entry(response):
+        return response.data, response.get('ETag'), response.get('Last-Modified')
+
+    @staticmethod
+    def get_cached_response(request, entry):
+        data, etag, last_modified = entry
+        response = Response(data)
+        if etag is not None:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = last_modified
+        return get_conditional_response(
+            request, etag=etag, last_modified=last_modified and parse_http_date(last_modified), response=response
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super(CacheResponseMixin, self).list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super(CacheResponseMixin, self).retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(super(CacheResponseMixin, self).alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(super(CacheResponseMixin, self).aretrieve, request, *args, **kwargs)
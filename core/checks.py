@@ -0,0 +1,46 @@
+"""
+System checks of the settings, run by `python manage.py check` and before the servers and commands start
+"""
+from django.conf import settings
+from django.core import checks
+from django.core.cache import DEFAULT_CACHE_ALIAS
+
+from core.cache import is_shared_cache
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The versions of the cached responses and the replica pins must be seen by every web process
+    """
+    if getattr(settings, 'WEB_CONCURRENCY', 1) <= 1:
+        return []
+    aliases = dict.fromkeys([DEFAULT_CACHE_ALIAS, getattr(settings, 'API_CACHE_ALIAS', DEFAULT_CACHE_ALIAS)])
+    return [
+        checks.Warning(
+            'The cache "%s" is local to each process, but WEB_CONCURRENCY is %d.' % (alias, settings.WEB_CONCURRENCY),
+            hint='The processes serve stale responses after the writes of the others, and the feed of the recipes is '
+                 'disabled, configure a shared cache backend (e.g. Redis) in CACHES.',
+            id='core.W001',
+        )
+        for alias in aliases if not is_shared_cache(alias)
+    ]
+
+
+@checks.register(checks.Tags.caches)
+def check_task_queue_cache(app_configs, **kwargs):
+    """
+    The tasks run by the `run_tasks` processes invalidate the cached responses of the web processes
+    """
+    if not getattr(settings, 'TASK_QUEUE_ENABLED', False) or not getattr(settings, 'API_CACHE_ENABLED', True):
+        return []
+    if is_shared_cache():
+        return []
+    return [
+        checks.Error(
+            'TASK_QUEUE_ENABLED needs a cache shared with the task workers.',
+            hint='The web processes would serve the responses cached before the tasks ran, configure a shared '
+                 'cache backend (e.g. Redis) in CACHES, or disable API_CACHE_ENABLED.',
+            id='core.E001',
+        )
+    ]
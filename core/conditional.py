@@ -0,0 +1,145 @@
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from core.renderers import JSONRenderer
+
+CONDITIONAL_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+
+def make_etag(*state):
+    return quote_etag(hashlib.md5(json.dumps(state, default=str).encode('utf-8')).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET (If-None-Match / If-Modified-Since) for the list and retrieve actions of a viewset.
+
+    The validators of retrieve are computed with a single cheap query, without serializing the payload: the
+    `updated_at` of the object and its `validator_fields`. The ETag of a list is the hash of its page rendered in
+    JSON, which changes with any of its recipes, deletions and related fields included. It is only computed when
+    the request is conditional or the response is cached with it (see `core.cache.CacheResponseMixin`): a 304
+    saves the transfer, and the cached responses are revalidated without the database. Lists only carry an ETag.
+    """
+    # Query parameters that do not change the serialized data
+    conditional_ignored_params = ('format',)
+    # Fields of related objects that are part of the representation, e.g. `chef__username`
+    validator_fields = ()
+
+    def is_conditional(self, request):
+        return any(header in request.META for header in CONDITIONAL_HEADERS)
+
+    def needs_list_validators(self, request):
+        """
+        :return: Whether the ETag of the list is computed, see the class docstring
+        """
+        return self.is_conditional(request) or getattr(self, 'caching_response', False)
+
+    def get_list_validators(self, request, response):
+        """
+        :param response: Response with the page of the list
+        :return: Tuple with the ETag and Last-Modified of the page
+        """
+        content = JSONRenderer().render(response.data)
+        digest = hashlib.md5(self.get_representation_params(request).encode('utf-8') + b'#' + content)
+        return quote_etag(digest.hexdigest()), None
+
+    def get_representation_params(self, request):
+        """
+        :return: Encoded query parameters of the request that change the serialized data, e.g. the filters
+        """
+        return urlencode(sorted(
+            (key, value) for key, values in request.query_params.lists() for value in values
+            if key not in self.conditional_ignored_params
+        ))
+
+    def get_object_validators(self, obj):
+        """
+        :param obj: Instance or dict of values with `id`, `updated_at` and the `validator_fields`
+        :return: Tuple with the ETag and Last-Modified of the object
+        """
+        if isinstance(obj, dict):
+            values = [obj[field] for field in ('id', 'updated_at', *self.validator_fields)]
+        else:
+            values = [obj.id, obj.updated_at]
+            for field in self.validator_fields:
+                value = obj
+                for attr in field.split('__'):
+                    value = getattr(value, attr)
+                values.append(value)
+        # The same object with other fields (see `core.fieldsets`) is another representation
+        params = self.get_representation_params(self.request)
+        return make_etag(*values, *([params] if params else [])), int(values[1].timestamp())
+
+    def get_retrieve_validators(self, request, *args, **kwargs):
+        """
+        :return: Tuple with the ETag and Last-Modified of the object, or None when it does not exist
+        """
+        obj = self.get_validator_values_queryset(**kwargs).first()
+        return self.get_object_validators(obj) if obj else None
+
+    async def aget_retrieve_validators(self, request, *args, **kwargs):
+        obj = await self.get_validator_values_queryset(**kwargs).afirst()
+        return self.get_object_validators(obj) if obj else None
+
+    def get_validator_values_queryset(self, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.get_queryset().filter(**{self.lookup_field: kwargs[lookup_url_kwarg]}).values(
+            'id', 'updated_at', *self.validator_fields
+        )
+
+    @staticmethod
+    def set_validators(response, validators):
+        etag, last_modified = validators
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(request, super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def list_response(self, request, response):
+        """
+        :return: The response of the list with its validators, or a 304 when the client has the page
+        """
+        if response.status_code != 200 or not self.needs_list_validators(request):
+            return response
+        validators = self.get_list_validators(request, response)
+        if self.is_conditional(request):
+            not_modified = get_conditional_response(request, *validators)
+            if not_modified is not None:
+                return self.set_validators(not_modified, validators)
+        return self.set_validators(response, validators)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.is_conditional(request):
+            validators = self.get_retrieve_validators(request, *args, **kwargs)
+            if validators is not None:
+                not_modified = get_conditional_response(request, *validators)
+                if not_modified is not None:
+                    return self.set_validators(not_modified, validators)
+
+        # Same as `RetrieveModelMixin.retrieve`, the validators come from the loaded object
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), self.get_object_validators(instance))
+
+    async def alist(self, request, *args, **kwargs):
+        return self.list_response(request, await super(ConditionalGetMixin, self).alist(request, *args, **kwargs))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        if self.is_conditional(request):
+            validators = await self.aget_retrieve_validators(request, *args, **kwargs)
+            if validators is not None:
+                not_modified = get_conditional_response(request, *validators)
+                if not_modified is not None:
+                    return self.set_validators(not_modified, validators)
+
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), self.get_object_validators(instance))
@@ -0,0 +1,16 @@
+"""
+Tuning of the database connections
+"""
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    `connection_created` receiver running the `SQLITE_PRAGMAS` of the settings on the new SQLite connections.
+    They are run on the driver connection, like the `foreign_keys` pragma of Django, so they are neither
+    logged nor counted as queries of the request.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute('PRAGMA %s = %s' % (name, value))
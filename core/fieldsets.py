@@ -0,0 +1,87 @@
+"""
+Sparse fieldsets: the client selects the fields of the representation with the `fields` or `omit` query
+parameters, e.g. `?fields=id,name` for a list of names, and the columns of the other fields are not read
+"""
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import ValidationError
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name='fields', type=OpenApiTypes.STR, description='Fields of the representation, separated by commas',
+    ),
+    OpenApiParameter(
+        name='omit', type=OpenApiTypes.STR, description='Fields excluded from the representation, separated by commas',
+    ),
+]
+
+
+def parse_field_list(values):
+    """
+    :param values: List with the values of a query parameter, each one with names separated by commas
+    :return: List with the names
+    """
+    return [name.strip() for value in values for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    Viewset mixin selecting the fields of the representation from the `fields` and `omit` query parameters of
+    the read actions. The selection is passed to the serializer as its `fields` argument (see
+    `core.serializers.FieldSelectionMixin`), and `get_sparse_fields` is meant to be used by `get_queryset`
+    to read only the columns of the selected fields. Unknown fields are rejected with a 400.
+
+    Write actions always use every field, since the fields are also the input of the serializer.
+    """
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    # Actions where the selection applies
+    sparse_fieldset_actions = ('list', 'retrieve')
+
+    def get_sparse_fields(self):
+        """
+        :return: List with the names of the selected fields in the order of the serializer, or None for every field
+        """
+        if self.action not in self.sparse_fieldset_actions:
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self.parse_sparse_fields(self.request)
+        return self._sparse_fields
+
+    def get_readable_fields(self):
+        """
+        :return: List with the names of the fields the client can select
+        """
+        return [name for name, field in self.get_serializer_class()().fields.items() if not field.write_only]
+
+    def parse_sparse_fields(self, request):
+        params = request.query_params
+        if self.fields_query_param not in params and self.omit_query_param not in params:
+            return None
+        readable = self.get_readable_fields()
+        selection = {}
+        for param in (self.fields_query_param, self.omit_query_param):
+            if param not in params:
+                continue
+            names = parse_field_list(params.getlist(param))
+            unknown = [name for name in names if name not in readable]
+            if unknown:
+                raise ValidationError({param: [
+                    'Unknown fields: %s. Choose among: %s.' % (', '.join(unknown), ', '.join(readable))
+                ]})
+            selection[param] = set(names)
+
+        fields = [
+            name for name in readable
+            if name in selection.get(self.fields_query_param, readable)
+            and name not in selection.get(self.omit_query_param, ())
+        ]
+        if not fields:
+            raise ValidationError({self.fields_query_param: ['Select at least one field.']})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super(SparseFieldsetMixin, self).get_serializer(*args, **kwargs)
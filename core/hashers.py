@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.exceptions import ImproperlyConfigured
+
+
+def get_hasher_iterations(default):
+    """
+    :param default: Number of iterations of the hasher when the profile does not set one
+    :return: Number of iterations of the `PASSWORD_HASHER_PROFILE` of the settings
+    """
+    profile = getattr(settings, 'PASSWORD_HASHER_PROFILE', 'default')
+    profiles = getattr(settings, 'PASSWORD_HASHER_PROFILES', {})
+    if profile not in profiles:
+        raise ImproperlyConfigured(
+            'Unknown PASSWORD_HASHER_PROFILE "%s", choose one of: %s.' % (profile, ', '.join(profiles))
+        )
+    return profiles[profile] or default
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2 hasher with the number of iterations of the `PASSWORD_HASHER_PROFILE`. The hashes store
+    their number of iterations, so they are checked whatever the profile, and hashes with another cost are
+    updated on the next login of the user.
+    """
+
+    @property
+    def iterations(self):
+        return get_hasher_iterations(hashers.PBKDF2PasswordHasher.iterations)
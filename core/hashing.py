@@ -0,0 +1,94 @@
+"""
+Password hashing out of the threads serving the requests: the hashes are computed by a bounded pool of threads
+(PBKDF2 releases the GIL, so they run in parallel), a burst of signups uses at most `PASSWORD_HASHING_WORKERS`
+cores, and the signups beyond `PASSWORD_HASHING_MAX_PENDING` waiting hashes are rejected with a 503 instead of
+queueing without bound
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many signups in progress, try again later.')
+    default_code = 'password_hashing_busy'
+    # Seconds sent in the `Retry-After` header
+    wait = 1
+
+
+class PasswordHashingPool:
+    """
+    Pool of threads hashing passwords
+    :param workers: Number of threads, i.e. of hashes computed at the same time
+    :param max_pending: Number of hashes waiting for a thread, beyond it `submit` raises `PasswordHashingBusy`
+    """
+
+    def __init__(self, workers, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self.slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def submit(self, password):
+        """
+        :return: Future of the hash of the password
+        """
+        if not self.slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        try:
+            future = self.executor.submit(make_password, password)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda future: self.slots.release())
+        return future
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PasswordHashingPool(
+                    workers=getattr(settings, 'PASSWORD_HASHING_WORKERS', 2),
+                    max_pending=getattr(settings, 'PASSWORD_HASHING_MAX_PENDING', 32),
+                )
+    return _pool
+
+
+@receiver(setting_changed)
+def reset_pool(setting, **kwargs):
+    global _pool
+    if setting in ('PASSWORD_HASHING_WORKERS', 'PASSWORD_HASHING_MAX_PENDING') and _pool is not None:
+        with _pool_lock:
+            _pool.shutdown()
+            _pool = None
+
+
+def hash_password(password):
+    """
+    Hash a password in the pool, the calling thread waits for the hash
+    :return: Encoded hash, see `make_password`
+    """
+    return get_pool().submit(password).result()
+
+
+async def ahash_password(password):
+    """
+    Same as `hash_password`, the event loop keeps serving other requests meanwhile
+    """
+    return await asyncio.wrap_future(get_pool().submit(password))
@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core.utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Metrics of the request being handled, set by `RequestMetricsMiddleware`. Context variables follow the
+# request into the threads of `sync_to_async`, so queries run by async views are accounted too.
+current_metrics = ContextVar('current_metrics', default=None)
+
+# Sampled fields of a request and their aggregate in the stats
+STATS_FIELDS = ('total_ms', 'db_ms', 'queries', 'serialize_ms', 'filter_ms', 'render_ms', 'response_bytes')
+
+
+class RequestMetrics:
+    """Measures of a request: wall time, queries and the time spent in each phase (serialize, render...)"""
+
+    def __init__(self, max_queries=100):
+        self.start = time.perf_counter()
+        self.total = None
+        self.queries = 0
+        self.db_time = 0.0
+        # (sql, duration) of the first `max_queries` queries, logged when the request is slow
+        self.statements = []
+        self.max_queries = max_queries
+        self.timings = {}
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if len(self.statements) < self.max_queries:
+            self.statements.append((sql, duration))
+
+    def add_timing(self, name, duration):
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+    def finish(self):
+        self.total = time.perf_counter() - self.start
+
+    def server_timing(self):
+        """
+        :return: Value of the `Server-Timing` header, durations in milliseconds
+        """
+        entries = [
+            'total;dur=%.1f' % (self.total * 1000),
+            'db;dur=%.1f;desc="%d queries"' % (self.db_time * 1000, self.queries),
+        ]
+        entries.extend('%s;dur=%.1f' % (name, duration * 1000) for name, duration in sorted(self.timings.items()))
+        return ', '.join(entries)
+
+    def sample(self, response_size):
+        return {
+            'total_ms': self.total * 1000,
+            'db_ms': self.db_time * 1000,
+            'queries': self.queries,
+            'serialize_ms': self.timings.get('serialize', 0.0) * 1000,
+            'filter_ms': self.timings.get('filter', 0.0) * 1000,
+            'render_ms': self.timings.get('render', 0.0) * 1000,
+            'response_bytes': response_size,
+        }
+
+
+@contextmanager
+def timer(name):
+    """
+    Add the time spent in the block to the phase `name` of the current request, if instrumented
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_timing(name, time.perf_counter() - start)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection (see `install_query_recorder`), accounting the queries to
+    the current request
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """`connection_created` receiver adding `record_query` to the execute wrappers of the connection"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class EndpointStats:
+    """
+    Rolling aggregate of the requests of each endpoint, over the last `REQUEST_STATS_WINDOW` requests,
+    shared by the threads of the process
+    """
+
+    def __init__(self):
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def window(self):
+        return getattr(settings, 'REQUEST_STATS_WINDOW', 1000)
+
+    def add(self, endpoint, sample):
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None or samples.maxlen != self.window:
+                samples = self._samples[endpoint] = deque(samples or (), maxlen=self.window)
+            samples.append(sample)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def snapshot(self):
+        """
+        :return: Dict with the aggregate of each endpoint: number of requests, and mean/p50/p99/max of each field
+        """
+        with self._lock:
+            samples = {endpoint: list(values) for endpoint, values in self._samples.items()}
+            counts = dict(self._counts)
+        stats = {}
+        for endpoint, values in sorted(samples.items()):
+            stats[endpoint] = {'count': counts[endpoint], 'window': len(values)}
+            for field in STATS_FIELDS:
+                measures = [value[field] for value in values if value[field] is not None]
+                if not measures:
+                    continue
+                stats[endpoint][field] = {
+                    'mean': sum(measures) / len(measures),
+                    'p50': percentile(measures, 50),
+                    'p99': percentile(measures, 99),
+                    'max': max(measures),
+                }
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+endpoint_stats = EndpointStats()
+
+
+def get_endpoint(request):
+    """
+    :return: Name of the endpoint of the request, e.g. `GET recipe-list`
+    """
+    match = getattr(request, 'resolver_match', None)
+    return '%s %s' % (request.method, match.view_name if match else '<unresolved>')
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure every request: wall time, number and time of the queries, time spent in the serializers
+    (`serialize`), the filters (`filter`) and the renderers (`render`), and size of the response.
+
+    The measures are sent in the `Server-Timing` header when `REQUEST_SERVER_TIMING` is on, aggregated per
+    endpoint in `endpoint_stats`, and requests slower than `REQUEST_SLOW_THRESHOLD_MS` are logged with
+    their SQL. Place it first in `MIDDLEWARE`, so the time of the other middlewares is included.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics(max_queries=getattr(settings, 'REQUEST_SLOW_MAX_QUERIES', 100))
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.process_metrics(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics(max_queries=getattr(settings, 'REQUEST_SLOW_MAX_QUERIES', 100))
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.process_metrics(request, response, metrics)
+
+    def process_metrics(self, request, response, metrics):
+        metrics.finish()
+        # Streaming responses are not consumed to be measured
+        size = None if response.streaming else len(response.content)
+        if getattr(settings, 'REQUEST_SERVER_TIMING', False):
+            response['Server-Timing'] = metrics.server_timing()
+        endpoint = get_endpoint(request)
+        endpoint_stats.add(endpoint, metrics.sample(size))
+
+        threshold = getattr(settings, 'REQUEST_SLOW_THRESHOLD_MS', 500)
+        if threshold is not None and metrics.total * 1000 >= threshold:
+            logger.warning(
+                'Slow request %s %s: %.1f ms, %d queries in %.1f ms\n%s',
+                request.method, request.get_full_path(), metrics.total * 1000, metrics.queries,
+                metrics.db_time * 1000,
+                '\n'.join('%8.1f ms  %s' % (duration * 1000, sql) for sql, duration in metrics.statements),
+                extra={'endpoint': endpoint, 'status_code': response.status_code},
+            )
+        return response
+
+
+class SerializerTimingMixin:
+    """Serializer mixin accounting the time spent building `data` to the `serialize` phase of the request"""
+
+    @property
+    def data(self):
+        with timer('serialize'):
+            return super(SerializerTimingMixin, self).data
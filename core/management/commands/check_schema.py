@@ -0,0 +1,34 @@
+import difflib
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.schema import generate_schema, render_schema
+
+# Lines of the diff shown when the file does not match
+MAX_DIFF_LINES = 50
+
+
+class Command(BaseCommand):
+    help = 'Check that the schema file (`API_SCHEMA_FILE`, `schema.yml` by default) matches the code'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='Schema file, `API_SCHEMA_FILE` by default')
+
+    def handle(self, *args, **options):
+        path = options['file'] or getattr(settings, 'API_SCHEMA_FILE', None) or settings.BASE_DIR / 'schema.yml'
+        try:
+            with open(path, 'rb') as file:
+                content = file.read()
+        except FileNotFoundError:
+            raise CommandError('%s not found, run `python manage.py spectacular --file %s`' % (path, path))
+
+        expected = render_schema(generate_schema())
+        if content != expected:
+            diff = list(difflib.unified_diff(
+                content.decode().splitlines(), expected.decode().splitlines(), str(path), 'code', lineterm='',
+            ))
+            raise CommandError('%s does not match the code, run `python manage.py spectacular --file %s`:\n%s' % (
+                path, path, '\n'.join(diff[:MAX_DIFF_LINES] + (['...'] if len(diff) > MAX_DIFF_LINES else [])),
+            ))
+        self.stdout.write(self.style.SUCCESS('%s matches the code' % path))
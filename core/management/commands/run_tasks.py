@@ -0,0 +1,60 @@
+import multiprocessing
+import signal
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.tasks import Worker
+
+
+def run_worker(poll_interval=None):
+    """
+    Run a worker until it gets SIGTERM or SIGINT, it stops after the batch being run
+    """
+    django.setup()
+    worker = Worker()
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run(poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Run the tasks of the queue (see `core.tasks`) in worker processes, until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes')
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help='Seconds waited when no task is due, `TASK_POLL_INTERVAL` by default',
+        )
+        parser.add_argument('--once', action='store_true', help='Run the due tasks and exit, e.g. from cron')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            count = Worker().run_pending()
+            self.stdout.write(self.style.SUCCESS('Ran %d tasks' % count))
+            return
+        if options['processes'] <= 1:
+            self.stdout.write('Worker started')
+            run_worker(options['poll_interval'])
+            return
+
+        # The connections of the parent are not shared with the workers
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=run_worker, args=(options['poll_interval'],))
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write('Started %d workers' % len(processes))
+        signal.signal(signal.SIGTERM, lambda *args: [process.terminate() for process in processes])
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # The workers got the SIGINT too
+            for process in processes:
+                process.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
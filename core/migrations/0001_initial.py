@@ -0,0 +1,39 @@
+# Generated by Django 5.0 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(help_text='Name of the registered task', max_length=100, verbose_name='Name')),
+                ('payload', models.JSONField(help_text='Argument of the task', null=True, verbose_name='Payload')),
+                ('key', models.CharField(blank=True, help_text='Idempotency key, a single pending task has it', max_length=255, null=True, verbose_name='Key')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('run_after', models.DateTimeField(help_text='The task is not run before', verbose_name='Run After')),
+                ('locked_by', models.CharField(blank=True, help_text='Worker running the task', max_length=32, null=True, verbose_name='Locked By')),
+                ('locked_until', models.DateTimeField(blank=True, help_text='End of the lease of the worker, the task is run again by another one after it', null=True, verbose_name='Locked Until')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Last Error')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'run_after', 'id'], name='task_due_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('key',), name='task_pending_key_unique'),
+        ),
+    ]
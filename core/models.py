@@ -11,3 +11,45 @@ class BaseModel(models.Model):
         """Meta options for BaseModel."""
         abstract = True
         ordering = ['-created_at', '-updated_at']
+
+
+class Task(BaseModel):
+    """Task of the queue of `core.tasks`, deleted once run"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100, verbose_name='Name', help_text='Name of the registered task')
+    payload = models.JSONField(verbose_name='Payload', help_text='Argument of the task', null=True)
+    key = models.CharField(
+        max_length=255, verbose_name='Key', null=True, blank=True,
+        help_text='Idempotency key, a single pending task has it',
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name='Status')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Attempts')
+    run_after = models.DateTimeField(verbose_name='Run After', help_text='The task is not run before')
+    locked_by = models.CharField(
+        max_length=32, verbose_name='Locked By', null=True, blank=True, help_text='Worker running the task',
+    )
+    locked_until = models.DateTimeField(
+        verbose_name='Locked Until', null=True, blank=True,
+        help_text='End of the lease of the worker, the task is run again by another one after it',
+    )
+    last_error = models.TextField(verbose_name='Last Error', blank=True, default='')
+
+    class Meta:
+        """Meta options for Task."""
+        ordering = ['id']
+        indexes = [
+            # Due tasks of the workers, see `core.tasks.Worker.claim`
+            models.Index(fields=['status', 'run_after', 'id'], name='task_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(status='pending'), name='task_pending_key_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return '%s #%s' % (self.name, self.id)
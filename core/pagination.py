@@ -0,0 +1,223 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.duration import duration_iso_string
+from django.utils.encoding import force_str
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over `BaseModel.Meta.ordering` plus `id` as a tiebreaker.
+
+    Instead of an OFFSET, each page is fetched with a `WHERE (created_at, updated_at, id) < (...)`
+    condition built from the last row of the previous page, so the cost of a page does not depend
+    on how deep the client is paging. The position is handed to the client as an opaque cursor.
+
+    When the queryset has an explicit ordering (e.g. by relevance of the search or by total time), that
+    ordering is paginated instead, with `id` as the tiebreaker.
+    """
+    cursor_query_param = 'cursor'
+    cursor_query_description = _('The pagination cursor value.')
+    page_size_query_param = 'page_size'
+    page_size_query_description = _('Number of results to return per page.')
+    invalid_cursor_message = _('Invalid cursor')
+    ordering = ('-created_at', '-updated_at', '-id')
+    page_size = api_settings.PAGE_SIZE or 20
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Same as `paginate_queryset`, fetching the page with the async ORM
+        """
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page([instance async for instance in queryset.aiterator()])
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Order and filter the queryset from the cursor of the request
+        :return: Queryset with the rows of the page plus one, to know whether there is a following page
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.reverse, position = self.decode_cursor(request)
+        self.has_cursor = position is not None
+
+        queryset = queryset.order_by(*self._get_ordering(self.reverse))
+        if position is not None:
+            queryset = queryset.filter(self._get_keyset_filter(queryset, position, self.reverse))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        """
+        :param results: List with the rows fetched from the queryset of `get_page_queryset`
+        :return: List with the rows of the page
+        """
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = self.has_cursor, has_following
+        else:
+            self.has_next, self.has_previous = has_following, self.has_cursor
+        return self.page
+
+    def get_ordering(self, queryset):
+        """
+        Get the ordering to paginate, the explicit ordering of the queryset or the default one
+        :return: Tuple with the ordering, always ending with the `id` tiebreaker
+        """
+        ordering = tuple(field for field in queryset.query.order_by if isinstance(field, str))
+        if not ordering:
+            return self.ordering
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            # In the direction of the last field, so an index on (field, id) is read in a single direction
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    def get_max_page_size(self):
+        return getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', 100)
+
+    def get_page_size(self, request):
+        max_page_size = self.get_max_page_size()
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=max_page_size,
+            )
+        except (KeyError, ValueError):
+            return min(self.page_size, max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': force_str(self.cursor_query_description),
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': force_str(self.page_size_query_description),
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def decode_cursor(self, request):
+        """
+        Decode the cursor from the request
+        :return: Tuple with the direction and the position, or (False, None) without a cursor
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii'), altchars=b'-_').decode('utf-8'))
+            reverse = bool(payload['r'])
+            position = payload['p']
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def encode_cursor(self, instance, reverse):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            # Instances or `.values()` rows
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            if isinstance(value, timedelta):
+                value = duration_iso_string(value)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        payload = json.dumps({'r': int(reverse), 'p': position}, separators=(',', ':'))
+        encoded = b64encode(payload.encode('utf-8'), altchars=b'-_').decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(field[1:] if field.startswith('-') else '-' + field for field in self.ordering)
+
+    def parse_position(self, queryset, position):
+        """
+        Parse the values of the position of a cursor with the fields of the ordering
+        :return: List with the values
+        """
+        annotations = queryset.query.annotations
+        try:
+            values = []
+            for field, value in zip(self.ordering, position):
+                name = field.lstrip('-')
+                if name in annotations:
+                    output_field = annotations[name].output_field
+                else:
+                    output_field = queryset.model._meta.get_field(name)
+                    # The values of a `GeneratedField` are parsed by the field of its expression
+                    output_field = getattr(output_field, 'output_field', output_field)
+                values.append(output_field.to_python(value))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _get_keyset_filter(self, queryset, position, reverse):
+        """
+        Build the row-value comparison `(a, b, c) < (x, y, z)` as an OR of prefix equalities,
+        which every backend can resolve with the composite index on the ordering columns.
+        """
+        values = self.parse_position(queryset, position)
+        condition = Q()
+        for index, field in enumerate(self._get_ordering(reverse)):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            prefix = {self.ordering[i].lstrip('-'): values[i] for i in range(index)}
+            condition |= Q(**prefix, **{'%s__%s' % (name, lookup): values[index]})
+        return condition
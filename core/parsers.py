@@ -0,0 +1,29 @@
+import io
+
+from django.conf import settings
+from rest_framework import parsers
+
+from core.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONParser(parsers.JSONParser):
+    """
+    JSON parser using orjson when it is installed. Bodies orjson rejects (e.g. NaN, integers over 64 bits,
+    other encodings than UTF-8) are parsed by DRF's parser, so they are accepted or reported the same way.
+    """
+    renderer_class = JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super(JSONParser, self).parse(stream, media_type, parser_context)
+        content = stream.read()
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super(JSONParser, self).parse(io.BytesIO(content), media_type, parser_context)
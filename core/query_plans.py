@@ -0,0 +1,100 @@
+"""
+Query plans of the queries run by the API, and detection of the costly steps: full scans and sorts
+"""
+import re
+from contextlib import ExitStack
+
+from django.db import connections
+
+SQLITE_SCAN = re.compile(r'^SCAN (?P<table>\S+)(?: USING (?:COVERING )?INDEX (?P<index>\S+))?')
+SQLITE_TEMP_BTREE = re.compile(r'^USE TEMP B-TREE FOR (?P<clause>.+)')
+# Scans that do not read a table: FTS5 index, materialized subqueries and the row of a query without FROM
+SQLITE_SCAN_IGNORED = re.compile(r'VIRTUAL TABLE|^SCAN (CONSTANT ROW|\(subquery)')
+POSTGRESQL_SEQ_SCAN = re.compile(r'Seq Scan on (?P<table>\S+)')
+POSTGRESQL_SORT = re.compile(r'^\s*(?:->\s*)?(?P<node>(?:Incremental )?Sort)(?:\s+\(|$)')
+
+
+class QueryPlanRecorder:
+    """
+    `connection.execute_wrapper` getting the plan of every SELECT before it runs, e.g. to audit the queries
+    of a request
+    :param using: Alias of the database
+    """
+
+    def __init__(self, using='default'):
+        self.connection = connections[using]
+        # (sql, plan) of each query, the plan being a list of lines
+        self.plans = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.plans.append((sql, self.explain(context['cursor'], sql, params)))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        self._stack.enter_context(self.connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def explain(self, cursor, sql, params):
+        """
+        :param cursor: Cursor of the query, the plan is requested through the database cursor so the other
+                       execute wrappers (e.g. the request metrics) do not account it
+        :return: List with the lines of the plan
+        """
+        cursor.cursor.execute('%s %s' % (self.connection.ops.explain_query_prefix(), sql), params)
+        rows = cursor.fetchall()
+        if self.connection.vendor != 'sqlite':
+            return [row[0] for row in rows]
+        # (id, parent, notused, detail) rows, indented by their depth in the plan
+        depths = {0: -1}
+        lines = []
+        for node_id, parent_id, _, detail in rows:
+            depths[node_id] = depths.get(parent_id, -1) + 1
+            lines.append('  ' * depths[node_id] + detail)
+        return lines
+
+
+def find_plan_issues(vendor, sql, plan):
+    """
+    Find the steps of a plan that read a whole table or sort the rows:
+
+    - full scans of a table. On SQLite, walking a whole index is reported too, except in limited queries
+      read in the order of the index, which stop after the first rows;
+    - sorts, i.e. temp b-trees on SQLite and `Sort` nodes on PostgreSQL.
+
+    :param vendor: Vendor of the database, `sqlite` or `postgresql`
+    :param sql: Query of the plan
+    :param plan: List with the lines of the plan, see `QueryPlanRecorder`
+    :return: List with the description of the issues
+    """
+    issues = []
+    if vendor == 'sqlite':
+        lines = [line.strip() for line in plan]
+        sorted_rows = any(line == 'USE TEMP B-TREE FOR ORDER BY' for line in lines)
+        limited = re.search(r'\bLIMIT\b', sql, re.IGNORECASE) is not None
+        for line in lines:
+            temp_btree = SQLITE_TEMP_BTREE.match(line)
+            scan = SQLITE_SCAN.match(line)
+            if temp_btree:
+                issues.append('temp b-tree for %s' % temp_btree.group('clause'))
+            elif scan is None or SQLITE_SCAN_IGNORED.search(line):
+                continue
+            elif scan.group('index') is None:
+                issues.append('full scan of %s' % scan.group('table'))
+            elif not limited or sorted_rows:
+                issues.append('full scan of %s using index %s' % (scan.group('table'), scan.group('index')))
+    elif vendor == 'postgresql':
+        for line in plan:
+            seq_scan = POSTGRESQL_SEQ_SCAN.search(line)
+            sort = POSTGRESQL_SORT.match(line)
+            if seq_scan:
+                issues.append('full scan of %s' % seq_scan.group('table'))
+            elif sort:
+                issues.append(sort.group('node').lower())
+    else:
+        raise ValueError('The query plans of %s are not analyzed' % vendor)
+    return issues
@@ -0,0 +1,36 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+from core.instrumentation import timer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    JSON renderer using orjson when it is installed, with the output of DRF's renderer: dates, times and
+    timedeltas go through the same `JSONEncoder.default`, and `\\u2028`/`\\u2029` are escaped.
+
+    The stdlib is used for the cases orjson does not cover: indented output (e.g. the browsable API), ASCII
+    output (`UNICODE_JSON = False`), non compact output and data orjson cannot encode (e.g. integers over
+    64 bits). NaN/Infinity are rendered as `null` by orjson.
+
+    The time spent rendering is accounted to the `render` phase of the request, see `core.instrumentation`.
+    """
+    encoder = encoders.JSONEncoder()
+    orjson_options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timer('render'):
+            if orjson is None or data is None or not self.compact or self.ensure_ascii:
+                return super(JSONRenderer, self).render(data, accepted_media_type, renderer_context)
+            if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+                return super(JSONRenderer, self).render(data, accepted_media_type, renderer_context)
+            try:
+                content = orjson.dumps(data, default=self.encoder.default, option=self.orjson_options)
+            except orjson.JSONEncodeError:
+                return super(JSONRenderer, self).render(data, accepted_media_type, renderer_context)
+            return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
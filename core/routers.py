@@ -0,0 +1,122 @@
+"""
+Read replicas: the reads of the `DATABASE_REPLICA_MODELS` made by safe requests (GET, HEAD, OPTIONS) go to one
+of the `DATABASE_REPLICA_ALIASES`, chosen for each request, every other query goes to the primary, the `default`
+database.
+
+The replicas lag behind the primary, so after a successful write a client is pinned to the primary for
+`DATABASE_REPLICA_STICKY_SECONDS`: a chef reads their new recipe right away. The client is identified by its
+`Authorization` header or its session cookie, and the pins are shared through the cache.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = 'default'
+
+# Alias of the replica the request being handled reads from, None for the primary, chosen once per request by
+# `ReplicaRoutingMiddleware`. Queries run outside of a request, e.g. by the management commands, use the primary.
+read_replica = ContextVar('read_replica', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICA_ALIASES', [])
+
+
+def reads_from_replica():
+    """
+    :return: Whether the request being handled may read from a replica
+    """
+    return bool(get_replicas()) and read_replica.get() is not None
+
+
+def get_pin_key(request):
+    """
+    :return: Cache key of the pin of the client of the request, None for a client that cannot be identified
+    """
+    credentials = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return 'replica-pin:%s' % hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def is_written(request, response):
+    return request.method not in SAFE_METHODS and response.status_code < 400
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Choose the database of the reads of each request for `ReplicaRouter`, and pin the clients to the primary
+    after their writes. Does nothing without replicas.
+
+    Every read of a request goes to the same replica, so its queries see the same state of the database.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def choose_replica(self, replicas):
+        return random.choice(replicas)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not get_replicas():
+            return self.get_response(request)
+        key = get_pin_key(request)
+        primary = request.method not in SAFE_METHODS or (key is not None and cache.get(key) is not None)
+        token = read_replica.set(None if primary else self.choose_replica(get_replicas()))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_replica.reset(token)
+        if key is not None and is_written(request, response):
+            cache.set(key, True, timeout=settings.DATABASE_REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not get_replicas():
+            return await self.get_response(request)
+        key = get_pin_key(request)
+        primary = request.method not in SAFE_METHODS or (key is not None and await cache.aget(key) is not None)
+        token = read_replica.set(None if primary else self.choose_replica(get_replicas()))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_replica.reset(token)
+        if key is not None and is_written(request, response):
+            await cache.aset(key, True, timeout=settings.DATABASE_REPLICA_STICKY_SECONDS)
+        return response
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of the `DATABASE_REPLICA_MODELS` to the replica chosen by
+    `ReplicaRoutingMiddleware`, and every write to the primary
+    """
+
+    def db_for_read(self, model, **hints):
+        if not reads_from_replica() or model._meta.label not in settings.DATABASE_REPLICA_MODELS:
+            return None
+        # Related objects are read from the database of the instance, e.g. the chef of a recipe
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db is not None:
+            return instance._state.db
+        return read_replica.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
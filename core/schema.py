@@ -0,0 +1,178 @@
+"""
+OpenAPI schema computed once instead of on every request of `/api/schema/`, which introspects every view,
+serializer and filter of the API. The schema is read from `API_SCHEMA_FILE`, the `schema.yml` written at build
+time by `python manage.py spectacular --file schema.yml`, or generated at the first request without it. Each
+format is then rendered and compressed once, and served from memory with an ETag.
+
+`python manage.py check_schema` fails when the file no longer matches the code.
+"""
+import gzip
+import hashlib
+import threading
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers, quote_etag
+from drf_spectacular.renderers import OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IDENTITY = 'identity'
+
+
+def generate_schema():
+    """
+    :return: Schema of the API generated from the code, as by the `spectacular` command
+    """
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+def render_schema(schema, renderer_class=OpenApiYamlRenderer):
+    return renderer_class().render(schema, renderer_context={})
+
+
+def compress(content):
+    """
+    :return: Dict with the content by content encoding, in the order of preference
+    """
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(content)
+    # No timestamp, so the output only depends on the content
+    variants['gzip'] = gzip.compress(content, mtime=0)
+    variants[IDENTITY] = content
+    return variants
+
+
+def parse_accept_encoding(header):
+    """
+    :return: Set with the content encodings accepted by the client, `*` for any
+    """
+    encodings = set()
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        coding = coding.strip().lower()
+        if coding and quality > 0:
+            encodings.add(coding)
+    return encodings
+
+
+class SchemaDocument:
+    """
+    Schema rendered in a format, with its compressed variants
+    :param content: Bytes of the rendered schema
+    """
+
+    def __init__(self, content):
+        self.variants = compress(content)
+        self.digest = hashlib.sha256(content).hexdigest()
+
+    def choose_encoding(self, accept_encoding):
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in self.variants:
+            if encoding in accepted or '*' in accepted:
+                return encoding
+        return IDENTITY
+
+    def get_etag(self, encoding):
+        # Each variant is a different representation, with its own ETag
+        return quote_etag(self.digest if encoding == IDENTITY else '%s-%s' % (self.digest, encoding))
+
+
+class PrecomputedSchema:
+    """
+    Schema loaded once per process, and its documents by renderer
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.source = None
+        self.schema = None
+        self.documents = {}
+
+    def get_source(self):
+        return getattr(settings, 'API_SCHEMA_FILE', None)
+
+    def load(self, source):
+        if source is None:
+            return generate_schema(), {}
+        with open(source, 'rb') as file:
+            content = file.read()
+        # The file is served as is in its format
+        return yaml.safe_load(content), {OpenApiYamlRenderer: SchemaDocument(content)}
+
+    def get_document(self, renderer_class):
+        """
+        :return: `SchemaDocument` of the schema rendered by the renderer
+        """
+        source = self.get_source()
+        document = self.documents.get(renderer_class) if self.source == source else None
+        if document is not None:
+            return document
+        with self.lock:
+            if self.schema is None or self.source != source:
+                self.clear()
+                self.schema, self.documents = self.load(source)
+                self.source = source
+            if renderer_class not in self.documents:
+                self.documents[renderer_class] = SchemaDocument(render_schema(self.schema, renderer_class))
+            return self.documents[renderer_class]
+
+
+precomputed_schema = PrecomputedSchema()
+
+
+class PrecomputedSchemaView(SpectacularAPIView):
+    """
+    `SpectacularAPIView` serving the precomputed schema when `API_SCHEMA_PRECOMPUTED`. The schema of another
+    language or version (`lang` or `version` parameters) is still generated on each request.
+    """
+
+    def is_precomputed(self, request):
+        if not getattr(settings, 'API_SCHEMA_PRECOMPUTED', True):
+            return False
+        # Views configured for another schema
+        if self.api_version or self.custom_settings or self.urlconf or self.patterns:
+            return False
+        return not (request.GET.get('lang') or request.GET.get('version'))
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if not self.is_precomputed(request):
+            return super(PrecomputedSchemaView, self).get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        document = precomputed_schema.get_document(type(renderer))
+        encoding = document.choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        etag = document.get_etag(encoding)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = '%s; charset=%s' % (content_type, renderer.charset)
+            response = HttpResponse(document.variants[encoding], content_type=content_type)
+            response['Content-Disposition'] = 'inline; filename="%s"' % self._get_filename(request, None)
+            if encoding != IDENTITY:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+        return response
@@ -1,19 +1,174 @@
 from django.contrib.auth.models import User
-from rest_framework import serializers
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.duration import duration_string
+from rest_framework import ISO_8601, serializers
 from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.hashing import hash_password
+from core.instrumentation import timer
+
+# Internal types of the model fields whose values are returned by the database as `str`/`int`
+PASSTHROUGH_TYPES = {
+    'CharField', 'TextField', 'SlugField', 'EmailField', 'URLField', 'IntegerField', 'BigIntegerField',
+    'SmallIntegerField', 'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+    'AutoField', 'BigAutoField', 'SmallAutoField',
+}
 
 
 class UserSerializer(serializers.ModelSerializer):
-    """Serializer for User objects"""
+    """
+    Serializer for User objects, a new user gets its API token. The password is hashed in the pool of
+    `core.hashing`, or already hashed by the caller and passed as `serializer.save(password_hash=...)`.
+    """
+    token = serializers.CharField(source='auth_token.key', read_only=True, help_text='API token of the user')
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'password']
+        fields = ['id', 'username', 'password', 'token']
         extra_kwargs = {'password': {'write_only': True}}
 
     def create(self, validated_data):
-        user = User(username=validated_data['username'])
-        user.set_password(validated_data['password'])
-        user.save()
-        Token.objects.create(user=user)
+        password = validated_data.get('password_hash') or hash_password(validated_data['password'])
+        with transaction.atomic():
+            user = User.objects.create(username=validated_data['username'], password=password)
+            # Cached as `user.auth_token`, the token is serialized without querying it
+            Token.objects.create(user=user)
         return user
+
+
+class FieldSelectionMixin:
+    """
+    Serializer mixin taking a `fields` argument with the names of the fields to keep, e.g. the sparse fieldset
+    requested by the client (see `core.fieldsets`). The other fields are removed from the serializer.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super(FieldSelectionMixin, self).__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer building the representation of a `ModelSerializer` straight from `.values()` rows.
+
+    The fields of `serializer_class` are resolved once into (name, lookup, converter) columns. Rows are
+    converted a column at a time: strings and integers are passed through, durations are formatted once per
+    distinct value and datetimes with the rules of `DateTimeField`, so the output is identical to the one of
+    `serializer_class`. Other field types fall back to their `to_representation`.
+
+    Fetch the rows with `queryset.values(*SerializerClass.get_lookups())`. Like `FieldSelectionMixin`, the
+    `fields` argument keeps only some fields, read from `queryset.values(*SerializerClass.get_lookups(fields))`.
+    """
+    serializer_class = None
+    _columns = None
+
+    def __new__(cls, *args, **kwargs):
+        # `many` is handled by the serializer itself, instead of a `ListSerializer` of children
+        return serializers.Field.__new__(cls, *args, **kwargs)
+
+    def __init__(self, instance=None, many=False, fields=None, **kwargs):
+        # Arguments of the write path (e.g. `data`, `partial`) are not supported
+        super(ValuesSerializer, self).__init__(instance=instance, context=kwargs.get('context'))
+        self.many = many
+        self.columns = self.get_columns(fields)
+
+    @classmethod
+    def get_columns(cls, fields=None):
+        """
+        :param fields: Names of the fields to keep, or None for every readable field
+        :return: List with the (name, lookup, field) of the readable fields of `serializer_class`
+        """
+        if fields is not None:
+            return [column for column in cls.get_columns() if column[0] in fields]
+        if cls.__dict__.get('_columns') is None:
+            columns = []
+            for name, field in cls.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                unsupported = (serializers.SerializerMethodField, serializers.BaseSerializer)
+                if field.source == '*' or isinstance(field, unsupported):
+                    raise ImproperlyConfigured(
+                        '%s cannot read the field "%s" from `.values()` rows.' % (cls.__name__, name)
+                    )
+                columns.append((name, '__'.join(field.source_attrs), field))
+            cls._columns = columns
+        return cls._columns
+
+    @classmethod
+    def get_lookups(cls, fields=None):
+        """
+        :param fields: Names of the fields to keep, or None for every readable field
+        :return: List with the lookups to be passed to `QuerySet.values`
+        """
+        return list(dict.fromkeys(lookup for name, lookup, field in cls.get_columns(fields)))
+
+    @staticmethod
+    def get_converter(field):
+        """
+        :return: Function converting the non null values of a column, or None when they are used as they are
+        """
+        if isinstance(field, (serializers.CharField, serializers.IntegerField)) and not field.source_attrs[1:]:
+            # `str`/`int` of what the database returned for a text/integer column
+            model_field = field.parent.Meta.model._meta.get_field(field.source_attrs[0])
+            if model_field.get_internal_type() in PASSTHROUGH_TYPES:
+                return None
+        if type(field) is serializers.ReadOnlyField:
+            return None
+        if isinstance(field, serializers.DurationField):
+            return duration_string
+        if isinstance(field, serializers.DateTimeField):
+            return get_datetime_converter(field)
+        return field.to_representation
+
+    def convert_rows(self, rows):
+        names = [name for name, lookup, field in self.columns]
+        columns = []
+        for name, lookup, field in self.columns:
+            values = [row[lookup] for row in rows]
+            convert = self.get_converter(field)
+            if convert is duration_string:
+                # Durations repeat a lot, format each distinct value once
+                formatted = {value: duration_string(value) for value in set(values) if value is not None}
+                values = [None if value is None else formatted[value] for value in values]
+            elif convert is not None:
+                values = [None if value is None else convert(value) for value in values]
+            columns.append(values)
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+    def to_representation(self, instance):
+        return self.convert_rows([instance])[0]
+
+    @property
+    def data(self):
+        if not hasattr(self, '_data'):
+            with timer('serialize'):
+                if self.many:
+                    self._data = self.convert_rows(list(self.instance))
+                else:
+                    self._data = self.to_representation(self.instance)
+        return ReturnList(self._data, serializer=self) if self.many else ReturnDict(self._data, serializer=self)
+
+
+def get_datetime_converter(field):
+    """
+    Converter of `DateTimeField` for aware datetimes in ISO 8601, the other cases use `to_representation`
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, str) or not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
@@ -0,0 +1,26 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token_cache(sender, instance, **kwargs):
+    """Remove the token from the authentication cache"""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_token_cache(sender, instance, update_fields=None, **kwargs):
+    """Remove the tokens of the user from the authentication cache, e.g. when the user is deactivated"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    token_cache.delete_user(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_token_cache(sender, instance, **kwargs):
+    token_cache.delete_user(instance.pk)
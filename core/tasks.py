@@ -0,0 +1,196 @@
+"""
+Task queue backed by the database: the side effects of a write too slow for its request (e.g. the ingredient
+index of a saved recipe) are stored as `Task` rows in the transaction of the write, and run once it is committed
+by the worker processes of the `run_tasks` command. No broker is needed, the database is the queue.
+
+A worker claims the oldest due task with the due tasks of the same name, up to the `batch_size` of the task,
+and runs them with a single call of the task, in a transaction that also deletes them. When the batch fails,
+its tasks are run one at a time, and the failing ones are retried after a delay doubled at each attempt, then
+kept as `failed` after `max_attempts`. The claimed tasks are leased for `TASK_LEASE_SECONDS`: the tasks of a
+worker that died are claimed again by another one, so the tasks must be idempotent.
+
+A task added with an idempotency key is left out while another pending task has the key, e.g. a recipe saved
+many times before the workers get to it is indexed once.
+"""
+import logging
+import time
+import traceback
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+# Registered tasks by name, see `task`
+TASKS = {}
+
+
+class TaskType:
+    """
+    Function run by the workers
+    :param name: Name of the task, e.g. `recipe.index_ingredients`
+    :param func: Function receiving the list with the payloads of a batch of tasks
+    :param batch_size: Maximum number of tasks run by a single call of `func`
+    :param max_attempts: Number of runs of a failing task before it is kept as failed
+    :param retry_delay: Seconds before the first retry of a failing task, doubled at each attempt
+    """
+
+    def __init__(self, name, func, batch_size=100, max_attempts=5, retry_delay=10):
+        self.name = name
+        self.func = func
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def get_retry_delay(self, attempts):
+        return timezone.timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))
+
+
+def task(name, **options):
+    """
+    Decorator registering a task, in a module imported when the app is ready (e.g. by its signals)
+    :param options: Options of `TaskType`
+    """
+    def decorator(func):
+        TASKS[name] = TaskType(name, func, **options)
+        return func
+    return decorator
+
+
+def is_enabled():
+    """
+    :return: Whether the side effects are deferred to the workers, else they are run in the request
+    """
+    return getattr(settings, 'TASK_QUEUE_ENABLED', False)
+
+
+def enqueue(name, payloads, keys=None, delay=0):
+    """
+    Add tasks to the queue, in the transaction of the caller: they are not run before it is committed, and
+    not at all when it is rolled back
+    :param name: Name of the registered task
+    :param payloads: List with the JSON-serializable payloads, one task each
+    :param keys: List with the idempotency keys of the payloads, None for no key
+    :param delay: Seconds before the tasks are run
+    """
+    if name not in TASKS:
+        raise LookupError('Unknown task %r' % name)
+    run_after = timezone.now() + timezone.timedelta(seconds=delay)
+    tasks = []
+    seen = set()
+    for payload, key in zip(payloads, keys or [None] * len(payloads)):
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        tasks.append(Task(name=name, payload=payload, key=key, run_after=run_after))
+    # The tasks whose key is pending are left out by the unique constraint
+    Task.objects.bulk_create(tasks, ignore_conflicts=True)
+
+
+class Worker:
+    """
+    Run the due tasks of the queue, see the module docstring
+    :param lease: Seconds a claimed task is reserved to the worker, longer than the run of a batch
+    """
+
+    def __init__(self, lease=None):
+        self.id = uuid.uuid4().hex
+        self.lease = lease if lease is not None else settings.TASK_LEASE_SECONDS
+        self.stopped = False
+
+    def get_due_tasks(self, now):
+        # Pending, or claimed by a worker whose lease expired
+        return Task.objects.filter(
+            Q(status=Task.PENDING) | Q(status=Task.RUNNING, locked_until__lt=now), run_after__lte=now,
+        )
+
+    def claim(self):
+        """
+        Claim the oldest due task, with the due tasks of the same name up to its batch size
+        :return: List with the claimed tasks, empty when no task is due
+        """
+        now = timezone.now()
+        due = self.get_due_tasks(now)
+        name = due.order_by('id').values_list('name', flat=True).first()
+        if name is None:
+            return []
+        task_type = TASKS.get(name)
+        batch_size = task_type.batch_size if task_type is not None else 1
+        ids = list(due.filter(name=name).order_by('id').values_list('id', flat=True)[:batch_size])
+        # The tasks claimed by another worker meanwhile are no longer due, the UPDATE leaves them out
+        due.filter(id__in=ids).update(
+            status=Task.RUNNING, locked_by=self.id, locked_until=now + timezone.timedelta(seconds=self.lease),
+            attempts=F('attempts') + 1,
+        )
+        return list(Task.objects.filter(id__in=ids, status=Task.RUNNING, locked_by=self.id))
+
+    def run_batch(self, tasks):
+        task_type = TASKS.get(tasks[0].name)
+        try:
+            with transaction.atomic():
+                if task_type is None:
+                    raise LookupError('Unknown task %r' % tasks[0].name)
+                task_type.func([task.payload for task in tasks])
+                Task.objects.filter(id__in=[task.id for task in tasks], locked_by=self.id).delete()
+        except Exception as exc:
+            if len(tasks) > 1:
+                # Each task on its own, so only the failing ones are retried
+                for task in tasks:
+                    self.run_batch([task])
+                return
+            self.fail(tasks[0], task_type, exc)
+
+    def fail(self, task, task_type, exc):
+        logger.warning('Task %s failed (attempt %d)', task, task.attempts, exc_info=exc)
+        updates = {'status': Task.FAILED}
+        if task_type is not None and task.attempts < task_type.max_attempts:
+            run_after = timezone.now() + task_type.get_retry_delay(task.attempts)
+            updates = {'status': Task.PENDING, 'run_after': run_after}
+        tasks = Task.objects.filter(id=task.id, locked_by=self.id)
+        try:
+            with transaction.atomic():
+                tasks.update(
+                    locked_by=None, locked_until=None, last_error=''.join(traceback.format_exception(exc)), **updates,
+                )
+        except IntegrityError:
+            # Another pending task has the key, it does the same work
+            tasks.delete()
+
+    def run_pending(self, limit=None):
+        """
+        Run the due tasks until none is left
+        :param limit: Maximum number of batches, None for no limit
+        :return: Number of tasks run, including the failed ones
+        """
+        count = 0
+        batches = 0
+        while not self.stopped and (limit is None or batches < limit):
+            tasks = self.claim()
+            if not tasks:
+                break
+            self.run_batch(tasks)
+            count += len(tasks)
+            batches += 1
+        return count
+
+    def run(self, poll_interval=None):
+        """
+        Run the tasks as they are due, until `stop` is called
+        :param poll_interval: Seconds waited when no task is due
+        """
+        poll_interval = poll_interval if poll_interval is not None else settings.TASK_POLL_INTERVAL
+        while not self.stopped:
+            # As between requests, the connections that failed or outlived `CONN_MAX_AGE` are closed
+            close_old_connections()
+            if not self.run_pending():
+                time.sleep(poll_interval)
+
+    def stop(self, *args):
+        """Stop after the batch being run, usable as a signal handler"""
+        self.stopped = True
@@ -1,3 +1,723 @@
-from django.test import TestCase
+import datetime
+import decimal
+import gzip
+import io
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import yaml
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import path
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import parsers, renderers
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+
+from core import views
+from core.async_views import async_create_view
+from core.authentication import CachedTokenAuthentication, token_cache
+from core.batching import WriteBatcher
+from core.benchmarking import BenchmarkContext, BenchmarkError, Scenario, compare_results, run_scenario
+from core.cache import is_shared_cache
+from core.checks import check_shared_cache, check_task_queue_cache
+from core.db import configure_sqlite
+from core.fieldsets import parse_field_list
+from core.hashing import get_pool
+from core.instrumentation import endpoint_stats
+from core.models import Task
+from core.parsers import JSONParser
+from core.query_plans import QueryPlanRecorder, find_plan_issues
+from core.renderers import JSONRenderer
+from core.routers import ReplicaRouter, read_replica
+from core.schema import generate_schema, parse_accept_encoding, precomputed_schema, render_schema
+from core.serializers import FieldSelectionMixin, UserSerializer
+from core.tasks import TASKS, TaskType, Worker, enqueue
+from core.utils import percentile
+
+
+class TestCachedTokenAuthentication(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.authentication = CachedTokenAuthentication()
+        self.user = User.objects.create_user(username='testchef', password='testpassword')
+        self.token = Token.objects.create(user=self.user)
+
+    def test_cached_lookup(self):
+        with self.assertNumQueries(1):
+            user, token = self.authentication.authenticate_credentials(self.token.key)
+        self.assertEqual((user, token), (self.user, self.token))
+        with self.assertNumQueries(0):
+            cached_user, _ = self.authentication.authenticate_credentials(self.token.key)
+        self.assertEqual(cached_user, self.user)
+        # Every request gets its own copy of the user
+        self.assertIsNot(cached_user, user)
+
+    def test_invalid_token(self):
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials('invalid')
+        self.assertEqual(len(token_cache), 0)
+
+    def test_invalidation_on_token_delete(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_invalidation_on_user_change(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_last_login_keeps_the_cache(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_invalidation_on_user_delete(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_invalidation_during_lookup(self):
+        lookup = TokenAuthentication.authenticate_credentials
+
+        def deactivate_during_lookup(authentication, key):
+            result = lookup(authentication, key)
+            self.user.is_active = False
+            self.user.save()
+            return result
+
+        with mock.patch.object(TokenAuthentication, 'authenticate_credentials', deactivate_during_lookup):
+            self.authentication.authenticate_credentials(self.token.key)
+        # The user read before the change is not cached
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    @override_settings(AUTH_TOKEN_CACHE_TTL=60)
+    def test_time_to_live(self):
+        with mock.patch('core.authentication.time.monotonic', return_value=1000):
+            self.authentication.authenticate_credentials(self.token.key)
+        with mock.patch('core.authentication.time.monotonic', return_value=1059), self.assertNumQueries(0):
+            self.authentication.authenticate_credentials(self.token.key)
+        with mock.patch('core.authentication.time.monotonic', return_value=1061), self.assertNumQueries(1):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    @override_settings(AUTH_TOKEN_CACHE_SIZE=2)
+    def test_bounded_size(self):
+        tokens = [self.token] + [
+            Token.objects.create(user=User.objects.create_user(username='chef%d' % i)) for i in range(2)
+        ]
+        for token in tokens:
+            self.authentication.authenticate_credentials(token.key)
+        self.assertEqual(len(token_cache), 2)
+        # The least recently used token was evicted
+        self.assertIsNone(token_cache.get(tokens[0].key))
+        self.assertIsNotNone(token_cache.get(tokens[2].key))
+
+    def test_api_request(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = 'Token ' + self.token.key
+        self.client.get('/recipes/')
+        # The page is read from the database, without the feed of `recipe.feed`
+        with override_settings(API_CACHE_ENABLED=False, RECIPE_FEED_SIZE=0), self.assertNumQueries(1):
+            response = self.client.get('/recipes/')
+        self.assertEqual(response.status_code, 200)
+
+
+class TestBenchmarking(TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50.5)
+        self.assertAlmostEqual(percentile(values, 99), 99.01)
+        self.assertEqual(percentile([3], 99), 3)
+        self.assertIsNone(percentile([], 50))
+
+    def test_run_scenario(self):
+        context = BenchmarkContext(self.client)
+        scenario = Scenario('users', 'Count the users', lambda context: lambda iteration: User.objects.count())
+        result = run_scenario(scenario, context, iterations=5, warmup=1, memory_iterations=1)
+        self.assertEqual(result['iterations'], 5)
+        self.assertEqual(result['queries_per_request'], 1)
+        self.assertGreater(result['p99_ms'], 0)
+        self.assertGreaterEqual(result['p99_ms'], result['p50_ms'])
+        self.assertGreater(result['per_second'], 0)
+
+        batch = Scenario('batch', '', lambda context: lambda iteration: User.objects.count(), operations=10)
+        result = run_scenario(batch, context, iterations=5, warmup=0, memory_iterations=0)
+        self.assertAlmostEqual(result['per_second'], 10 * 1000 / result['mean_ms'])
+
+    def test_failed_request(self):
+        context = BenchmarkContext(self.client)
+        scenario = Scenario('missing', '', lambda context: lambda iteration: context.client.get('/missing/'))
+        with self.assertRaises(BenchmarkError):
+            run_scenario(scenario, context, iterations=1, warmup=0)
+
+    def test_compare_results(self):
+        changes = compare_results(
+            {'a': {'p50_ms': 12}, 'b': {'p50_ms': 5}, 'c': {'p50_ms': 1}},
+            {'a': {'p50_ms': 10}, 'b': {'p50_ms': 10}},
+        )
+        self.assertEqual(changes, {'a': 0.19999999999999996, 'b': -0.5})
+
+
+@override_settings(API_CACHE_ENABLED=False, RECIPE_FEED_SIZE=0, REQUEST_SERVER_TIMING=True)
+class TestRequestMetrics(TestCase):
+    def setUp(self):
+        endpoint_stats.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='testpassword')
+
+    def server_timing(self, response):
+        return dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+
+    def test_server_timing(self):
+        response = self.client.get('/recipes/')
+        timing = self.server_timing(response)
+        self.assertEqual(timing['db'].split(';desc=')[1], '"1 queries"')
+        self.assertEqual(sorted(timing), ['db', 'filter', 'render', 'serialize', 'total'])
+
+    @override_settings(REQUEST_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/recipes/'))
+
+    def test_stats(self):
+        for _ in range(3):
+            self.client.get('/recipes/')
+        self.client.get('/recipes/0/')
+        self.assertEqual(self.client.get('/stats/requests/').status_code, 401)
+        self.client.force_login(User.objects.create_user(username='testchef', password='testpassword'))
+        self.assertEqual(self.client.get('/stats/requests/').status_code, 403)
+
+        self.client.force_login(self.admin)
+        stats = self.client.get('/stats/requests/').json()
+        self.assertEqual(stats['GET recipe-list']['count'], 3)
+        self.assertEqual(stats['GET recipe-list']['queries']['p50'], 1)
+        self.assertGreater(stats['GET recipe-list']['response_bytes']['max'], 0)
+        self.assertEqual(stats['GET recipe-detail']['count'], 1)
+
+        self.assertEqual(self.client.delete('/stats/requests/').status_code, 204)
+        # Only the reset itself was recorded since
+        self.assertEqual(list(self.client.get('/stats/requests/').json()), ['DELETE request-stats'])
+
+    @override_settings(REQUEST_STATS_WINDOW=2)
+    def test_stats_window(self):
+        for _ in range(3):
+            self.client.get('/recipes/')
+        stats = endpoint_stats.snapshot()['GET recipe-list']
+        self.assertEqual((stats['count'], stats['window']), (3, 2))
+
+    @override_settings(REQUEST_SLOW_THRESHOLD_MS=0)
+    def test_slow_request_log(self):
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.client.get('/recipes/')
+        self.assertIn('Slow request GET /recipes/', logs.output[0])
+        self.assertIn('1 queries', logs.output[0])
+        self.assertIn('FROM "recipe_recipe"', logs.output[0])
+
+    @override_settings(REQUEST_SLOW_THRESHOLD_MS=None)
+    def test_slow_request_log_disabled(self):
+        with mock.patch('core.instrumentation.logger.warning') as warning:
+            self.client.get('/recipes/')
+        warning.assert_not_called()
+
+
+class TestJSONRendererAndParser(SimpleTestCase):
+    utc_minus_3 = datetime.timezone(datetime.timedelta(hours=-3))
+    data = OrderedDict([
+        ('results', [{
+            'id': 1,
+            'name': 'Crème brûlée \u2028 \u2029 "quoted"',
+            'created_at': datetime.datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc),
+            'updated_at': datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=utc_minus_3),
+            'naive': datetime.datetime(2024, 1, 2, 3, 4, 5),
+            'date': datetime.date(2024, 1, 2),
+            'time': datetime.time(3, 4, 5, 600),
+            'prep_time': datetime.timedelta(minutes=45, microseconds=10),
+            'cook_time': datetime.timedelta(days=1),
+            'price': decimal.Decimal('1.50'),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'lazy': gettext_lazy('Not found.'),
+            'nested': OrderedDict([(1, None), ('b', [True, False, 1.5, -0.25])]),
+            'empty': {},
+        }]),
+        ('next', None),
+    ])
+
+    def test_same_output_as_drf(self):
+        expected = renderers.JSONRenderer().render(self.data)
+        self.assertEqual(JSONRenderer().render(self.data), expected)
+        self.assertIn(b'\\u2028', expected)
+
+    def test_fallbacks(self):
+        for data, media_type in [
+            (self.data, 'application/json; indent=4'),
+            ({'big': 2 ** 70}, None),
+            (None, None),
+        ]:
+            self.assertEqual(
+                JSONRenderer().render(data, media_type), renderers.JSONRenderer().render(data, media_type)
+            )
+        with mock.patch('core.renderers.orjson', None):
+            self.assertEqual(JSONRenderer().render(self.data), renderers.JSONRenderer().render(self.data))
+
+    def parse(self, parser, content):
+        return parser.parse(io.BytesIO(content), 'application/json', {})
+
+    def test_parser(self):
+        content = '{"name": "Crème", "servings": 4, "ratio": 0.5, "items": [null, true], "big": %d}' % 2 ** 70
+        self.assertEqual(
+            self.parse(JSONParser(), content.encode()), self.parse(parsers.JSONParser(), content.encode())
+        )
+        for content in [b'{"a": ', b'{"a": NaN}']:
+            with self.assertRaises(ParseError):
+                self.parse(JSONParser(), content)
+        # Rejected by orjson, parsed by DRF without `STRICT_JSON`
+        parser = JSONParser()
+        parser.strict = False
+        self.assertEqual(self.parse(parser, b'{"a": NaN}').keys(), {'a'})
+        with mock.patch('core.parsers.orjson', None):
+            self.assertEqual(self.parse(JSONParser(), b'{"a": [1]}'), {'a': [1]})
+
+
+class TestQueryPlans(TestCase):
+    def test_recorder(self):
+        User.objects.create_user(username='chef')
+        with QueryPlanRecorder() as recorder:
+            self.assertEqual(User.objects.filter(username='chef').count(), 1)
+            User.objects.create_user(username='other')
+        # Only the SELECTs are explained
+        self.assertEqual(len(recorder.plans), 1)
+        sql, plan = recorder.plans[0]
+        self.assertIn('"auth_user"."username" = %s', sql)
+        self.assertTrue(any('auth_user' in line for line in plan))
+        self.assertEqual(find_plan_issues('sqlite', sql, plan), [])
+
+    def test_sqlite_issues(self):
+        plan = [
+            'SCAN recipe_recipe',
+            'SCAN auth_user USING COVERING INDEX sqlite_autoindex_auth_user_1',
+            'SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)',
+            'LIST SUBQUERY 1',
+            '  SCAN recipe_recipe_fts VIRTUAL TABLE INDEX 0:M3',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        self.assertEqual(find_plan_issues('sqlite', 'SELECT 1 LIMIT 21', plan), [
+            'full scan of recipe_recipe',
+            'full scan of auth_user using index sqlite_autoindex_auth_user_1',
+            'temp b-tree for ORDER BY',
+        ])
+        # A limited query read in the order of the index stops after the first rows
+        plan = ['SCAN recipe_recipe USING INDEX recipe_ordering_idx']
+        self.assertEqual(find_plan_issues('sqlite', 'SELECT 1 LIMIT 21', plan), [])
+        self.assertEqual(find_plan_issues('sqlite', 'SELECT 1', plan), [
+            'full scan of recipe_recipe using index recipe_ordering_idx',
+        ])
+
+    def test_postgresql_issues(self):
+        plan = [
+            'Limit  (cost=10.30..10.35 rows=21 width=100)',
+            '  ->  Sort  (cost=10.30..10.40 rows=40 width=100)',
+            '        Sort Key: recipe_recipe.created_at DESC',
+            '        ->  Hash Join  (cost=1.10..9.20 rows=40 width=100)',
+            '              ->  Seq Scan on recipe_recipe  (cost=0.00..7.40 rows=40 width=92)',
+            '              ->  Index Scan using auth_user_pkey on auth_user  (cost=0.15..8.17 rows=1 width=8)',
+        ]
+        self.assertEqual(find_plan_issues('postgresql', 'SELECT 1', plan), ['sort', 'full scan of recipe_recipe'])
+        with self.assertRaises(ValueError):
+            find_plan_issues('oracle', 'SELECT 1', plan)
+
+
+class TestFieldSelection(SimpleTestCase):
+    def test_parse_field_list(self):
+        self.assertEqual(parse_field_list(['id, name', 'servings,,']), ['id', 'name', 'servings'])
+        self.assertEqual(parse_field_list(['']), [])
+
+    def test_serializer_fields(self):
+        class SelectableUserSerializer(FieldSelectionMixin, UserSerializer):
+            pass
+
+        user = User(id=1, username='chef')
+        # Cached as `user.auth_token`
+        Token(key='token', user=user)
+        self.assertEqual(SelectableUserSerializer(user).data, {'id': 1, 'username': 'chef', 'token': 'token'})
+        self.assertEqual(SelectableUserSerializer(user, fields=['username']).data, {'username': 'chef'})
+        serializer = SelectableUserSerializer([user], fields=['id'], many=True)
+        self.assertEqual(serializer.data, [{'id': 1}])
+
+
+class AsyncSignupURLConf:
+    urlpatterns = [path('chefs/create/', async_create_view(views.ChefCreateView))]
+
+
+@override_settings(PASSWORD_HASHER_PROFILE='test')
+class TestChefSignup(TestCase):
+    def setUp(self):
+        self.url = '/chefs/create/'
+        # Creating users needs `auth.add_user`, see `DjangoModelPermissionsOrAnonReadOnly`
+        self.client.force_login(User.objects.create_superuser(username='admin', password='adminpassword'))
+
+    def assertSignedUp(self, response, username):
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(username=username)
+        self.assertEqual(response.json(), {'id': user.id, 'username': username, 'token': user.auth_token.key})
+        self.assertTrue(user.check_password('chefpassword'))
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_signup(self):
+        with self.captureOnCommitCallbacks(), mock.patch('core.hashing.make_password', wraps=make_password) as hashed:
+            response = self.client.post(self.url, {'username': 'chef', 'password': 'chefpassword'})
+        self.assertSignedUp(response, 'chef')
+        # Hashed in the pool
+        self.assertEqual(hashed.call_count, 1)
+
+        response = self.client.post(self.url, {'username': 'chef', 'password': 'chefpassword'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('username', response.json())
+
+    def test_token_not_queried(self):
+        # Session and user of the admin, uniqueness of the username, inserts of the user and the token in a savepoint
+        with self.assertNumQueries(7) as context:
+            response = self.client.post(self.url, {'username': 'chef', 'password': 'chefpassword'})
+        self.assertEqual(response.status_code, 201)
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertFalse([sql for sql in queries if sql.startswith('SELECT') and 'authtoken_token' in sql])
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_MAX_PENDING=0)
+    def test_busy_pool(self):
+        release = threading.Event()
+        with mock.patch('core.hashing.make_password', side_effect=lambda password: release.wait(5)):
+            pending = get_pool().submit('password')
+            response = self.client.post(self.url, {'username': 'chef', 'password': 'chefpassword'})
+            release.set()
+            pending.result()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(User.objects.filter(username='chef').exists())
+
+        response = self.client.post(self.url, {'username': 'chef', 'password': 'chefpassword'})
+        self.assertSignedUp(response, 'chef')
+
+    @override_settings(ROOT_URLCONF=AsyncSignupURLConf)
+    def test_async_signup(self):
+        error = AssertionError('Served by the sync action')
+        with mock.patch.object(views.ChefCreateView, 'create', side_effect=error):
+            response = self.client.post(self.url, {'username': 'chef', 'password': 'chefpassword'})
+            self.assertSignedUp(response, 'chef')
+            response = self.client.post(self.url, {'username': 'chef', 'password': 'chefpassword'})
+            self.assertEqual(response.status_code, 400)
+
+            self.client.logout()
+            response = self.client.post(self.url, {'username': 'other', 'password': 'chefpassword'})
+            self.assertIn(response.status_code, (401, 403))
+
+    def test_hasher_profiles(self):
+        self.assertTrue(make_password('password').startswith('pbkdf2_sha256$1000$'))
+        with self.settings(PASSWORD_HASHER_PROFILE='owasp'):
+            self.assertTrue(make_password('password').startswith('pbkdf2_sha256$600000$'))
+        with self.settings(PASSWORD_HASHER_PROFILE='default'):
+            self.assertTrue(make_password('password').startswith('pbkdf2_sha256$720000$'))
+        with self.settings(PASSWORD_HASHER_PROFILE='unknown'):
+            with self.assertRaises(ImproperlyConfigured):
+                make_password('password')
+
+        # Hashes with another cost are checked, and updated to the cost of the profile
+        user = User.objects.create(username='chef', password=make_password('password'))
+        with self.settings(PASSWORD_HASHER_PROFILE='owasp'):
+            self.assertTrue(user.check_password('password'))
+        self.assertTrue(User.objects.get(id=user.id).password.startswith('pbkdf2_sha256$600000$'))
+
+
+class TestWriteBatcher(SimpleTestCase):
+    def setUp(self):
+        self.batches = []
+
+    def flush(self, items):
+        self.batches.append(list(items))
+        if 'invalid' in items:
+            raise ValueError('invalid item')
+        return [item.upper() for item in items]
+
+    def submit_concurrently(self, batcher, items):
+        results = {}
+
+        def submit(item):
+            try:
+                results[item] = batcher.submit(item)
+            except ValueError as exc:
+                results[item] = exc
+
+        threads = [threading.Thread(target=submit, args=(item,)) for item in items]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_single_item(self):
+        batcher = WriteBatcher(self.flush, max_wait=0)
+        self.assertEqual(batcher.submit('a'), 'A')
+        self.assertEqual(self.batches, [['a']])
+        self.assertIsNone(batcher.batch)
+
+    def test_concurrent_items_are_batched(self):
+        # The window is long enough for every thread to join the batch, which is written as soon as it is full
+        batcher = WriteBatcher(self.flush, max_size=4, max_wait=10)
+        results = self.submit_concurrently(batcher, ['a', 'b', 'c', 'd'])
+        self.assertEqual(results, {'a': 'A', 'b': 'B', 'c': 'C', 'd': 'D'})
+        self.assertEqual(len(self.batches), 1)
+        self.assertCountEqual(self.batches[0], ['a', 'b', 'c', 'd'])
+
+    def test_max_size(self):
+        batcher = WriteBatcher(self.flush, max_size=2, max_wait=10)
+        results = self.submit_concurrently(batcher, ['a', 'b', 'c', 'd'])
+        self.assertEqual(len(results), 4)
+        self.assertEqual([len(batch) for batch in self.batches], [2, 2])
+
+    def test_failing_item(self):
+        batcher = WriteBatcher(self.flush, max_size=3, max_wait=10)
+        results = self.submit_concurrently(batcher, ['a', 'invalid', 'b'])
+        # The batch fails, then each item is written on its own
+        self.assertEqual(len(self.batches), 4)
+        self.assertEqual(results['a'], 'A')
+        self.assertEqual(results['b'], 'B')
+        self.assertIsInstance(results['invalid'], ValueError)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite pragmas')
+class TestSQLitePragmas(TestCase):
+    def get_pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA %s' % name)
+            return cursor.fetchone()[0]
+
+    def test_default_connection(self):
+        self.assertEqual(self.get_pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.get_pragma(connection, 'busy_timeout'), 5000)
+        self.assertEqual(self.get_pragma(connection, 'temp_store'), 2)
+
+    def test_new_connection(self):
+        new_connection = connections.create_connection('default')
+        try:
+            with self.settings(SQLITE_PRAGMAS={'cache_size': -1000, 'busy_timeout': 100}):
+                new_connection.ensure_connection()
+            self.assertEqual(self.get_pragma(new_connection, 'cache_size'), -1000)
+            self.assertEqual(self.get_pragma(new_connection, 'busy_timeout'), 100)
+        finally:
+            new_connection.close()
+
+    def test_other_vendor(self):
+        other = mock.Mock(vendor='postgresql')
+        configure_sqlite(sender=None, connection=other)
+        other.connection.execute.assert_not_called()
+
+
+class TestSharedCacheCheck(SimpleTestCase):
+    local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    shared = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}
+
+    def test_single_process(self):
+        with self.settings(CACHES=self.local, WEB_CONCURRENCY=1):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_several_processes(self):
+        with self.settings(CACHES=self.local, WEB_CONCURRENCY=4):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['core.W001'])
+        with self.settings(CACHES=self.shared, WEB_CONCURRENCY=4):
+            self.assertTrue(is_shared_cache())
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_task_queue(self):
+        with self.settings(CACHES=self.local, TASK_QUEUE_ENABLED=True):
+            self.assertEqual([error.id for error in check_task_queue_cache(None)], ['core.E001'])
+            with self.settings(API_CACHE_ENABLED=False):
+                self.assertEqual(check_task_queue_cache(None), [])
+        with self.settings(CACHES=self.shared, TASK_QUEUE_ENABLED=True):
+            self.assertEqual(check_task_queue_cache(None), [])
+
+
+@override_settings(DATABASE_REPLICA_ALIASES=['replica_1', 'replica_2'])
+class TestReplicaRouter(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        token = read_replica.set('replica_1')
+        self.addCleanup(read_replica.reset, token)
+
+    def test_db_for_read(self):
+        self.assertEqual(self.router.db_for_read(User), 'replica_1')
+        # Models missing from `DATABASE_REPLICA_MODELS` stay on the primary
+        self.assertIsNone(self.router.db_for_read(Token))
+        user = User(username='chef')
+        user._state.db = 'replica_2'
+        self.assertEqual(self.router.db_for_read(User, instance=user), 'replica_2')
+
+    def test_primary(self):
+        read_replica.set(None)
+        self.assertIsNone(self.router.db_for_read(User))
+        with self.settings(DATABASE_REPLICA_ALIASES=[]):
+            read_replica.set('replica_1')
+            self.assertIsNone(self.router.db_for_read(User))
+
+    def test_db_for_write(self):
+        self.assertEqual(self.router.db_for_write(User), 'default')
+
+
+class TestTaskQueue(TestCase):
+    def setUp(self):
+        self.batches = []
+        tasks = mock.patch.dict(TASKS, {
+            'test.record': TaskType('test.record', self.record, batch_size=3, max_attempts=2, retry_delay=60),
+            'test.other': TaskType('test.other', self.record),
+        })
+        tasks.start()
+        self.addCleanup(tasks.stop)
+        self.worker = Worker(lease=60)
+
+    def record(self, payloads):
+        self.batches.append(payloads)
+        if 'invalid' in payloads:
+            raise ValueError('invalid payload')
+
+    def test_batches_of_the_same_task(self):
+        enqueue('test.record', ['a', 'b'])
+        enqueue('test.other', ['c'])
+        enqueue('test.record', ['d', 'e'])
+        self.assertEqual(self.worker.run_pending(), 5)
+        # The oldest task first, with the other tasks of its name up to the batch size
+        self.assertEqual(self.batches, [['a', 'b', 'd'], ['c'], ['e']])
+        self.assertFalse(Task.objects.exists())
+
+    def test_idempotency_keys(self):
+        enqueue('test.record', ['a', 'b', 'c'], keys=['x', 'y', 'x'])
+        enqueue('test.record', ['d'], keys=['y'])
+        self.assertEqual(list(Task.objects.values_list('payload', flat=True)), ['a', 'b'])
+        self.worker.run_pending()
+        # Once run, the key can be added again
+        enqueue('test.record', ['e'], keys=['x'])
+        self.assertEqual(list(Task.objects.values_list('payload', flat=True)), ['e'])
+
+    def test_unknown_task(self):
+        with self.assertRaises(LookupError):
+            enqueue('test.unknown', ['a'])
+
+    def test_rolled_back_tasks(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            enqueue('test.record', ['a'])
+            raise ValueError
+        self.assertEqual(self.worker.run_pending(), 0)
+
+    def test_retries(self):
+        enqueue('test.record', ['a', 'invalid', 'b'])
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.worker.run_pending()
+        # The batch failed, then each task ran on its own
+        self.assertEqual(self.batches, [['a', 'invalid', 'b'], ['a'], ['invalid'], ['b']])
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts, task.locked_by), (Task.PENDING, 1, None))
+        self.assertIn('invalid payload', task.last_error)
+        self.assertGreater(task.run_after, timezone.now() + timezone.timedelta(seconds=50))
+
+        # Not due before the delay, then failed after its last attempt
+        self.assertEqual(self.worker.run_pending(), 0)
+        Task.objects.update(run_after=timezone.now())
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.worker.run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+        Task.objects.update(run_after=timezone.now())
+        self.assertEqual(self.worker.run_pending(), 0)
+
+    def test_retry_with_a_pending_key(self):
+        enqueue('test.record', ['invalid'], keys=['x'])
+        [task] = self.worker.claim()
+        enqueue('test.record', ['a'], keys=['x'])
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.worker.run_batch([task])
+        # The pending task does the work
+        self.assertEqual(list(Task.objects.values_list('payload', flat=True)), ['a'])
+
+    def test_expired_lease(self):
+        enqueue('test.record', ['a'])
+        self.assertEqual(len(self.worker.claim()), 1)
+        # Claimed by a worker, then free once its lease is over
+        other = Worker(lease=60)
+        self.assertEqual(other.claim(), [])
+        Task.objects.update(locked_until=timezone.now() - timezone.timedelta(seconds=1))
+        self.assertEqual(other.run_pending(), 1)
+        self.assertEqual(self.batches, [['a']])
+        self.assertFalse(Task.objects.exists())
+
+    def test_command(self):
+        enqueue('test.record', ['a'])
+        stdout = io.StringIO()
+        call_command('run_tasks', once=True, stdout=stdout)
+        self.assertIn('Ran 1 tasks', stdout.getvalue())
+        self.assertEqual(self.batches, [['a']])
+
+
+class TestPrecomputedSchema(TestCase):
+    def setUp(self):
+        self.url = '/api/schema/'
+        precomputed_schema.clear()
+
+    def test_served_once_generated(self):
+        with mock.patch('core.schema.generate_schema', wraps=generate_schema) as generate:
+            response = self.client.get(self.url)
+            self.assertEqual(self.client.get(self.url, {'format': 'json'}).json()['paths'].keys(),
+                             yaml.safe_load(response.content)['paths'].keys())
+            self.assertEqual(self.client.get(self.url).content, response.content)
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.oai.openapi; charset=utf-8')
+        self.assertEqual(response.content, render_schema(generate_schema()))
+
+    def test_etag_and_compression(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        compressed = response.content
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(gzip.decompress(compressed), response.content)
+        self.assertNotEqual(self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')['ETag'], response['ETag'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding('gzip, br;q=0.5, deflate;q=0'), {'gzip', 'br'})
+        self.assertEqual(parse_accept_encoding(''), set())
+
+    def test_schema_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.yml') as file:
+            file.write(render_schema(dict(generate_schema(), info={'title': 'From file', 'version': '1'})))
+            file.flush()
+            with override_settings(API_SCHEMA_FILE=file.name), mock.patch('core.schema.generate_schema') as generate:
+                self.assertIn(b'title: From file', self.client.get(self.url).content)
+                self.assertEqual(self.client.get(self.url, {'format': 'json'}).json()['info']['title'], 'From file')
+            generate.assert_not_called()
+
+            with self.assertRaisesMessage(CommandError, 'does not match the code'):
+                call_command('check_schema', file=file.name, stdout=io.StringIO())
+
+    def test_shipped_schema_matches_the_code(self):
+        stdout = io.StringIO()
+        call_command('check_schema', stdout=stdout)
+        self.assertIn('matches the code', stdout.getvalue())
+
+    @override_settings(API_SCHEMA_PRECOMPUTED=False)
+    def test_disabled(self):
+        with mock.patch('core.schema.precomputed_schema') as precomputed:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        precomputed.get_document.assert_not_called()
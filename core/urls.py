@@ -1,7 +1,16 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
+from .async_views import async_create_view
 
 urlpatterns = [
     path('chefs/create/', views.ChefCreateView.as_view(), name='chef-create'),
+    path('stats/requests/', views.RequestStatsView.as_view(), name='request-stats'),
 ]
+
+if settings.CHEF_ASYNC_SIGNUP:
+    # Same route, the signup is served by `ChefCreateView.acreate`
+    urlpatterns = [
+        path('chefs/create/', async_create_view(views.ChefCreateView), name='chef-create'),
+    ] + urlpatterns
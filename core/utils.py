@@ -0,0 +1,13 @@
+def percentile(values, percent):
+    """
+    Percentile of the values, with linear interpolation between the closest ranks
+    :param values: List of numbers
+    :param percent: Percentile, from 0 to 100
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = (len(values) - 1) * percent / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
@@ -1,21 +1,52 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
-from rest_framework import generics
-from rest_framework.authtoken.models import Token
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from .hashing import ahash_password
+from .instrumentation import endpoint_stats
 from .serializers import UserSerializer
 
 
 class ChefCreateView(generics.CreateAPIView):
+    """
+    Signup of a chef, the response contains the API token of the new chef.
+
+    The password is hashed in the bounded pool of `core.hashing`: a request waits for its hash, or gets a 503
+    when too many are waiting. Under ASGI, `acreate` is served instead (see `core.urls`), so the event loop and
+    the thread of the sync views keep serving other requests during the hash.
+    """
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
-    def perform_create(self, serializer):
-        user = serializer.save()
+    async def acreate(self, request, *args, **kwargs):
+        """
+        Same as `create`, the validation and the inserts run in a thread and the hash in the pool
+        """
+        serializer = self.get_serializer(data=request.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        password_hash = await ahash_password(serializer.validated_data['password'])
+        await sync_to_async(serializer.save)(password_hash=password_hash)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+class RequestStatsView(APIView):
+    """
+    Rolling aggregate of the request metrics of each endpoint in this process (wall time, queries,
+    serialize/filter/render time and response size), see `core.instrumentation`
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request, *args, **kwargs):
+        return Response(endpoint_stats.snapshot())
 
-        response_data = {
-            'user_id': user.id,
-            'username': user.username,
-            'token': Token.objects.get(user=user).key
-        }
-        return Response(response_data)
+    @extend_schema(responses={204: None})
+    def delete(self, request, *args, **kwargs):
+        """Reset the stats"""
+        endpoint_stats.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
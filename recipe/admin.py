@@ -1,5 +1,7 @@
 from django.contrib import admin
 
-from recipe.models import Recipe
+from recipe.models import ChefStats, Ingredient, Recipe
 
 admin.site.register(Recipe)
+admin.site.register(Ingredient)
+admin.site.register(ChefStats)
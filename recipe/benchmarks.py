@@ -0,0 +1,343 @@
+"""
+Data generator and benchmark scenarios of the recipe API, see `core.benchmarking`
+"""
+import random
+from functools import partial
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import renderers
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmarking import first_failure, register, run_concurrently
+from core.cache import bump_versions
+from core.renderers import JSONRenderer
+from recipe.cache import RECIPES_SCOPE, chef_scope
+from recipe.feed import drop_feeds
+from recipe.ingredients import index_ingredients
+from recipe.models import Recipe
+from recipe.serializers import RecipeSerializer, RecipeValuesSerializer
+from recipe.stats import rebuild_chef_stats
+
+CHEF_PREFIX = 'chef'
+ADJECTIVES = [
+    'spicy', 'creamy', 'roasted', 'grilled', 'crispy', 'smoky', 'tangy', 'rustic', 'golden', 'fresh', 'sweet',
+    'savory', 'braised', 'baked', 'stuffed', 'glazed',
+]
+DISHES = [
+    'soup', 'stew', 'salad', 'pie', 'bread', 'curry', 'risotto', 'pasta', 'tart', 'cake', 'omelette', 'casserole',
+    'burger', 'taco', 'pudding', 'chowder',
+]
+INGREDIENTS = [
+    'tomato', 'onion', 'garlic', 'carrot', 'potato', 'butter', 'flour', 'egg', 'milk', 'cheese', 'chicken', 'beef',
+    'rice', 'beans', 'pepper', 'salt', 'sugar', 'lemon', 'basil', 'parsley', 'olive oil', 'mushroom', 'spinach',
+    'cream', 'bacon', 'shrimp', 'cod', 'corn', 'pumpkin', 'apple', 'cinnamon', 'ginger', 'chili', 'lime',
+    'coconut milk', 'yogurt', 'honey', 'oats', 'zucchini', 'eggplant',
+]
+UNITS = ['cups of', 'tablespoons of', 'grams of', 'teaspoons of', '']
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore '
+    'magna aliqua'
+).split()
+# Recipes created at the same time by `recipe.create_burst`
+CREATE_BURST = 16
+# Concurrent reading and writing clients of `recipe.read_write`
+READERS = 6
+WRITERS = 2
+
+
+def parse_count(value):
+    """
+    Parse a number of rows with an optional suffix, e.g. `10k`, `100k` or `1M`
+    """
+    multipliers = {'k': 1000, 'm': 1000000}
+    value = str(value).strip()
+    multiplier = multipliers.get(value[-1:].lower(), 1)
+    if multiplier != 1:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+def chef_username(index):
+    return '%s%06d' % (CHEF_PREFIX, index)
+
+
+def generate_recipe(rng, index, chef_id):
+    """
+    :param rng: `random.Random`, so the data is the same on every run
+    :return: Unsaved recipe with realistic text sizes
+    """
+    ingredients = rng.sample(INGREDIENTS, rng.randint(3, 10))
+    return Recipe(
+        name='%s %s %d' % (rng.choice(ADJECTIVES).capitalize(), rng.choice(DISHES), index),
+        description=' '.join(rng.choices(WORDS, k=rng.randint(10, 60))),
+        ingredients='\n'.join(
+            ' '.join(filter(None, [str(rng.randint(1, 4)), rng.choice(UNITS), name])) for name in ingredients
+        ),
+        instructions='\n'.join(
+            '%d. %s' % (step, ' '.join(rng.choices(WORDS, k=rng.randint(8, 20))))
+            for step in range(1, rng.randint(3, 8))
+        ),
+        prep_time=timezone.timedelta(minutes=rng.randint(1, 90)),
+        cook_time=timezone.timedelta(minutes=rng.randint(0, 240)),
+        servings=rng.randint(1, 12),
+        chef_id=chef_id,
+    )
+
+
+def seed_chefs(count, password='benchmark'):
+    """
+    Create the chefs `chef000000`...`chefNNNNNN` that do not exist yet
+    :return: List with the ids of the chefs
+    """
+    usernames = [chef_username(index) for index in range(count)]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    # Hashing is slow on purpose, every chef gets the same hash
+    password = make_password(password)
+    User.objects.bulk_create(
+        [User(username=username, password=password) for username in usernames if username not in existing],
+        batch_size=1000,
+    )
+    return list(User.objects.filter(username__in=usernames).order_by('id').values_list('id', flat=True))
+
+
+def seed_recipes(count, chefs=1000, batch_size=5000, seed=0, stdout=None):
+    """
+    Add `count` generated recipes spread across `chefs` chefs, with their ingredient index
+    :param count: Number of recipes to create
+    :param chefs: Number of chefs
+    :param batch_size: Number of recipes inserted per transaction
+    :param seed: Seed of the generator
+    :param stdout: Stream where the progress is written
+    :return: Number of recipes created
+    """
+    rng = random.Random(seed)
+    chef_ids = seed_chefs(chefs)
+    start = Recipe.objects.count()
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        recipes = [
+            generate_recipe(rng, start + created + index, rng.choice(chef_ids)) for index in range(size)
+        ]
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create(recipes)
+            index_ingredients(recipes, created=True)
+        created += size
+        if stdout is not None:
+            stdout.write('Created %d/%d recipes' % (created, count))
+    # `bulk_create` does not send `post_save`, the new ids were never cached, the stats and feeds were not updated
+    bump_versions([RECIPES_SCOPE] + [chef_scope(chef_id) for chef_id in chef_ids])
+    drop_feeds(chef_ids)
+    for index in range(0, len(chef_ids), 1000):
+        rebuild_chef_stats(chef_ids[index:index + 1000])
+    return created
+
+
+def sample_ids(queryset, size=1000):
+    ids = list(queryset.order_by('?').values_list('id', flat=True)[:size])
+    if not ids:
+        raise ValueError('The benchmarks need seeded data')
+    return ids
+
+
+@register('recipe.list', 'First page of the recipe list')
+def recipe_list(context):
+    return lambda iteration: context.client.get('/recipes/')
+
+
+@register('recipe.list_names', 'First page of the recipe list with only the id and name of the recipes')
+def recipe_list_names(context):
+    return lambda iteration: context.client.get('/recipes/', {'fields': 'id,name'})
+
+
+@register('recipe.list_deep', 'Page of the recipe list reached through the cursor')
+def recipe_list_deep(context):
+    first = context.client.get('/recipes/', {'page_size': 100}).json()
+    cursor = first['next'] or '/recipes/'
+    return lambda iteration: context.client.get(cursor)
+
+
+@register('recipe.filter_name', 'Recipe list filtered by part of the name')
+def recipe_filter_name(context):
+    return lambda iteration: context.client.get('/recipes/', {'name': DISHES[iteration % len(DISHES)]})
+
+
+@register('recipe.filter_chef', 'Recipe list filtered by chef')
+def recipe_filter_chef(context):
+    chefs = list(User.objects.filter(username__startswith=CHEF_PREFIX).values_list('username', flat=True)[:100])
+    return lambda iteration: context.client.get('/recipes/', {'chef_username': chefs[iteration % len(chefs)]})
+
+
+@register('recipe.filter_total_time', 'Recipe list under a total time, quickest first')
+def recipe_filter_total_time(context):
+    return lambda iteration: context.client.get('/recipes/', {
+        'total_time_max': '00:%02d:00' % (15 + iteration % 45), 'ordering': 'total_time',
+    })
+
+
+@register('recipe.filter_ingredients', 'Recipe list filtered by ingredients')
+def recipe_filter_ingredients(context):
+    return lambda iteration: context.client.get('/recipes/', {
+        'all_ingredients': ','.join([INGREDIENTS[iteration % len(INGREDIENTS)], 'salt']),
+    })
+
+
+@register('recipe.search', 'Full-text search on the recipes')
+def recipe_search(context):
+    return lambda iteration: context.client.get('/recipes/', {
+        'q': '%s %s' % (ADJECTIVES[iteration % len(ADJECTIVES)], DISHES[iteration % len(DISHES)]),
+    })
+
+
+@register('recipe.retrieve', 'Detail of a recipe')
+def recipe_retrieve(context):
+    ids = sample_ids(Recipe.objects.all())
+    return lambda iteration: context.client.get('/recipes/%d/' % ids[iteration % len(ids)])
+
+
+def recipe_payload(recipe):
+    """
+    :return: Body of the request creating the recipe
+    """
+    return {
+        'name': recipe.name,
+        'description': recipe.description,
+        'ingredients': recipe.ingredients,
+        'instructions': recipe.instructions,
+        'prep_time': str(recipe.prep_time),
+        'cook_time': str(recipe.cook_time),
+        'servings': recipe.servings,
+    }
+
+
+def chef_clients(context, name, count=1):
+    """
+    :return: Tuple with the list of `count` clients authenticated with the token of a new chef, and the chef
+    """
+    chef = User.objects.create_user(username='%s-%d' % (name, context.run_id))
+    token = Token.objects.create(user=chef)
+    clients = [APIClient() for _ in range(count)]
+    for client in clients:
+        client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+    return clients, chef
+
+
+@register('recipe.create', 'Creation of a recipe by an authenticated chef')
+def recipe_create(context):
+    (client,), chef = chef_clients(context, 'benchmark')
+    rng = random.Random(0)
+    return lambda iteration: client.post(
+        '/recipes/', recipe_payload(generate_recipe(rng, iteration, chef.id)), format='json',
+    )
+
+
+@register(
+    'recipe.create_deferred',
+    'Creation of a recipe with its ingredient index and stats left to the task queue (`TASK_QUEUE_ENABLED`)',
+)
+def recipe_create_deferred(context):
+    (client,), chef = chef_clients(context, 'deferred')
+    rng = random.Random(0)
+
+    def create(iteration):
+        with override_settings(TASK_QUEUE_ENABLED=True):
+            return client.post('/recipes/', recipe_payload(generate_recipe(rng, iteration, chef.id)), format='json')
+    return create
+
+
+def create_burst(context, name, batching):
+    """
+    Setup of a burst of `CREATE_BURST` recipes created at the same time
+    """
+    # The test client is not thread-safe, each thread has its own
+    clients, chef = chef_clients(context, name, CREATE_BURST)
+    rng = random.Random(0)
+
+    def burst(iteration):
+        payloads = [
+            recipe_payload(generate_recipe(rng, iteration * CREATE_BURST + index, chef.id))
+            for index in range(CREATE_BURST)
+        ]
+        with override_settings(RECIPE_CREATE_BATCHING=batching):
+            return first_failure(run_concurrently([
+                partial(client.post, '/recipes/', payload, format='json')
+                for client, payload in zip(clients, payloads)
+            ]))
+    return burst
+
+
+@register(
+    'recipe.create_burst', 'Burst of %d recipes created concurrently, one transaction each' % CREATE_BURST,
+    operations=CREATE_BURST,
+)
+def recipe_create_burst(context):
+    return create_burst(context, 'burst', batching=False)
+
+
+@register(
+    'recipe.create_burst_batched',
+    'Burst of %d recipes created concurrently, inserted in batches (`RECIPE_CREATE_BATCHING`)' % CREATE_BURST,
+    operations=CREATE_BURST,
+)
+def recipe_create_burst_batched(context):
+    return create_burst(context, 'burst-batched', batching=True)
+
+
+@register(
+    'recipe.read_write',
+    '%d recipe reads and %d creations at the same time, each in its own thread' % (READERS, WRITERS),
+    operations=READERS + WRITERS,
+)
+def recipe_read_write(context):
+    ids = sample_ids(Recipe.objects.all())
+    readers = [APIClient() for _ in range(READERS)]
+    writers, chef = chef_clients(context, 'read-write', WRITERS)
+    rng = random.Random(0)
+
+    def read(client, iteration):
+        if iteration % 2:
+            return client.get('/recipes/%d/' % ids[iteration % len(ids)])
+        return client.get('/recipes/', {'name': DISHES[iteration % len(DISHES)]})
+
+    def read_write(iteration):
+        calls = [partial(read, client, iteration * READERS + index) for index, client in enumerate(readers)]
+        calls += [
+            partial(client.post, '/recipes/', recipe_payload(generate_recipe(rng, iteration, chef.id)), format='json')
+            for client in writers
+        ]
+        return first_failure(run_concurrently(calls))
+    return read_write
+
+
+@register('recipe.serialize', 'RecipeSerializer on a page of 100 loaded recipes')
+def recipe_serialize(context):
+    recipes = list(Recipe.objects.select_related('chef')[:100])
+    return lambda iteration: RecipeSerializer(recipes, many=True).data
+
+
+@register('recipe.serialize_values', 'RecipeValuesSerializer on a page of 100 loaded `.values()` rows')
+def recipe_serialize_values(context):
+    rows = list(Recipe.objects.values(*RecipeValuesSerializer.get_lookups())[:100])
+    return lambda iteration: RecipeValuesSerializer(rows, many=True).data
+
+
+def render_page(renderer, size=1000):
+    page = {'next': None, 'results': RecipeValuesSerializer(
+        list(Recipe.objects.values(*RecipeValuesSerializer.get_lookups())[:size]), many=True,
+    ).data}
+    return lambda iteration: renderer.render(page)
+
+
+@register('recipe.render_json', "DRF's JSONRenderer on a page of 1000 serialized recipes")
+def recipe_render_json(context):
+    return render_page(renderers.JSONRenderer())
+
+
+@register('recipe.render_orjson', 'core JSONRenderer (orjson when installed) on a page of 1000 serialized recipes')
+def recipe_render_orjson(context):
+    return render_page(JSONRenderer())
@@ -0,0 +1,112 @@
+import hashlib
+
+from django.contrib.auth.models import User
+
+from core.cache import KEY_PREFIX, bump_versions, get_cache
+from recipe.filters import username_iexact
+
+# Every list of recipes without a chef filter
+RECIPES_SCOPE = 'recipes'
+# Chef usernames are part of every representation of a recipe
+USERS_SCOPE = 'users'
+# Seconds a username without chef is remembered, the chef may sign up meanwhile on another process
+MISSING_CHEF_TIMEOUT = 60
+
+
+def recipe_scope(recipe_id):
+    return 'recipe:%s' % recipe_id
+
+
+def chef_scope(chef_id):
+    return 'chef:%s' % chef_id
+
+
+def chef_id_key(username):
+    # Hashed, as the username may have characters or a length the cache backends reject in keys
+    digest = hashlib.sha256(username.lower().encode('utf-8')).hexdigest()
+    return '%s:chef-id:%s' % (KEY_PREFIX, digest)
+
+
+def get_chef_id(username):
+    """
+    Get the id of the chef with the username (case-insensitive, as `RecipeFilter.chef_username`),
+    memoized in the cache so cached lists are served without touching the database
+    :return: Id of the chef, or 0 when there is no such chef
+    """
+    cache = get_cache()
+    key = chef_id_key(username)
+    chef_id = cache.get(key)
+    if chef_id is None:
+        users = User.objects.filter(username_iexact('username', username))
+        chef_id = users.values_list('id', flat=True).first() or 0
+        cache.set(key, chef_id, None if chef_id else MISSING_CHEF_TIMEOUT)
+    return chef_id
+
+
+async def aget_chef_id(username):
+    """
+    Same as `get_chef_id`, with the async API of the cache and of the ORM
+    """
+    cache = get_cache()
+    key = chef_id_key(username)
+    chef_id = await cache.aget(key)
+    if chef_id is None:
+        users = User.objects.filter(username_iexact('username', username))
+        chef_id = await users.values_list('id', flat=True).afirst() or 0
+        await cache.aset(key, chef_id, None if chef_id else MISSING_CHEF_TIMEOUT)
+    return chef_id
+
+
+def list_scopes(query_params):
+    """
+    Get the scopes of a list of recipes: a list filtered by chef only depends on the recipes of that chef
+    """
+    username = query_params.get('chef_username')
+    if username:
+        return [USERS_SCOPE, chef_scope(get_chef_id(username))]
+    return [USERS_SCOPE, RECIPES_SCOPE]
+
+
+async def alist_scopes(query_params):
+    username = query_params.get('chef_username')
+    if username:
+        return [USERS_SCOPE, chef_scope(await aget_chef_id(username))]
+    return [USERS_SCOPE, RECIPES_SCOPE]
+
+
+def detail_scopes(recipe_id):
+    """
+    :param recipe_id: Id of the recipe from the URL, normalized so `/recipes/03/` is invalidated with `/recipes/3/`
+    """
+    try:
+        recipe_id = int(recipe_id)
+    except (TypeError, ValueError):
+        # No such recipe, the 404 is not cached
+        pass
+    return [USERS_SCOPE, recipe_scope(recipe_id)]
+
+
+def invalidate_recipes(recipes):
+    """
+    Invalidate the cached responses containing the recipes
+    :param recipes: List of recipes that were created, updated or deleted
+    """
+    scopes = [RECIPES_SCOPE]
+    for recipe in recipes:
+        scopes.append(recipe_scope(recipe.id))
+        scopes.append(chef_scope(recipe.chef_id))
+        previous_chef_id = getattr(recipe, '_loaded_chef_id', None)
+        if previous_chef_id is not None and previous_chef_id != recipe.chef_id:
+            scopes.append(chef_scope(previous_chef_id))
+    bump_versions(scopes)
+
+
+def invalidate_user(user, created=False):
+    """
+    Invalidate the cached responses that may contain the username of the user, and the chef ids of its current
+    and previous usernames
+    """
+    usernames = {user.username, getattr(user, '_loaded_username', None) or user.username}
+    get_cache().delete_many([chef_id_key(username) for username in usernames])
+    if not created:
+        bump_versions([USERS_SCOPE])
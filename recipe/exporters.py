@@ -0,0 +1,86 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from recipe.serializers import RecipeSerializer
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """File-like object that returns what is written, so `csv.writer` can be used as a generator"""
+
+    def write(self, value):
+        return value
+
+
+class RecipeExporter:
+    """
+    Stream recipes in NDJSON or CSV without loading the whole queryset in memory.
+
+    Rows are read with `QuerySet.values().iterator(chunk_size=...)`, so only one chunk of plain tuples
+    is alive at a time, and each value is formatted with the field of `RecipeSerializer`, so the output
+    matches the representation of the API.
+    """
+
+    def __init__(self, queryset, chunk_size=None, fields=None):
+        """
+        :param fields: Names of the exported fields, or None for every readable field of `RecipeSerializer`
+        """
+        self.queryset = queryset
+        self.chunk_size = chunk_size or getattr(settings, 'RECIPE_EXPORT_CHUNK_SIZE', 2000)
+        self.fields = {
+            name: field for name, field in RecipeSerializer(fields=fields).fields.items() if not field.write_only
+        }
+        self.lookups = {name: '__'.join(field.source_attrs) for name, field in self.fields.items()}
+
+    def rows(self):
+        """
+        Iterate over the recipes as dicts with their API representation
+        """
+        values = self.queryset.values(*self.lookups.values()).iterator(chunk_size=self.chunk_size)
+        for row in values:
+            yield {
+                name: None if row[lookup] is None else self.fields[name].to_representation(row[lookup])
+                for name, lookup in self.lookups.items()
+            }
+
+    def ndjson(self):
+        for row in self.rows():
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+
+    def csv(self):
+        writer = csv.DictWriter(Echo(), fieldnames=list(self.fields))
+        yield writer.writeheader()
+        for row in self.rows():
+            yield writer.writerow(row)
+
+    def stream(self, export_format):
+        """
+        Get the generator for the given format
+        :param export_format: One of `EXPORT_FORMATS`
+        :return: Generator of strings
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError('Invalid export format: %s' % export_format)
+        return getattr(self, export_format)()
+
+    async def astream(self, export_format):
+        """
+        Same as `stream` as an async generator, for the responses served under ASGI. The lines are read by chunks
+        in the thread of the sync code, where the database connection of the queryset lives.
+        :return: Async generator of strings, one chunk of lines each
+        """
+        lines = self.stream(export_format)
+        read_chunk = sync_to_async(lambda: ''.join(islice(lines, self.chunk_size)))
+        while True:
+            chunk = await read_chunk()
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,380 @@
+"""
+Materialized feed of the newest recipes: the list without filters, newest first, is the most requested page and
+is read from a ring of the keys `(created_at, updated_at, id)` of the newest `RECIPE_FEED_SIZE` recipes, kept in
+the cache for all the recipes and for each chef. A page of the feed is found in the ring and its rows are read by
+id in a single query, without sorting the recipes.
+
+The rings are updated with the recipes that are created, updated (their keys and chef change) or deleted, under a
+lock in the cache that also covers their rebuild from the database. A write of recipes older than the tail of a
+ring, kept in a small entry next to it, cannot change it and leaves it alone. Once the transaction is committed,
+the changes are applied again to the rings built meanwhile only, whose rebuild may have read the database before
+the commit. A ring that can no longer be trusted, e.g. one of its recipes is missing, is dropped and built again on
+the next read.
+
+With several web processes (`WEB_CONCURRENCY`), the rings are only kept in a cache shared by them (see
+`core.cache.is_shared_cache`), the ring of a local cache would miss the writes of the other processes: the
+`core.W001` check warns about such a cache.
+"""
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from core.cache import KEY_PREFIX, get_cache, is_shared_cache
+from core.pagination import KeysetPagination
+from core.routers import reads_from_replica
+from recipe.models import Recipe
+
+# Seconds a lock of a ring is kept when its holder dies, and seconds slept between the attempts to take it: a
+# read then falls back to the database, and an update drops the ring, rebuilt on the next read
+LOCK_TIMEOUT = 5
+LOCK_BACKOFF = (0.001, 0.005, 0.02)
+
+
+def get_feed_size():
+    """
+    :return: Number of recipes kept in the rings, 0 when the feed is disabled
+    """
+    if getattr(settings, 'WEB_CONCURRENCY', 1) > 1 and not is_shared_cache():
+        return 0
+    return getattr(settings, 'RECIPE_FEED_SIZE', 1000)
+
+
+def get_recipe_key(recipe):
+    """
+    :return: Tuple with the values of the ordering of the feed, newest last
+    """
+    return recipe.created_at, recipe.updated_at, recipe.id
+
+
+def get_row_key(row):
+    """
+    :return: Key of a `.values()` row of a recipe, None without a row
+    """
+    return (row['created_at'], row['updated_at'], row['id']) if row is not None else None
+
+
+class FeedRing:
+    """
+    Keys of the newest recipes of a feed, oldest first
+    :param entries: List with the keys, see `get_recipe_key`
+    :param complete: Whether the ring has every recipe of the feed, else there are older recipes
+    """
+
+    def __init__(self, entries, complete):
+        self.entries = entries
+        self.complete = complete
+
+    def dump(self):
+        return self.entries, self.complete
+
+    @property
+    def tail(self):
+        """
+        :return: Oldest key of an incomplete ring, the older recipes are not in it, None for a complete ring
+        """
+        return self.entries[0] if self.entries and not self.complete else None
+
+    def get_page(self, position, reverse, size):
+        """
+        Get the keys of a page of the feed, in the order of `KeysetPagination.get_page_queryset`
+        :param position: Key after which the page starts, None for the first page
+        :param reverse: Whether the page goes to newer recipes, from a `previous` link
+        :param size: Number of keys, the page size plus one to know whether there is a following page
+        :return: List with the keys, or None when the page is not entirely in the ring
+        """
+        entries = self.entries
+        if reverse:
+            # The recipes newer than a position older than the ring may not all be in it
+            if not self.complete and (not entries or position < entries[0]):
+                return None
+            start = bisect_right(entries, position)
+            return entries[start:start + size]
+        end = len(entries) if position is None else bisect_left(entries, position)
+        if end < size and not self.complete:
+            return None
+        return entries[max(end - size, 0):end][::-1]
+
+    def remove(self, ids):
+        self.entries = [entry for entry in self.entries if entry[2] not in ids]
+
+    def add(self, keys, size):
+        """
+        Add the keys of recipes of the feed, the ones older than the ring are left out
+        """
+        for key in keys:
+            if self.complete or (self.entries and key > self.entries[0]):
+                insort(self.entries, key)
+        if len(self.entries) > size:
+            self.entries = self.entries[-size:]
+            self.complete = False
+
+    def is_usable(self, size):
+        # The deleted recipes of an incomplete ring are not replaced, it is built again once half empty
+        return self.complete or len(self.entries) >= size // 2
+
+
+class FeedChange:
+    """
+    Recipes removed from a feed and added to it by a write
+    """
+
+    def __init__(self):
+        self.removed_ids = []
+        self.added_keys = []
+        # Creation date of the newest recipe of the change
+        self.created_at = None
+
+    def remove(self, recipe):
+        self.removed_ids.append(recipe.id)
+        if 'created_at' in recipe.get_deferred_fields():
+            # Not loaded, e.g. a recipe deleted with `only()`, it may be in any ring
+            self.created_at = timezone.now()
+        elif self.created_at is None or recipe.created_at > self.created_at:
+            self.created_at = recipe.created_at
+
+    def add(self, recipe):
+        # Without its previous key
+        self.remove(recipe)
+        self.added_keys.append(get_recipe_key(recipe))
+
+    def can_change(self, tail):
+        """
+        :param tail: Tail of the ring, see `FeedRing.tail`
+        :return: Whether the change may affect the ring: the recipes older than its tail are not in it, and the
+                 creation date of a recipe does not change
+        """
+        return tail is None or self.created_at >= tail[0]
+
+
+class Feed:
+    """
+    Feed of the newest recipes, of a chef or of every chef
+    :param chef_id: Id of the chef, None for every recipe
+    """
+
+    def __init__(self, chef_id=None):
+        self.chef_id = chef_id
+
+    def __eq__(self, other):
+        return isinstance(other, Feed) and other.chef_id == self.chef_id
+
+    def __hash__(self):
+        return hash(self.chef_id)
+
+    @property
+    def key(self):
+        return '%s:feed:%s' % (KEY_PREFIX, 'all' if self.chef_id is None else 'chef:%s' % self.chef_id)
+
+    @property
+    def meta_key(self):
+        """
+        Key of the tuple with the id of the build of the ring and its tail, read by the writes without the ring
+        """
+        return self.key + ':meta'
+
+    @contextmanager
+    def lock(self):
+        """
+        Lock the ring across the processes sharing the cache
+        :return: Context manager giving whether the lock was acquired after the sleeps of `LOCK_BACKOFF`
+        """
+        cache = get_cache()
+        key = self.key + ':lock'
+        for delay in LOCK_BACKOFF + (None,):
+            if cache.add(key, 1, timeout=LOCK_TIMEOUT):
+                break
+            if delay is None:
+                yield False
+                return
+            time.sleep(delay)
+        try:
+            yield True
+        finally:
+            cache.delete(key)
+
+    def get_queryset(self):
+        # From the primary, the rings are updated with its writes
+        queryset = Recipe.objects.using(router.db_for_write(Recipe))
+        if self.chef_id is not None:
+            queryset = queryset.filter(chef_id=self.chef_id)
+        return queryset
+
+    def build_ring(self, size):
+        """
+        Read the keys of the newest recipes, from the index of the default ordering
+        """
+        keys = list(
+            self.get_queryset().order_by('-created_at', '-updated_at', '-id')
+            .values_list('created_at', 'updated_at', 'id')[:size + 1]
+        )
+        return FeedRing(keys[:size][::-1], complete=len(keys) <= size)
+
+    def store(self, ring, build_id):
+        get_cache().set_many(
+            {self.key: ring.dump(), self.meta_key: (build_id, ring.tail)}, settings.RECIPE_FEED_TIMEOUT,
+        )
+
+    def get_ring(self):
+        """
+        :return: `FeedRing` of the feed, built when missing, None when its lock is held by others
+        """
+        cache = get_cache()
+        # A ring without its entry of the writes is built again, the writes leave it alone
+        values = cache.get_many([self.key, self.meta_key])
+        if len(values) == 2:
+            return FeedRing(*values[self.key])
+        with self.lock() as locked:
+            if not locked:
+                return None
+            values = cache.get_many([self.key, self.meta_key])
+            if len(values) == 2:
+                return FeedRing(*values[self.key])
+            ring = self.build_ring(get_feed_size())
+            self.store(ring, uuid.uuid4().hex)
+            return ring
+
+    def update(self, removed_ids=(), added_keys=()):
+        """
+        Remove recipes from the ring and add others, nothing is done when the ring is missing
+        """
+        cache = get_cache()
+        with self.lock() as locked:
+            values = cache.get_many([self.key, self.meta_key]) if locked else {}
+            if len(values) < 2:
+                # Without the lock, the ring may miss the change
+                self.drop()
+                return
+            size = get_feed_size()
+            ring = FeedRing(*values[self.key])
+            ring.remove(set(removed_ids))
+            ring.add(added_keys, size)
+            if ring.is_usable(size):
+                self.store(ring, values[self.meta_key][0])
+            else:
+                self.drop()
+
+    def drop(self):
+        get_cache().delete_many([self.key, self.meta_key])
+
+
+def apply_changes(changes, applied=None):
+    """
+    Apply the changes to the rings they may affect
+    :param changes: Dict with the `Feed` as key and its `FeedChange` as value
+    :param applied: Dict returned when the changes were applied before, the rings of the same builds have them
+    :return: Dict with the `Feed` as key and the id of the build of its ring as value, None for a missing ring
+    """
+    metas = get_cache().get_many([feed.meta_key for feed in changes])
+    builds = {}
+    for feed, change in changes.items():
+        build_id, tail = metas.get(feed.meta_key, (None, None))
+        builds[feed] = build_id
+        # Missing rings are built from the database, with the committed changes
+        if build_id is None or (applied is not None and applied.get(feed) == build_id):
+            continue
+        if change.can_change(tail):
+            feed.update(change.removed_ids, change.added_keys)
+    return builds
+
+
+def update_feeds(changes):
+    """
+    Apply the changes to the rings now, so the next reads of this transaction see them, and once committed to the
+    rings built meanwhile
+    :param changes: Dict with the `Feed` as key and its `FeedChange` as value
+    """
+    if not changes:
+        return
+    builds = apply_changes(changes)
+    transaction.on_commit(lambda: apply_changes(changes, builds))
+
+
+def feeds_saved(recipes):
+    """
+    Update the feeds after the recipes were created or updated
+    """
+    if not get_feed_size():
+        return
+    changes = {}
+    for recipe in recipes:
+        for feed in (Feed(), Feed(recipe.chef_id)):
+            changes.setdefault(feed, FeedChange()).add(recipe)
+        previous_chef_id = getattr(recipe, '_loaded_chef_id', None)
+        if previous_chef_id is not None and previous_chef_id != recipe.chef_id:
+            changes.setdefault(Feed(previous_chef_id), FeedChange()).remove(recipe)
+    update_feeds(changes)
+
+
+def feeds_deleted(recipes):
+    """
+    Update the feeds after the recipes were deleted
+    """
+    if not get_feed_size():
+        return
+    changes = {}
+    for recipe in recipes:
+        for feed in (Feed(), Feed(recipe.chef_id)):
+            changes.setdefault(feed, FeedChange()).remove(recipe)
+    update_feeds(changes)
+
+
+def drop_feeds(chef_ids=()):
+    """
+    Drop the rings of every recipe and of the chefs, e.g. after recipes were written without `feeds_saved`
+    """
+    feeds = [Feed()] + [Feed(chef_id) for chef_id in chef_ids]
+    get_cache().delete_many([key for feed in feeds for key in (feed.key, feed.meta_key)])
+
+
+class FeedPagination(KeysetPagination):
+    """
+    `KeysetPagination` reading the pages of the feed returned by the `get_feed` method of the view from its ring,
+    the other pages (filtered or ordered lists, pages older than the ring...) are read from the database
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.get_feed_page(queryset, request, view)
+        if page is not None:
+            return page
+        return super(FeedPagination, self).paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page = await sync_to_async(self.get_feed_page)(queryset, request, view)
+        if page is not None:
+            return page
+        return await super(FeedPagination, self).apaginate_queryset(queryset, request, view)
+
+    def get_feed_page(self, queryset, request, view):
+        """
+        :return: List with the rows of the page, or None when the page is not in a ring
+        """
+        feed = view.get_feed() if view is not None and get_feed_size() else None
+        if feed is None or self.get_ordering(queryset) != KeysetPagination.ordering:
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = KeysetPagination.ordering
+        self.reverse, position = self.decode_cursor(request)
+        self.has_cursor = position is not None
+        if position is not None:
+            position = tuple(self.parse_position(queryset, position))
+
+        ring = feed.get_ring()
+        keys = ring.get_page(position, self.reverse, self.page_size + 1) if ring is not None else None
+        if keys is None:
+            return None
+        rows = {row['id']: row for row in queryset.filter(id__in=[key[2] for key in keys]).order_by()}
+        if any(key != get_row_key(rows.get(key[2])) for key in keys):
+            # Recipes deleted without updating the ring, or created by a transaction rolled back (and their
+            # id reused), the cursors built from the rows would not match the ring. A replica may just lag.
+            if not reads_from_replica():
+                feed.drop()
+            return None
+        return self.set_page([rows[key[2]] for key in keys])
@@ -1,21 +1,135 @@
 import django_filters
+from django.db.models import Count, Value
+from django.db.models.functions import Upper
+from django.db.models.lookups import Exact
 
-from recipe.models import Recipe
+from core.instrumentation import timer
+from recipe import search
+from recipe.ingredients import parse_ingredient_list
+from recipe.models import Recipe, RecipeIngredient
+
+
+def username_iexact(field, username):
+    """
+    Case-insensitive match of a username, comparing the upper case of both sides so the lookup is resolved
+    with the expression index on UPPER(username). `iexact` is the same comparison on PostgreSQL, but a LIKE
+    on SQLite, which cannot use the index.
+    :param field: Lookup of the username, e.g. `chef__username`
+    :return: Lookup expression to pass to `QuerySet.filter`
+    """
+    return Exact(Upper(field), Upper(Value(username)))
 
 
 class RecipeFilter(django_filters.FilterSet):
     """
     Filter for Recipe objects
     """
+    q = django_filters.CharFilter(
+        method='filter_search', label='Search',
+        help_text='Full-text search on name, description and ingredients, results are ordered by relevance',
+    )
     name = django_filters.CharFilter(
         field_name='name', lookup_expr='icontains', label='Recipe name',
         help_text='Name of the recipe',
     )
     chef_username = django_filters.CharFilter(
-        field_name='chef__username', lookup_expr='iexact', label='Chef Username',
+        method='filter_chef_username', label='Chef Username',
         help_text='Chef username of the recipe',
     )
+    has_ingredient = django_filters.CharFilter(
+        method='filter_has_ingredient', label='Has ingredient',
+        help_text='Recipes containing any of the ingredients, separated by commas',
+    )
+    all_ingredients = django_filters.CharFilter(
+        method='filter_all_ingredients', label='All ingredients',
+        help_text='Recipes containing all the ingredients, separated by commas',
+    )
+    exclude_ingredient = django_filters.CharFilter(
+        method='filter_exclude_ingredient', label='Exclude ingredient',
+        help_text='Recipes without any of the ingredients, separated by commas',
+    )
+    prep_time_min = django_filters.DurationFilter(
+        field_name='prep_time', lookup_expr='gte', label='Minimum preparation time',
+        help_text='Recipes with at least this preparation time, format: HH:MM:SS',
+    )
+    prep_time_max = django_filters.DurationFilter(
+        field_name='prep_time', lookup_expr='lte', label='Maximum preparation time',
+        help_text='Recipes with at most this preparation time, format: HH:MM:SS',
+    )
+    cook_time_min = django_filters.DurationFilter(
+        field_name='cook_time', lookup_expr='gte', label='Minimum cooking time',
+        help_text='Recipes with at least this cooking time, format: HH:MM:SS',
+    )
+    cook_time_max = django_filters.DurationFilter(
+        field_name='cook_time', lookup_expr='lte', label='Maximum cooking time',
+        help_text='Recipes with at most this cooking time, format: HH:MM:SS',
+    )
+    total_time_min = django_filters.DurationFilter(
+        field_name='total_time', lookup_expr='gte', label='Minimum total time',
+        help_text='Recipes with at least this preparation plus cooking time, format: HH:MM:SS',
+    )
+    total_time_max = django_filters.DurationFilter(
+        field_name='total_time', lookup_expr='lte', label='Maximum total time',
+        help_text='Recipes with at most this preparation plus cooking time, format: HH:MM:SS',
+    )
+    servings_min = django_filters.NumberFilter(
+        field_name='servings', lookup_expr='gte', label='Minimum servings',
+        help_text='Recipes with at least this number of servings',
+    )
+    servings_max = django_filters.NumberFilter(
+        field_name='servings', lookup_expr='lte', label='Maximum servings',
+        help_text='Recipes with at most this number of servings',
+    )
+    # Each ordering is read from the index on (field, id) of the recipes, see `Recipe.Meta.indexes`
+    ordering = django_filters.OrderingFilter(
+        fields=['total_time', 'prep_time', 'cook_time', 'servings'], label='Ordering',
+        help_text='Order of the recipes, e.g. `total_time` or `-servings`, instead of the newest first',
+    )
 
     class Meta:
         model = Recipe
-        fields = ['name', 'chef_username']
+        fields = [
+            'q', 'name', 'chef_username', 'has_ingredient', 'all_ingredients', 'exclude_ingredient',
+            'prep_time_min', 'prep_time_max', 'cook_time_min', 'cook_time_max', 'total_time_min', 'total_time_max',
+            'servings_min', 'servings_max', 'ordering',
+        ]
+
+    @property
+    def qs(self):
+        with timer('filter'):
+            return super(RecipeFilter, self).qs
+
+    def filter_chef_username(self, queryset, name, value):
+        return queryset.filter(username_iexact('chef__username', value))
+
+    def filter_search(self, queryset, name, value):
+        return search.search(queryset, value)
+
+    @staticmethod
+    def recipes_with_ingredients(names):
+        """
+        Subquery with the ids of the recipes containing any of the ingredients, resolved through the index
+        on (ingredient, recipe) of RecipeIngredient
+        """
+        return RecipeIngredient.objects.filter(ingredient__name__in=names).values('recipe_id')
+
+    def filter_has_ingredient(self, queryset, name, value):
+        names = parse_ingredient_list(value)
+        if not names:
+            return queryset
+        return queryset.filter(id__in=self.recipes_with_ingredients(names))
+
+    def filter_all_ingredients(self, queryset, name, value):
+        names = parse_ingredient_list(value)
+        if not names:
+            return queryset
+        recipe_ids = self.recipes_with_ingredients(names).annotate(
+            matches=Count('ingredient_id')
+        ).filter(matches=len(names)).values('recipe_id')
+        return queryset.filter(id__in=recipe_ids)
+
+    def filter_exclude_ingredient(self, queryset, name, value):
+        names = parse_ingredient_list(value)
+        if not names:
+            return queryset
+        return queryset.exclude(id__in=self.recipes_with_ingredients(names))
@@ -0,0 +1,84 @@
+import re
+
+from django.db import transaction
+
+# Leading words that describe the amount of an ingredient rather than the ingredient itself
+QUANTITY_WORDS = {
+    'a', 'an', 'one', 'two', 'three', 'half', 'quarter', 'some', 'few', 'or', 'and', 'of', 'to', 'ou', 'e',
+    'um', 'uma', 'dois', 'duas', 'tres', 'três', 'meia', 'meio', 'quarto', 'pitada', 'de', 'do', 'da', 'dos', 'das',
+}
+UNIT_WORDS = {
+    'g', 'gr', 'gram', 'grams', 'kg', 'kilo', 'kilos', 'mg', 'ml', 'l', 'liter', 'liters', 'litre', 'litres',
+    'cup', 'cups', 'tablespoon', 'tablespoons', 'tbsp', 'teaspoon', 'teaspoons', 'tsp', 'pound', 'pounds', 'lb',
+    'lbs', 'ounce', 'ounces', 'oz', 'pinch', 'clove', 'cloves', 'slice', 'slices', 'can', 'cans', 'package',
+    'grama', 'gramas', 'quilo', 'quilos', 'litro', 'litros', 'xicara', 'xícara', 'xicaras', 'xícaras', 'colher',
+    'colheres', 'sopa', 'cha', 'chá', 'sobremesa', 'cafe', 'café', 'copo', 'copos', 'lata', 'latas', 'dente',
+    'dentes', 'fatia', 'fatias', 'pacote', 'pacotes', 'unidade', 'unidades',
+}
+QUANTITY_RE = re.compile(r'^(\d+([.,/]\d+)?|\d+\s*-\s*\d+|[¼½¾⅓⅔⅛])$')
+BULLET_RE = re.compile(r'^\s*([-*•]|\d+[.)])\s+')
+SUFFIX_RE = re.compile(r'\s+(a gosto|to taste|q\.?b\.?)$')
+PARENTHESES_RE = re.compile(r'\([^)]*\)')
+
+
+def normalize_ingredient(line):
+    """
+    Extract the normalized name of an ingredient from a line of the ingredients text,
+    e.g. `2 colheres de sopa de cebola picadinha` -> `cebola picadinha`
+    :param line: Line of the ingredients text
+    :return: Name of the ingredient, or an empty string when the line has no ingredient
+    """
+    line = PARENTHESES_RE.sub(' ', BULLET_RE.sub('', line.lower()))
+    # The notes after a comma usually describe the preparation, unless they hold the ingredient itself
+    for segment in line.split(','):
+        words = SUFFIX_RE.sub('', ' '.join(segment.split())).split()
+        while words and (words[0] in QUANTITY_WORDS or words[0] in UNIT_WORDS or QUANTITY_RE.match(words[0])):
+            words.pop(0)
+        if words:
+            return ' '.join(words)[:255]
+    return ''
+
+
+def parse_ingredients(text):
+    """
+    Split the ingredients text of a recipe into the normalized ingredient names
+    :param text: Ingredients text, one ingredient per line
+    :return: List with the unique names, in order of appearance
+    """
+    names = (normalize_ingredient(line) for line in re.split(r'[\r\n;]+', text or ''))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def parse_ingredient_list(value):
+    """
+    Parse a comma-separated list of ingredients given by the user
+    :return: List with the normalized names
+    """
+    return list(dict.fromkeys(name for name in map(normalize_ingredient, (value or '').split(',')) if name))
+
+
+def index_ingredients(recipes, created=False):
+    """
+    Rebuild the rows of `RecipeIngredient` of the given recipes from their ingredients text, with a fixed
+    number of queries regardless of the number of recipes
+    :param recipes: List of recipes with the `ingredients` field loaded
+    :param created: The recipes were just created, so they have no rows to be removed
+    """
+    from recipe.models import Ingredient, RecipeIngredient
+
+    parsed = {recipe.id: parse_ingredients(recipe.ingredients) for recipe in recipes}
+    if not parsed:
+        return
+    names = {name for recipe_names in parsed.values() for name in recipe_names}
+    with transaction.atomic(savepoint=False):
+        if not created:
+            RecipeIngredient.objects.filter(recipe_id__in=list(parsed)).delete()
+        if not names:
+            return
+        Ingredient.objects.bulk_create([Ingredient(name=name) for name in names], ignore_conflicts=True)
+        ingredient_ids = dict(Ingredient.objects.filter(name__in=names).values_list('name', 'id'))
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_ids[name], position=position)
+            for recipe_id, recipe_names in parsed.items()
+            for position, name in enumerate(recipe_names)
+        ])
@@ -0,0 +1,118 @@
+from itertools import combinations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from core.query_plans import QueryPlanRecorder, find_plan_issues
+from recipe.filters import RecipeFilter
+from recipe.models import Ingredient, Recipe
+from recipe.search import search_terms
+
+
+class Command(BaseCommand):
+    help = (
+        'Request the recipe list with each combination of the RecipeFilter filters, get the plan of every query '
+        'it runs with EXPLAIN, and report the full scans and the sorts (temp b-trees on SQLite). Run it on a '
+        'database with realistic data, e.g. created with seed_recipes, since plans depend on the size of the '
+        'tables. The SQL and the plans are shown with --verbosity 2.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-filters', type=int, default=2,
+            help='Maximum number of filters combined in a request (default: 2). Each combination is a request '
+                 'with its plans, and combining all the N filters takes 2^N requests.',
+        )
+        parser.add_argument(
+            '--value', action='append', default=[], metavar='NAME=VALUE',
+            help='Value of a filter, e.g. --value chef_username=chef (can be repeated), by default taken from '
+                 'the stored recipes',
+        )
+        parser.add_argument(
+            '--analyze', action='store_true', help='Run ANALYZE first, so the planner knows the size of the tables',
+        )
+        parser.add_argument('--fail', action='store_true', help='Exit with an error when any issue is found')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError('The query plans of %s are not analyzed.' % connection.vendor)
+        values = self.get_sample_values()
+        for item in options['value']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError('Invalid value "%s", use NAME=VALUE.' % item)
+            if name not in values:
+                raise CommandError('Unknown filter "%s".' % name)
+            values[name] = value
+
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        names = list(RecipeFilter.base_filters)
+        max_filters = min(options['max_filters'], len(names))
+        client = APIClient()
+        audited = 0
+        with_issues = 0
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], API_CACHE_ENABLED=False):
+            for size in range(max_filters + 1):
+                for filters in combinations(names, size):
+                    audited += 1
+                    with_issues += self.audit(client, {name: values[name] for name in filters}, options)
+
+        message = '%d of %d filter combinations with issues' % (with_issues, audited)
+        if with_issues and options['fail']:
+            raise CommandError(message)
+        self.stdout.write(self.style.WARNING(message) if with_issues else self.style.SUCCESS(message))
+
+    def get_sample_values(self):
+        """
+        :return: Dict with the value of each filter, matching the newest recipe
+        """
+        recipe = Recipe.objects.select_related('chef').only(
+            'name', 'prep_time', 'cook_time', 'total_time', 'servings', 'chef__username',
+        ).first()
+        ingredient = Ingredient.objects.values_list('name', flat=True).first() or 'salt'
+        word = (search_terms(recipe.name) or ['soup'])[0] if recipe else 'soup'
+        values = {
+            'q': word,
+            'name': word,
+            'chef_username': recipe.chef.username if recipe else 'chef',
+            'has_ingredient': ingredient,
+            'all_ingredients': ingredient,
+            'exclude_ingredient': ingredient,
+            'ordering': 'total_time',
+        }
+        for name in ('prep_time', 'cook_time', 'total_time'):
+            value = str(getattr(recipe, name)) if recipe else '00:30:00'
+            values.update({name + '_min': value, name + '_max': value})
+        servings = str(recipe.servings) if recipe else '1'
+        values.update({'servings_min': servings, 'servings_max': servings})
+        return values
+
+    def audit(self, client, params, options):
+        """
+        Request the recipe list with the filters and report the issues of its queries
+        :return: Whether any issue was found
+        """
+        with QueryPlanRecorder() as recorder:
+            response = client.get('/recipes/', params)
+        if response.status_code != 200:
+            raise CommandError('The request with %s failed with status %d.' % (params, response.status_code))
+
+        reports = [(sql, plan, find_plan_issues(connection.vendor, sql, plan)) for sql, plan in recorder.plans]
+        found = any(issues for sql, plan, issues in reports)
+        if not found and options['verbosity'] < 2:
+            return False
+        self.stdout.write(', '.join('%s=%s' % item for item in params.items()) or '(no filters)')
+        for number, (sql, plan, issues) in enumerate(reports, 1):
+            if options['verbosity'] >= 2:
+                self.stdout.write('  query %d: %s' % (number, sql))
+                for line in plan:
+                    self.stdout.write('    | %s' % line)
+            for issue in issues:
+                self.stdout.write(self.style.WARNING('  query %d: %s' % (number, issue)))
+        return found
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from recipe.cache import invalidate_recipes
+from recipe.ingredients import index_ingredients
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Build the ingredient index of the existing recipes, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of recipes indexed at a time')
+        parser.add_argument(
+            '--missing-only', action='store_true', help='Only index the recipes without indexed ingredients',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.only('id', 'chef_id', 'ingredients').order_by('id')
+        if options['missing_only']:
+            queryset = queryset.filter(recipe_ingredients__isnull=True)
+
+        # Walk the table by primary key, so every batch is a cheap range scan
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            index_ingredients(batch)
+            invalidate_recipes(batch)
+            last_id = batch[-1].id
+            total += len(batch)
+            self.stdout.write('Indexed %d recipes' % total)
+
+        self.stdout.write(self.style.SUCCESS('Ingredient index built for %d recipes' % total))
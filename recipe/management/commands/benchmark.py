@@ -0,0 +1,138 @@
+import fnmatch
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from core.benchmarking import (
+    BenchmarkContext, BenchmarkError, autodiscover, compare_results, get_metadata, read_results, run_scenario,
+    write_results,
+)
+from recipe.benchmarks import parse_count, seed_recipes
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the latency (p50/p99), the throughput, the queries per request and the peak memory of the API '
+        'endpoints, in process through the test client. By default the run uses a new test database seeded with '
+        'generated recipes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios', nargs='*', metavar='SCENARIO',
+            help='Names or patterns of the scenarios to run, e.g. recipe.* (default: all)',
+        )
+        parser.add_argument('--list', action='store_true', help='List the scenarios and exit')
+        parser.add_argument('--recipes', default='10k', help='Number of recipes in the database, e.g. 10k, 100k, 1M')
+        parser.add_argument('--chefs', type=int, default=1000, help='Number of chefs owning the recipes')
+        parser.add_argument('--iterations', type=int, default=200, help='Number of measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=20, help='Number of requests before measuring')
+        parser.add_argument(
+            '--memory-iterations', type=int, default=10, help='Number of requests traced to measure the peak memory',
+        )
+        parser.add_argument('--api-cache', action='store_true', help='Keep the response cache of the API enabled')
+        parser.add_argument('--output', help='Path of the JSON file where the results are written')
+        parser.add_argument('--compare', help='Path of the JSON results of a previous run, to compare p50/p99')
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='Fail when the p50 of a scenario is slower than in --compare by more than this percentage',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true', help='Keep the test database, so later runs do not seed it again',
+        )
+        parser.add_argument(
+            '--no-test-db', action='store_true',
+            help='Run against the configured database, the recipes and chefs created by the run are kept',
+        )
+
+    def handle(self, *args, **options):
+        scenarios = autodiscover()
+        if options['list']:
+            for name in sorted(scenarios):
+                self.stdout.write('%-30s %s' % (name, scenarios[name].description))
+            return
+
+        selected = [
+            scenarios[name] for name in sorted(scenarios)
+            if not options['scenarios'] or any(fnmatch.fnmatch(name, pattern) for pattern in options['scenarios'])
+        ]
+        if not selected:
+            raise CommandError('No scenario matches %s, see --list.' % ', '.join(options['scenarios']))
+        try:
+            recipes = parse_count(options['recipes'])
+        except ValueError:
+            raise CommandError('Invalid number of recipes "%s".' % options['recipes'])
+        if options['max_regression'] is not None and not options['compare']:
+            raise CommandError('--max-regression requires --compare.')
+
+        old_name = connection.settings_dict['NAME']
+        if not options['no_test_db']:
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'], serialize=False)
+        try:
+            with override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                API_CACHE_ENABLED=options['api_cache'] and getattr(settings, 'API_CACHE_ENABLED', True),
+            ):
+                results = self.run(selected, recipes, options)
+        finally:
+            if not options['no_test_db']:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        metadata = get_metadata(
+            recipes=recipes, chefs=options['chefs'], iterations=options['iterations'], api_cache=options['api_cache'],
+        )
+        if options['output']:
+            write_results(options['output'], results, metadata)
+            self.stdout.write('Results written to %s' % options['output'])
+        if options['compare']:
+            self.compare(results, options)
+
+    def run(self, scenarios, recipes, options):
+        missing = recipes - Recipe.objects.count()
+        if missing > 0:
+            self.stdout.write('Seeding %d recipes...' % missing)
+            seed_recipes(missing, chefs=options['chefs'])
+
+        context = BenchmarkContext(APIClient(), **options)
+        results = {}
+        self.stdout.write('%-30s %10s %10s %10s %10s %10s' % (
+            'scenario', 'p50 ms', 'p99 ms', 'ops/s', 'queries', 'peak KiB',
+        ))
+        for scenario in scenarios:
+            try:
+                result = run_scenario(
+                    scenario, context, iterations=options['iterations'], warmup=options['warmup'],
+                    memory_iterations=options['memory_iterations'],
+                )
+            except BenchmarkError as e:
+                raise CommandError(str(e))
+            results[scenario.name] = result
+            self.stdout.write('%-30s %10.2f %10.2f %10.1f %10.1f %10.1f' % (
+                scenario.name, result['p50_ms'], result['p99_ms'], result['per_second'], result['queries_per_request'],
+                result['peak_memory_kb'],
+            ))
+        return results
+
+    def compare(self, results, options):
+        baseline = read_results(options['compare'])
+        p50_changes = compare_results(results, baseline, 'p50_ms')
+        p99_changes = compare_results(results, baseline, 'p99_ms')
+        self.stdout.write('%-30s %10s %10s' % ('scenario', 'p50', 'p99'))
+        for name in sorted(p50_changes):
+            self.stdout.write('%-30s %+9.1f%% %+9.1f%%' % (
+                name, p50_changes[name] * 100, p99_changes.get(name, 0) * 100,
+            ))
+
+        if options['max_regression'] is not None:
+            regressions = sorted(
+                name for name, change in p50_changes.items() if change * 100 > options['max_regression']
+            )
+            if regressions:
+                raise CommandError('p50 regressed by more than %s%%: %s' % (
+                    options['max_regression'], ', '.join(regressions),
+                ))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.exporters import EXPORT_FORMATS, RecipeExporter
+from recipe.filters import RecipeFilter
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Stream the recipes as NDJSON or CSV, accepting the same filters as the API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-format', choices=list(EXPORT_FORMATS), default='ndjson', help='Format of the export',
+        )
+        parser.add_argument('--file', help='Path of the file to write, defaults to the standard output')
+        parser.add_argument('--chunk-size', type=int, help='Number of rows fetched from the database at a time')
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='NAME=VALUE',
+            help='Filter of RecipeFilter, e.g. --filter chef_username=chef (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        data = {}
+        for item in options['filter']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError('Invalid filter "%s", use NAME=VALUE.' % item)
+            data[name] = value
+
+        recipe_filter = RecipeFilter(data=data, queryset=Recipe.objects.all())
+        if not recipe_filter.is_valid():
+            raise CommandError('Invalid filters: %s' % dict(recipe_filter.errors))
+        unknown = set(data) - set(recipe_filter.filters)
+        if unknown:
+            raise CommandError('Unknown filters: %s' % ', '.join(sorted(unknown)))
+
+        exporter = RecipeExporter(recipe_filter.qs, chunk_size=options['chunk_size'])
+        chunks = exporter.stream(options['output_format'])
+        if not options['file']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['file'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in chunks:
+                output.write(chunk)
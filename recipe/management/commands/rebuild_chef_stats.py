@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from recipe.stats import rebuild_chef_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the recipe stats of every chef from the recipes, in batches of chefs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of chefs recomputed at a time')
+
+    def handle(self, *args, **options):
+        # Walk the chefs by primary key, each batch is one aggregate of their recipes through the chef index
+        last_id = 0
+        total = 0
+        while True:
+            chef_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not chef_ids:
+                break
+            rebuild_chef_stats(chef_ids)
+            last_id = chef_ids[-1]
+            total += len(chef_ids)
+            self.stdout.write('Recomputed %d chefs' % total)
+
+        self.stdout.write(self.style.SUCCESS('Stats recomputed for %d chefs' % total))
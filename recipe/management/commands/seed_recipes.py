@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.benchmarks import parse_count, seed_recipes
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with generated recipes spread across many chefs, e.g. for load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('recipes', help='Number of recipes to create, e.g. 10k, 100k or 1M')
+        parser.add_argument('--chefs', type=int, default=1000, help='Number of chefs owning the recipes')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of recipes inserted at a time')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generator')
+
+    def handle(self, *args, **options):
+        try:
+            count = parse_count(options['recipes'])
+        except ValueError:
+            raise CommandError('Invalid number of recipes "%s".' % options['recipes'])
+        if count <= 0 or options['chefs'] <= 0:
+            raise CommandError('The numbers of recipes and chefs must be positive.')
+
+        created = seed_recipes(
+            count, chefs=options['chefs'], batch_size=options['batch_size'], seed=options['seed'], stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS('Created %d recipes' % created))
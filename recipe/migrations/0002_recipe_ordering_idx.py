@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-18 16:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-created_at', '-updated_at', '-id'], name='recipe_ordering_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from recipe.search import create_search_index, drop_search_index
+
+
+def forwards(apps, schema_editor):
+    create_search_index(schema_editor.connection, rebuild=True)
+
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0002_recipe_ordering_idx'),
+    ]
+
+    operations = [
+        # FTS5 table kept in sync by triggers on SQLite, GIN expression index on PostgreSQL
+        migrations.RunPython(forwards, backwards),
+    ]
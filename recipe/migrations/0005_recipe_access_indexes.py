@@ -0,0 +1,39 @@
+# Generated by Django 5.0 on 2026-10-18 17:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+# Case-insensitive lookup of the chefs by username (see `recipe.filters.username_iexact`), created here since
+# the indexes of `auth.User` cannot be declared on the model
+USERNAME_INDEX = models.Index(Upper('username'), name='auth_user_username_upper_idx')
+
+
+def create_username_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model(settings.AUTH_USER_MODEL), USERNAME_INDEX)
+
+
+def drop_username_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model(settings.AUTH_USER_MODEL), USERNAME_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0004_ingredient'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='chef',
+            field=models.ForeignKey(db_index=False, help_text='Chef who created the recipe', on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Chef'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['chef', '-created_at', '-updated_at', '-id'], name='recipe_chef_ordering_idx'),
+        ),
+        migrations.RunPython(create_username_index, drop_username_index),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0 on 2026-10-18 17:28
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_chef_stats(apps, schema_editor):
+    """Stats of the chefs that already have recipes, maintained incrementally from now on"""
+    Recipe = apps.get_model('recipe', 'Recipe')
+    ChefStats = apps.get_model('recipe', 'ChefStats')
+    rows = Recipe.objects.order_by().values('chef_id').annotate(
+        recipe_count=Count('id'),
+        total_prep_time=Sum('prep_time'),
+        total_cook_time=Sum('cook_time'),
+        total_servings=Sum('servings'),
+    )
+    ChefStats.objects.bulk_create([ChefStats(**row) for row in rows.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0005_recipe_access_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChefStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('recipe_count', models.PositiveIntegerField(default=0, help_text='Number of recipes of the chef', verbose_name='Recipe count')),
+                ('total_prep_time', models.DurationField(default=datetime.timedelta, help_text='Sum of the preparation times', verbose_name='Total prep time')),
+                ('total_cook_time', models.DurationField(default=datetime.timedelta, help_text='Sum of the cooking times', verbose_name='Total cook time')),
+                ('total_servings', models.PositiveBigIntegerField(default=0, help_text='Sum of the servings', verbose_name='Total servings')),
+                ('chef', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_stats', to=settings.AUTH_USER_MODEL, verbose_name='Chef')),
+            ],
+            options={
+                'verbose_name_plural': 'chef stats',
+                'ordering': ['-recipe_count', '-id'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['-recipe_count', '-id'], name='chef_stats_ranking_idx')],
+            },
+        ),
+        migrations.RunPython(build_chef_stats, migrations.RunPython.noop),
+    ]
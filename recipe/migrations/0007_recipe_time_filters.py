@@ -0,0 +1,37 @@
+# Generated by Django 5.0 on 2026-10-18 17:33
+
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0006_chefstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='total_time',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('prep_time'), '+', models.F('cook_time')), help_text='Preparation plus cooking time of the recipe', output_field=models.DurationField(), verbose_name='Total Time'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['total_time', 'id'], name='recipe_total_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['prep_time', 'id'], name='recipe_prep_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cook_time', 'id'], name='recipe_cook_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['servings', 'id'], name='recipe_servings_idx'),
+        ),
+    ]
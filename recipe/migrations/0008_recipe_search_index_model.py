@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-18 18:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_recipe_time_filters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchIndex',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='recipe.recipe')),
+            ],
+            options={
+                'db_table': 'recipe_recipe_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -32,14 +32,169 @@ class Recipe(BaseModel):
         verbose_name='Servings', help_text='Servings of the recipe', default=1,
         validators=[MinValueValidator(limit_value=1, message='Servings must be equal to or greater than 1.')]
     )
+    total_time = models.GeneratedField(
+        expression=models.F('prep_time') + models.F('cook_time'), output_field=models.DurationField(),
+        db_persist=True, verbose_name='Total Time', help_text='Preparation plus cooking time of the recipe',
+    )
     chef = models.ForeignKey(
         User, on_delete=models.CASCADE, verbose_name='Chef', help_text='Chef who created the recipe',
         related_name='recipes',
+        # Covered by `recipe_chef_ordering_idx`, which starts with the chef
+        db_index=False,
     )
 
+    class Meta(BaseModel.Meta):
+        """Meta options for Recipe."""
+        indexes = [
+            # Backs the keyset pagination on the default ordering, see `core.pagination.KeysetPagination`
+            models.Index(fields=['-created_at', '-updated_at', '-id'], name='recipe_ordering_idx'),
+            # Recipes of a chef in the default ordering: the page of `chef_username` is read without sorting
+            models.Index(fields=['chef', '-created_at', '-updated_at', '-id'], name='recipe_chef_ordering_idx'),
+            # Range filters and ordering of `RecipeFilter`
+            models.Index(fields=['total_time', 'id'], name='recipe_total_time_idx'),
+            models.Index(fields=['prep_time', 'id'], name='recipe_prep_time_idx'),
+            models.Index(fields=['cook_time', 'id'], name='recipe_cook_time_idx'),
+            models.Index(fields=['servings', 'id'], name='recipe_servings_idx'),
+        ]
+
+    # Fields of a recipe summed in `ChefStats`, see `recipe.stats`
+    stats_fields = ('chef_id', 'prep_time', 'cook_time', 'servings')
+
     def __str__(self):
         return self.name
 
+    def get_stats_state(self):
+        """
+        :return: Tuple with the values of the `stats_fields`, None for the deferred ones
+        """
+        return tuple(self.__dict__.get(field) for field in self.stats_fields)
+
+    def set_total_time(self):
+        """
+        Compute `total_time` from the loaded times, the database does not return the generated columns of an
+        UPDATE. With a deferred time, `total_time` is deferred too and read again on access.
+        """
+        if self.__dict__.get('prep_time') is None or self.__dict__.get('cook_time') is None:
+            self.__dict__.pop('total_time', None)
+        else:
+            self.total_time = self.prep_time + self.cook_time
+
+    def save(self, *args, **kwargs):
+        super(Recipe, self).save(*args, **kwargs)
+        self.set_total_time()
+
     def validate(self):
         if self.chef is None:
             raise ValueError('Recipe must be associated with a chef')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Recipe, cls).from_db(db, field_names, values)
+        # Keep the loaded ingredients text to detect when the ingredient index must be rebuilt,
+        # and the chef to invalidate the cached responses of the previous chef
+        instance._loaded_ingredients = instance.__dict__.get('ingredients')
+        instance._loaded_chef_id = instance.__dict__.get('chef_id')
+        # Values counted in the stats of the chef, see `recipe.stats`
+        instance._loaded_stats = instance.get_stats_state()
+        return instance
+
+
+class RecipeSearchIndex(models.Model):
+    """
+    Row of the SQLite full-text index of the recipes (see `recipe.search`), joined to a recipe to read the
+    rank of its match. The table is created by `recipe.search.create_search_index`.
+    """
+    recipe = models.OneToOneField(
+        Recipe, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING, related_name='search_index',
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'recipe_recipe_fts'
+
+
+class Ingredient(BaseModel):
+    """Normalized ingredient, parsed from the ingredients text of the recipes"""
+    name = models.CharField(
+        max_length=255, unique=True, verbose_name='Name', help_text='Normalized name of the ingredient'
+    )
+
+    class Meta(BaseModel.Meta):
+        """Meta options for Ingredient."""
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeIngredient(BaseModel):
+    """Ingredient used by a recipe, indexed to find the recipes containing an ingredient"""
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, verbose_name='Recipe', related_name='recipe_ingredients',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, verbose_name='Ingredient', related_name='recipe_ingredients',
+    )
+    position = models.PositiveIntegerField(
+        verbose_name='Position', help_text='Position of the ingredient in the recipe', default=0
+    )
+
+    class Meta(BaseModel.Meta):
+        """Meta options for RecipeIngredient."""
+        ordering = ['recipe', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'ingredient'], name='recipe_ingredient_unique'),
+        ]
+        indexes = [
+            # Lookup of the recipes containing an ingredient
+            models.Index(fields=['ingredient', 'recipe'], name='recipe_ingredient_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return '%s: %s' % (self.recipe_id, self.ingredient_id)
+
+
+class ChefStats(BaseModel):
+    """
+    Aggregates of the recipes of a chef, kept up to date by the signals of Recipe (see `recipe.stats`), so the
+    dashboards read a row instead of aggregating the recipes. The totals are stored, the averages derived.
+    """
+    chef = models.OneToOneField(
+        User, on_delete=models.CASCADE, verbose_name='Chef', related_name='recipe_stats',
+    )
+    recipe_count = models.PositiveIntegerField(
+        verbose_name='Recipe count', help_text='Number of recipes of the chef', default=0
+    )
+    total_prep_time = models.DurationField(
+        verbose_name='Total prep time', help_text='Sum of the preparation times', default=timezone.timedelta
+    )
+    total_cook_time = models.DurationField(
+        verbose_name='Total cook time', help_text='Sum of the cooking times', default=timezone.timedelta
+    )
+    total_servings = models.PositiveBigIntegerField(
+        verbose_name='Total servings', help_text='Sum of the servings', default=0
+    )
+
+    class Meta(BaseModel.Meta):
+        """Meta options for ChefStats."""
+        verbose_name_plural = 'chef stats'
+        ordering = ['-recipe_count', '-id']
+        indexes = [
+            # Chefs with the most recipes first, see `ChefStatsViewSet`
+            models.Index(fields=['-recipe_count', '-id'], name='chef_stats_ranking_idx'),
+        ]
+
+    def __str__(self):
+        return '%s: %d recipes' % (self.chef_id, self.recipe_count)
+
+    @property
+    def average_prep_time(self):
+        return self.total_prep_time / self.recipe_count if self.recipe_count else None
+
+    @property
+    def average_cook_time(self):
+        return self.total_cook_time / self.recipe_count if self.recipe_count else None
+
+    @property
+    def average_servings(self):
+        return self.total_servings / self.recipe_count if self.recipe_count else None
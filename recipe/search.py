@@ -0,0 +1,157 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Text search configuration of PostgreSQL, `simple` does not depend on the language of the recipes
+SEARCH_CONFIG = 'simple'
+
+# Relevance weights of the searched columns, by column (name > ingredients > description)
+SEARCH_WEIGHTS = {'name': 10.0, 'ingredients': 4.0, 'description': 1.0}
+
+SQLITE_TABLE = 'recipe_recipe_fts'
+
+SQLITE_CREATE = [
+    # External content table, the text is read from `recipe_recipe` and only the index is stored
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5(
+        name, ingredients, description,
+        content='recipe_recipe', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SQLITE_TABLE}_insert AFTER INSERT ON recipe_recipe BEGIN
+        INSERT INTO {SQLITE_TABLE}(rowid, name, ingredients, description)
+        VALUES (new.id, new.name, new.ingredients, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SQLITE_TABLE}_delete AFTER DELETE ON recipe_recipe BEGIN
+        INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}, rowid, name, ingredients, description)
+        VALUES ('delete', old.id, old.name, old.ingredients, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SQLITE_TABLE}_update AFTER UPDATE OF name, ingredients, description
+    ON recipe_recipe BEGIN
+        INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}, rowid, name, ingredients, description)
+        VALUES ('delete', old.id, old.name, old.ingredients, old.description);
+        INSERT INTO {SQLITE_TABLE}(rowid, name, ingredients, description)
+        VALUES (new.id, new.name, new.ingredients, new.description);
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    f'DROP TRIGGER IF EXISTS {SQLITE_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {SQLITE_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {SQLITE_TABLE}_update',
+    f'DROP TABLE IF EXISTS {SQLITE_TABLE}',
+]
+
+SQLITE_REBUILD = f"INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}) VALUES ('rebuild')"
+
+# The same expression is used by the GIN index and by the queries, so PostgreSQL can use the index
+POSTGRESQL_VECTOR = ' || '.join(
+    f"""setweight(to_tsvector('{SEARCH_CONFIG}', coalesce("recipe_recipe"."{column}", '')), '{weight}')"""
+    for column, weight in (('name', 'A'), ('ingredients', 'B'), ('description', 'C'))
+)
+
+POSTGRESQL_CREATE = [
+    f'CREATE INDEX IF NOT EXISTS recipe_search_idx ON recipe_recipe USING GIN (({POSTGRESQL_VECTOR}))',
+]
+
+POSTGRESQL_DROP = [
+    'DROP INDEX IF EXISTS recipe_search_idx',
+]
+
+
+def create_search_index(connection, rebuild=False):
+    """
+    Create the full-text index of the recipes for the database backend of the connection
+    :param connection: Database connection
+    :param rebuild: Index the recipes already stored
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for sql in SQLITE_CREATE:
+                cursor.execute(sql)
+            if rebuild:
+                cursor.execute(SQLITE_REBUILD)
+        elif connection.vendor == 'postgresql':
+            for sql in POSTGRESQL_CREATE:
+                cursor.execute(sql)
+
+
+def drop_search_index(connection):
+    """
+    Drop the full-text index of the recipes
+    :param connection: Database connection
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for sql in SQLITE_DROP:
+                cursor.execute(sql)
+        elif connection.vendor == 'postgresql':
+            for sql in POSTGRESQL_DROP:
+                cursor.execute(sql)
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    """
+    `post_migrate` receiver that restores the SQLite triggers, which are dropped when a migration
+    rebuilds the `recipe_recipe` table
+    """
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and SQLITE_TABLE in connection.introspection.table_names():
+        create_search_index(connection)
+
+
+def search_terms(query):
+    """Split the text typed by the user into the searched terms"""
+    return re.findall(r'\w+', query or '')
+
+
+def search(queryset, query):
+    """
+    Filter the recipes matching the query on name, description and ingredients, annotated with
+    `search_rank` and ordered by relevance
+    :param queryset: Recipe queryset
+    :param query: Text typed by the user, every term must match (prefix match on SQLite)
+    :return: Queryset annotated with `search_rank`
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = ' AND '.join('"%s"*' % term.replace('"', '""') for term in terms)
+        weights = ', '.join(str(SEARCH_WEIGHTS[column]) for column in ('name', 'ingredients', 'description'))
+        # The index is joined once (`RecipeSearchIndex`): the match is run a single time, and the rank of
+        # each recipe is read from its row of the match
+        queryset = queryset.filter(
+            RawSQL(f'"{SQLITE_TABLE}" MATCH %s', [match], output_field=BooleanField()),
+            search_index__isnull=False,
+        ).annotate(
+            # bm25 is lower for better matches
+            search_rank=RawSQL(f'-bm25("{SQLITE_TABLE}", {weights})', [], output_field=FloatField())
+        )
+    elif vendor == 'postgresql':
+        tsquery = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+        text = ' '.join(terms)
+        queryset = queryset.filter(
+            RawSQL(f'({POSTGRESQL_VECTOR}) @@ {tsquery}', [text], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank({POSTGRESQL_VECTOR}, {tsquery})', [text], output_field=FloatField())
+        )
+    else:
+        # Backends without full-text support fall back to a scan
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(name__icontains=term) | Q(description__icontains=term) | Q(ingredients__icontains=term)
+            )
+        queryset = queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return queryset.order_by('-search_rank')
@@ -1,18 +1,80 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.fields import empty
 
-from recipe.models import Recipe
+from core.instrumentation import SerializerTimingMixin
+from core.serializers import FieldSelectionMixin, ValuesSerializer
+from recipe.cache import invalidate_recipes
+from recipe.feed import feeds_saved
+from recipe.models import ChefStats, Recipe
+from recipe.tasks import ingredients_saved, stats_saved
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+def bulk_create_recipes(recipes, batch_size=None):
+    """
+    Insert the recipes with `bulk_create`, with the side effects of `post_save`, which it does not send: the
+    ingredient index, the stats of the chefs, the feeds and the cached responses
+    :param recipes: List with the unsaved recipes
+    :return: List with the saved recipes, with their id
+    """
+    recipes = Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+    ingredients_saved(recipes, created=True)
+    stats_saved(recipes, created=True)
+    feeds_saved(recipes)
+    invalidate_recipes(recipes)
+    return recipes
+
+
+class RecipeListSerializer(SerializerTimingMixin, serializers.ListSerializer):
+    """
+    List serializer that writes the recipes with a single `bulk_create`/`bulk_update`
+    """
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'RECIPE_BULK_MAX_BATCH_SIZE', 1000)
+
+    def create(self, validated_data):
+        recipes = [self.child.Meta.model(**attrs) for attrs in validated_data]
+        return bulk_create_recipes(recipes, batch_size=self.batch_size)
+
+    def update(self, instance, validated_data):
+        # `instance` is the list of recipes in the same order as `validated_data`
+        fields = {'updated_at'}
+        updated_at = timezone.now()
+        for recipe, attrs in zip(instance, validated_data):
+            for attr, value in attrs.items():
+                setattr(recipe, attr, value)
+            fields.update(attrs)
+            # `auto_now` is not applied by `bulk_update`
+            recipe.updated_at = updated_at
+        self.child.Meta.model.objects.bulk_update(instance, fields, batch_size=self.batch_size)
+        for recipe in instance:
+            recipe.set_total_time()
+        ingredients_saved([
+            recipe for recipe in instance if getattr(recipe, '_loaded_ingredients', None) != recipe.ingredients
+        ])
+        stats_saved(instance, created=False)
+        feeds_saved(instance)
+        invalidate_recipes(instance)
+        return instance
+
+
+class RecipeSerializer(SerializerTimingMixin, FieldSelectionMixin, serializers.ModelSerializer):
     """
     Serializer for Recipe objects
     """
     chef = serializers.ReadOnlyField(source='chef.username')
+    # Generated column, mapped to a `ModelField` by default
+    total_time = serializers.DurationField(
+        read_only=True, help_text='Preparation plus cooking time of the recipe, format: HH:MM:SS',
+    )
 
     class Meta:
         model = Recipe
         fields = '__all__'
+        list_serializer_class = RecipeListSerializer
         extra_kwargs = {
             'prep_time': {'help_text': 'Preparation time of the recipe, format: HH:MM:SS'},
             'cook_time': {'help_text': 'Cooking time of the recipe, format: HH:MM:SS'},
@@ -47,3 +109,30 @@ class RecipeSerializer(serializers.ModelSerializer):
         if self.chef:
             data['chef'] = self.chef
         return data
+
+
+class RecipeValuesSerializer(ValuesSerializer):
+    """
+    Read-only fast path of `RecipeSerializer`, serializing `.values()` rows with the same output
+    """
+    serializer_class = RecipeSerializer
+
+
+class ChefStatsSerializer(serializers.ModelSerializer):
+    """
+    Serializer for ChefStats objects
+    """
+    chef = serializers.ReadOnlyField(source='chef.username')
+    average_prep_time = serializers.DurationField(
+        read_only=True, allow_null=True, help_text='Average preparation time of the recipes, format: HH:MM:SS',
+    )
+    average_cook_time = serializers.DurationField(
+        read_only=True, allow_null=True, help_text='Average cooking time of the recipes, format: HH:MM:SS',
+    )
+    average_servings = serializers.FloatField(
+        read_only=True, allow_null=True, help_text='Average servings of the recipes',
+    )
+
+    class Meta:
+        model = ChefStats
+        fields = ['chef', 'recipe_count', 'average_prep_time', 'average_cook_time', 'average_servings', 'updated_at']
@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from recipe.cache import invalidate_recipes, invalidate_user
+from recipe.feed import feeds_deleted, feeds_saved
+from recipe.models import Recipe
+from recipe.tasks import ingredients_saved, stats_deleted, stats_saved
+
+
+@receiver(post_save, sender=Recipe)
+def update_ingredient_index(sender, instance, created, update_fields=None, **kwargs):
+    """Rebuild the ingredient index of the recipe when its ingredients text changes"""
+    if update_fields is not None and 'ingredients' not in update_fields:
+        return
+    if not created and getattr(instance, '_loaded_ingredients', None) == instance.ingredients:
+        return
+    ingredients_saved([instance], created=created)
+    instance._loaded_ingredients = instance.ingredients
+
+
+@receiver(post_save, sender=Recipe)
+def update_saved_recipe_stats(sender, instance, created, update_fields=None, **kwargs):
+    """Apply the changes of the recipe to the stats of its chef"""
+    if update_fields is not None and not set(update_fields) & {'chef', 'chef_id', *Recipe.stats_fields}:
+        return
+    stats_saved([instance], created)
+
+
+@receiver(post_delete, sender=Recipe)
+def update_deleted_recipe_stats(sender, instance, **kwargs):
+    stats_deleted([instance])
+
+
+@receiver(post_save, sender=Recipe)
+def update_saved_recipe_feeds(sender, instance, **kwargs):
+    """Add the recipe to the feeds, or move it in them, before `_loaded_chef_id` is reset"""
+    feeds_saved([instance])
+
+
+@receiver(post_delete, sender=Recipe)
+def update_deleted_recipe_feeds(sender, instance, **kwargs):
+    feeds_deleted([instance])
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_cache(sender, instance, **kwargs):
+    """Invalidate the cached responses containing the recipe"""
+    invalidate_recipes([instance])
+    instance._loaded_chef_id = instance.chef_id
+
+
+@receiver(post_init, sender=User)
+def track_loaded_username(sender, instance, **kwargs):
+    """Keep the username, so the chef id of the previous username is invalidated after a rename"""
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_cache(sender, instance, created, update_fields=None, **kwargs):
+    """Invalidate the cached responses containing the username of the chef"""
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    invalidate_user(instance, created=created)
+    instance._loaded_username = instance.username
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_cache(sender, instance, **kwargs):
+    invalidate_user(instance)
@@ -0,0 +1,136 @@
+"""
+Incremental maintenance of `ChefStats`: every write of recipes is turned into a delta of the totals of their
+chefs, applied with a single `UPDATE ... SET total = total + delta` per chef
+"""
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from recipe.models import ChefStats, Recipe
+
+
+def track_stats_state(recipes):
+    """Remember the state of the recipes as stored, to compute the delta of their next save"""
+    for recipe in recipes:
+        recipe._loaded_stats = recipe.get_stats_state()
+
+
+def update_chef_stats(added=(), removed=()):
+    """
+    Apply the recipes added to and removed from the totals of their chefs
+    :param added: List with the states (see `Recipe.get_stats_state`) of the recipes counted in the stats
+    :param removed: List with the states of the recipes no longer counted
+    """
+    deltas = {}
+    unknown = set()
+    for sign, states in ((1, added), (-1, removed)):
+        for chef_id, prep_time, cook_time, servings in states:
+            if chef_id is None:
+                continue
+            if prep_time is None or cook_time is None or servings is None:
+                # The value before the write is unknown, the stats of the chef are recomputed
+                unknown.add(chef_id)
+                continue
+            delta = deltas.setdefault(chef_id, [0, timezone.timedelta(), timezone.timedelta(), 0])
+            delta[0] += sign
+            delta[1] += sign * prep_time
+            delta[2] += sign * cook_time
+            delta[3] += sign * servings
+
+    now = timezone.now()
+    for chef_id, (count, prep_time, cook_time, servings) in deltas.items():
+        if chef_id in unknown or not (count or prep_time or cook_time or servings):
+            continue
+        updated = ChefStats.objects.filter(chef_id=chef_id).update(
+            recipe_count=F('recipe_count') + count,
+            total_prep_time=F('total_prep_time') + prep_time,
+            total_cook_time=F('total_cook_time') + cook_time,
+            total_servings=F('total_servings') + servings,
+            updated_at=now,
+        )
+        if not updated:
+            # First recipe of the chef, or stats never built: the row is created from the recipes
+            unknown.add(chef_id)
+    if unknown:
+        rebuild_chef_stats(sorted(unknown))
+
+
+def recipes_saved(recipes, created):
+    """
+    Update the stats after the recipes were saved
+    :param recipes: List with the saved recipes
+    :param created: Whether the recipes were inserted
+    """
+    added = []
+    removed = []
+    for recipe in recipes:
+        state = recipe.get_stats_state()
+        if created:
+            added.append(state)
+            continue
+        previous = getattr(recipe, '_loaded_stats', None)
+        if previous is None:
+            # Saved without being loaded, the stored values are unknown
+            previous = (state[0],) + (None,) * (len(state) - 1)
+        if state != previous:
+            added.append(state)
+            removed.append(previous)
+    update_chef_stats(added, removed)
+    track_stats_state(recipes)
+
+
+def recipes_deleted(recipes):
+    """Update the stats after the recipes were deleted"""
+    update_chef_stats(removed=[
+        getattr(recipe, '_loaded_stats', None) or recipe.get_stats_state() for recipe in recipes
+    ])
+
+
+def rebuild_chef_stats(chef_ids):
+    """
+    Recompute the stats of the chefs from their recipes, with one aggregate query. Chefs without recipes keep
+    their row, with zeros. The missing rows of the chefs with recipes are inserted first, so the rows are locked
+    meanwhile and concurrent deltas are applied after the rebuild: with `SELECT ... FOR UPDATE`, or where the
+    database does not support it (SQLite), by a write taking the write lock of the database before the aggregate
+    is read. A chef without recipes nor row, e.g. being deleted, gets no row.
+    :param chef_ids: List with the ids of the chefs
+    """
+    using = router.db_for_write(ChefStats)
+    with transaction.atomic(using=using):
+        now = timezone.now()
+        with_recipes = Recipe.objects.filter(chef_id__in=chef_ids).order_by().values_list('chef_id', flat=True)
+        ChefStats.objects.bulk_create(
+            [ChefStats(chef_id=chef_id, created_at=now, updated_at=now) for chef_id in with_recipes.distinct()],
+            ignore_conflicts=True,
+        )
+        stats = ChefStats.objects.filter(chef_id__in=chef_ids)
+        if connections[using].features.has_select_for_update:
+            list(stats.select_for_update().values_list('id', flat=True))
+        else:
+            stats.update(updated_at=timezone.now())
+        _rebuild_chef_stats(chef_ids)
+
+
+def _rebuild_chef_stats(chef_ids):
+    totals = {
+        row.pop('chef_id'): row
+        for row in Recipe.objects.filter(chef_id__in=chef_ids).order_by().values('chef_id').annotate(
+            recipe_count=Count('id'),
+            total_prep_time=Sum('prep_time'),
+            total_cook_time=Sum('cook_time'),
+            total_servings=Sum('servings'),
+        )
+    }
+    fields = ['recipe_count', 'total_prep_time', 'total_cook_time', 'total_servings', 'updated_at']
+    now = timezone.now()
+    ChefStats.objects.bulk_create(
+        [ChefStats(chef_id=chef_id, created_at=now, updated_at=now, **row) for chef_id, row in totals.items()],
+        update_conflicts=True, unique_fields=['chef'], update_fields=fields,
+    )
+    without_recipes = [chef_id for chef_id in chef_ids if chef_id not in totals]
+    if not without_recipes:
+        return
+    ChefStats.objects.filter(chef_id__in=without_recipes).update(
+        recipe_count=0, total_prep_time=timezone.timedelta(), total_cook_time=timezone.timedelta(), total_servings=0,
+        updated_at=now,
+    )
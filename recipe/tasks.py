@@ -0,0 +1,79 @@
+"""
+Side effects of the recipe writes deferred to the task queue (see `core.tasks`) when `TASK_QUEUE_ENABLED`, else
+run in the request. The cached responses and the feeds are still updated in the request, so a chef reads their
+write right away, and the full-text index is maintained by the database itself.
+
+The tasks invalidate the responses cached by the web processes, so the cache must be shared with the workers,
+which the `core.E001` system check enforces.
+"""
+from core.tasks import enqueue, is_enabled, task
+from recipe.cache import invalidate_recipes
+from recipe.ingredients import index_ingredients
+from recipe.models import Recipe
+from recipe.stats import rebuild_chef_stats, recipes_deleted, recipes_saved, track_stats_state
+
+INDEX_INGREDIENTS = 'recipe.index_ingredients'
+REBUILD_CHEF_STATS = 'recipe.rebuild_chef_stats'
+
+
+@task(INDEX_INGREDIENTS, batch_size=500)
+def run_ingredient_index(recipe_ids):
+    """
+    Index the ingredients of the recipes as stored, the deleted recipes are left out
+    :param recipe_ids: List with the ids of the recipes
+    """
+    recipes = list(Recipe.objects.filter(id__in=recipe_ids).only('id', 'chef_id', 'ingredients'))
+    index_ingredients(recipes)
+    # The lists filtered by ingredient change
+    invalidate_recipes(recipes)
+
+
+@task(REBUILD_CHEF_STATS, batch_size=500)
+def run_chef_stats(chef_ids):
+    """
+    Recompute the stats of the chefs: unlike the deltas of `recipes_saved`, running it again is harmless
+    :param chef_ids: List with the ids of the chefs
+    """
+    rebuild_chef_stats(sorted(set(chef_ids)))
+
+
+def ingredients_saved(recipes, created=False):
+    """
+    Index the ingredients of the saved recipes, see `index_ingredients`
+    """
+    if not is_enabled():
+        index_ingredients(recipes, created=created)
+        return
+    ids = [recipe.id for recipe in recipes]
+    enqueue(INDEX_INGREDIENTS, ids, keys=['ingredients:%s' % recipe_id for recipe_id in ids])
+
+
+def update_chef_stats_later(chef_ids):
+    chef_ids = sorted({chef_id for chef_id in chef_ids if chef_id is not None})
+    enqueue(REBUILD_CHEF_STATS, chef_ids, keys=['chef-stats:%s' % chef_id for chef_id in chef_ids])
+
+
+def stats_saved(recipes, created):
+    """
+    Update the stats of the chefs of the saved recipes, see `recipes_saved`
+    """
+    if not is_enabled():
+        recipes_saved(recipes, created)
+        return
+    chef_ids = []
+    for recipe in recipes:
+        # The recipe may have moved from another chef
+        previous = getattr(recipe, '_loaded_stats', None)
+        chef_ids.extend([recipe.chef_id, getattr(recipe, '_loaded_chef_id', None), previous and previous[0]])
+    update_chef_stats_later(chef_ids)
+    track_stats_state(recipes)
+
+
+def stats_deleted(recipes):
+    """
+    Update the stats of the chefs of the deleted recipes, see `recipes_deleted`
+    """
+    if not is_enabled():
+        recipes_deleted(recipes)
+        return
+    update_chef_stats_later(recipe.chef_id for recipe in recipes)
@@ -124,7 +124,7 @@ class TestRecipeAPI(APITestCase):
         Recipe.objects.create(**validated_data)
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
-        data = response.data[0]
+        data = response.data['results'][0]
         for key, value in self.validated_data.items():
             if key == 'chef':
                 self.assertEqual(data[key], self.chef.username)
@@ -141,7 +141,7 @@ class TestRecipeAPI(APITestCase):
         self.client.force_authenticate(user=None)
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
-        data = response.data[0]
+        data = response.data['results'][0]
         for key, value in self.validated_data.items():
             if key == 'chef':
                 self.assertEqual(data[key], self.chef.username)
@@ -218,7 +218,7 @@ class TestRecipeAPI(APITestCase):
         Recipe.objects.create(**validated_data)
         response = self.client.get(self.url + '?name=' + validated_data['name'])
         self.assertEqual(response.status_code, 200)
-        data = response.data[0]
+        data = response.data['results'][0]
         for key, value in self.validated_data.items():
             if key == 'chef':
                 self.assertEqual(data[key], self.chef.username)
@@ -234,7 +234,7 @@ class TestRecipeAPI(APITestCase):
         Recipe.objects.create(**validated_data)
         response = self.client.get(self.url + '?chef=' + str(self.chef.username))
         self.assertEqual(response.status_code, 200)
-        data = response.data[0]
+        data = response.data['results'][0]
         for key, value in self.validated_data.items():
             if key == 'chef':
                 self.assertEqual(data[key], self.chef.username)
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import include, path
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.authentication import token_cache
+from recipe.ingredients import index_ingredients
+from recipe.models import Recipe
+from recipe.urls import async_urlpatterns, router
+from recipe.views import RecipeViewSet
+
+
+class AsyncURLConf:
+    urlpatterns = async_urlpatterns + [path('', include(router.urls))]
+
+
+def sync_actions_disabled():
+    """Make the sync read actions fail, to check the requests are served by the async ones"""
+    error = AssertionError('Served by the sync action')
+    return mock.patch.multiple(RecipeViewSet, list=mock.Mock(side_effect=error), retrieve=mock.Mock(side_effect=error))
+
+
+@override_settings(API_CACHE_ENABLED=False, REQUEST_SERVER_TIMING=True)
+class TestAsyncRecipeReads(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.other_chef = User.objects.create_user(username='otherchef', password='testpassword')
+        self.recipes = [
+            self.create_recipe('Tomato soup %d' % i, '1 tomato\n1 onion', self.chef) for i in range(3)
+        ] + [self.create_recipe('Garlic bread', '1 garlic\n1 bread', self.other_chef)]
+
+    def create_recipe(self, name: str, ingredients: str, chef: User) -> Recipe:
+        recipe = Recipe.objects.create(
+            name=name,
+            ingredients=ingredients,
+            instructions='Instructions',
+            prep_time=timezone.timedelta(minutes=10),
+            cook_time=timezone.timedelta(minutes=20),
+            chef=chef,
+        )
+        index_ingredients([recipe])
+        return recipe
+
+    def get(self, url: str, data: dict = None, **extra):
+        """Send the request through the async views"""
+        with override_settings(ROOT_URLCONF=AsyncURLConf), sync_actions_disabled():
+            return self.client.get(url, data, **extra)
+
+    def test_same_response_as_sync(self):
+        urls = [
+            (self.url, {}),
+            (self.url, {'page_size': 2}),
+            (self.url, {'q': 'tomato'}),
+            (self.url, {'chef_username': 'OTHERCHEF'}),
+            (self.url, {'has_ingredient': 'garlic', 'name': 'bread'}),
+            (self.url + '%d/' % self.recipes[0].id, {}),
+            (self.url + '%d/' % self.recipes[0].id, {'chef_username': 'otherchef'}),
+            (self.url + '0/', {}),
+        ]
+        for url, data in urls:
+            expected = self.client.get(url, data)
+            response = self.get(url, data)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.content, expected.content)
+            self.assertEqual(response.get('ETag'), expected.get('ETag'))
+
+    def test_cursor_pagination(self):
+        first = self.get(self.url, {'page_size': 3}).json()
+        second = self.get(first['next']).json()
+        self.assertEqual(
+            [item['name'] for item in first['results'] + second['results']],
+            [recipe.name for recipe in reversed(self.recipes)],
+        )
+        self.assertIsNone(second['next'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.get(self.url, {'cursor': 'invalid'}).status_code, 404)
+
+    def test_queries(self):
+        with self.assertNumQueries(1):
+            self.get(self.url)
+        with self.assertNumQueries(1):
+            self.get(self.url + '%d/' % self.recipes[0].id)
+
+    def test_not_modified(self):
+        for url in [self.url, self.url + '%d/' % self.recipes[0].id]:
+            etag = self.get(url, HTTP_IF_NONE_MATCH='"unknown"')['ETag']
+            response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+
+    def test_authenticated_reads(self):
+        token_cache.clear()
+        token = Token.objects.create(user=self.chef)
+        self.assertEqual(self.get(self.url, HTTP_AUTHORIZATION='Token ' + token.key).status_code, 200)
+        self.assertEqual(self.get(self.url, HTTP_AUTHORIZATION='Token invalid').status_code, 401)
+
+    def test_writes_and_browsable_api_are_served_by_the_sync_view(self):
+        self.client.force_authenticate(user=self.chef)
+        with override_settings(ROOT_URLCONF=AsyncURLConf):
+            response = self.client.post(self.url, {
+                'name': 'New recipe', 'ingredients': 'Ingredients', 'instructions': 'Instructions',
+                'prep_time': '00:10:00', 'cook_time': '00:20:00',
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(self.client.delete(self.url + '%d/' % response.data['id']).status_code, 204)
+            response = self.client.get(self.url, HTTP_ACCEPT='text/html')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['Content-Type'].startswith('text/html'))
+
+    @override_settings(API_CACHE_ENABLED=True)
+    def test_cached_responses(self):
+        cache.clear()
+        for url, data in [(self.url, {'chef_username': 'testchef'}), (self.url + '%d/' % self.recipes[0].id, {})]:
+            first = self.get(url, data)
+            with self.assertNumQueries(0):
+                second = self.get(url, data)
+            self.assertEqual(first.content, second.content)
+            self.assertEqual(self.get(url, data, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    async def test_event_loop(self):
+        # Any sync query made from the event loop would raise SynchronousOnlyOperation
+        with sync_actions_disabled():
+            response = await self.async_client.get(self.url, {'q': 'tomato', 'page_size': 2})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), 2)
+            # The queries run in the threads of the async ORM are accounted to the request
+            self.assertIn('desc="1 queries"', response['Server-Timing'])
+            response = await self.async_client.get(self.url + '%d/' % self.recipes[0].id)
+            self.assertEqual(response.json()['name'], 'Tomato soup 0')
@@ -0,0 +1,81 @@
+from concurrent.futures import Future
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.batching import WriteBatcher
+from recipe.models import ChefStats, Recipe
+from recipe.views import flush_created_recipes, get_create_batcher
+
+
+@override_settings(RECIPE_CREATE_BATCHING=True)
+class TestRecipeCreateBatching(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.client.force_authenticate(user=self.chef)
+        self.data = {
+            'name': 'Bread',
+            'ingredients': 'Flour\nWater\nSalt',
+            'instructions': 'Bake',
+            'prep_time': '00:10:00',
+            'cook_time': '00:40:00',
+            'servings': 4,
+        }
+
+    def build_recipe(self, **kwargs):
+        attrs = {
+            'name': 'Recipe',
+            'ingredients': 'Flour',
+            'instructions': 'Instructions',
+            'prep_time': timezone.timedelta(minutes=10),
+            'cook_time': timezone.timedelta(minutes=20),
+            'chef': self.chef,
+        }
+        attrs.update(kwargs)
+        return Recipe(**attrs)
+
+    def test_create(self):
+        response = self.client.post(self.url, self.data, format='json')
+        self.assertEqual(response.status_code, 201)
+        recipe = Recipe.objects.get()
+        self.assertEqual(response.json()['id'], recipe.id)
+        self.assertEqual(response.json()['chef'], 'testchef')
+        self.assertEqual(response.json()['total_time'], '00:50:00')
+        # The side effects of `post_save` are applied to the batch
+        self.assertEqual(ChefStats.objects.get(chef=self.chef).recipe_count, 1)
+        self.assertCountEqual(
+            recipe.recipe_ingredients.values_list('ingredient__name', flat=True), ['flour', 'water', 'salt'],
+        )
+        self.assertEqual(self.client.get(self.url).json()['results'][0]['id'], recipe.id)
+
+    def test_invalid_data(self):
+        # Rejected before joining a batch
+        response = self.client.post(self.url, dict(self.data, name=''), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('name', response.json())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_failing_recipe_of_a_batch(self):
+        batch = [
+            (self.build_recipe(name='First'), Future()),
+            (self.build_recipe(name=None), Future()),
+            (self.build_recipe(name='Last'), Future()),
+        ]
+        WriteBatcher(flush_created_recipes).write(batch)
+        # Only the recipe that cannot be inserted fails, the others are inserted
+        self.assertIsInstance(batch[1][1].exception(), IntegrityError)
+        self.assertEqual(batch[0][1].result().name, 'First')
+        self.assertEqual(batch[2][1].result().name, 'Last')
+        self.assertEqual(sorted(Recipe.objects.values_list('name', flat=True)), ['First', 'Last'])
+        self.assertEqual(ChefStats.objects.get(chef=self.chef).recipe_count, 2)
+
+    def test_batcher_settings(self):
+        with self.settings(RECIPE_CREATE_BATCH_SIZE=2, RECIPE_CREATE_BATCH_WAIT_MS=1):
+            batcher = get_create_batcher()
+            self.assertEqual((batcher.max_size, batcher.max_wait), (2, 0.001))
+            self.assertIs(get_create_batcher(), batcher)
+        self.assertIsNot(get_create_batcher(), batcher)
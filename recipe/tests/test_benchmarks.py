@@ -0,0 +1,45 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipe.benchmarks import parse_count, seed_recipes
+from recipe.models import Recipe, RecipeIngredient
+
+
+class TestBenchmarks(TestCase):
+    def test_parse_count(self):
+        self.assertEqual([parse_count(value) for value in ['500', '10k', '1.5K', '1M']], [500, 10000, 1500, 1000000])
+        with self.assertRaises(ValueError):
+            parse_count('many')
+
+    def test_seed_recipes(self):
+        self.assertEqual(seed_recipes(25, chefs=5, batch_size=10), 25)
+        self.assertEqual(Recipe.objects.count(), 25)
+        self.assertEqual(User.objects.filter(username__startswith='chef').count(), 5)
+        self.assertEqual(
+            RecipeIngredient.objects.values('recipe_id').distinct().count(), 25,
+        )
+        # More recipes for the same chefs
+        seed_recipes(5, chefs=5)
+        self.assertEqual(Recipe.objects.count(), 30)
+        self.assertEqual(User.objects.count(), 5)
+
+    def test_benchmark_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command(
+                'benchmark', 'recipe.list', 'recipe.retrieve', 'chef.signup', recipes='20', chefs=2, iterations=2,
+                warmup=1, memory_iterations=1, output=output, no_test_db=True, stdout=io.StringIO(),
+            )
+            with open(output) as file:
+                data = json.load(file)
+        self.assertEqual(sorted(data['results']), ['chef.signup', 'recipe.list', 'recipe.retrieve'])
+        self.assertEqual(data['metadata']['recipes'], 20)
+        for result in data['results'].values():
+            self.assertGreaterEqual(result['p99_ms'], result['p50_ms'])
+        self.assertEqual(data['results']['recipe.list']['queries_per_request'], 1)
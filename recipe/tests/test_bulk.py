@@ -0,0 +1,117 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipe.models import Recipe
+
+
+class TestRecipeBulkAPI(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/bulk/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.client.force_authenticate(user=self.chef)
+
+    def recipe_data(self, index: int) -> dict:
+        return {
+            'name': 'Recipe %d' % index,
+            'description': 'Description',
+            'ingredients': 'Ingredients',
+            'instructions': 'Instructions',
+            'prep_time': '00:10:00',
+            'cook_time': '00:20:00',
+            'servings': index + 1,
+        }
+
+    def create_recipes(self, count: int) -> list:
+        return [
+            Recipe.objects.create(
+                **{**self.recipe_data(i), 'prep_time': timezone.timedelta(minutes=10),
+                   'cook_time': timezone.timedelta(minutes=20)},
+                chef=self.chef,
+            )
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        data = [self.recipe_data(i) for i in range(5)]
+        # savepoint, insert, ingredient index (insert ingredients, select their ids, insert links), stats of the
+        # chef (update, and since it is their first recipe, a rebuild in a savepoint: select the chefs with recipes,
+        # insert their row, lock, aggregate and upsert) and release
+        with self.assertNumQueries(14):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(Recipe.objects.filter(chef=self.chef).count(), 5)
+        for item, expected in zip(response.data, data):
+            self.assertIsNotNone(item['id'])
+            self.assertEqual(item['name'], expected['name'])
+            self.assertEqual(item['chef'], self.chef.username)
+
+    def test_bulk_create_with_invalid_items(self):
+        data = [self.recipe_data(i) for i in range(3)]
+        data[1].pop('name')
+        data[2]['servings'] = 0
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual([error['index'] for error in errors], [1, 2])
+        self.assertIn('name', errors[0]['errors'])
+        self.assertIn('servings', errors[1]['errors'])
+        # Nothing is written when any item is invalid
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_without_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.url, [self.recipe_data(0)], format='json')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(RECIPE_BULK_MAX_BATCH_SIZE=2)
+    def test_bulk_max_batch_size(self):
+        response = self.client.post(self.url, [self.recipe_data(i) for i in range(3)], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'][0], 'Ensure this list has no more than 2 items.')
+
+    def test_bulk_not_a_list(self):
+        response = self.client.post(self.url, self.recipe_data(0), format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_update(self):
+        recipes = self.create_recipes(3)
+        data = [{**self.recipe_data(i), 'id': recipe.id, 'name': 'Updated %d' % i} for i, recipe in enumerate(recipes)]
+        response = self.client.put(self.url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.data], ['Updated 0', 'Updated 1', 'Updated 2'])
+        for recipe in recipes:
+            updated = Recipe.objects.get(id=recipe.id)
+            self.assertTrue(updated.name.startswith('Updated'))
+            self.assertGreater(updated.updated_at, recipe.updated_at)
+
+    def test_bulk_partial_update(self):
+        recipes = self.create_recipes(2)
+        response = self.client.patch(self.url, [{'id': recipe.id, 'servings': 9} for recipe in recipes], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Recipe.objects.values_list('servings', flat=True)), [9, 9])
+        self.assertEqual(Recipe.objects.get(id=recipes[0].id).name, recipes[0].name)
+
+    def test_bulk_update_with_invalid_ids(self):
+        recipes = self.create_recipes(1)
+        data = [{'id': recipes[0].id}, {'id': recipes[0].id}, {'id': recipes[0].id + 1}, {'name': 'No id'}]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(error['index'], error['errors']['id'][0]) for error in response.json()['errors']],
+            [(1, 'Duplicated id.'), (2, 'Not found.'), (3, 'A valid integer is required.')],
+        )
+
+    def test_bulk_delete(self):
+        recipes = self.create_recipes(3)
+        response = self.client.delete(self.url, [recipes[0].id, recipes[2].id], format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(Recipe.objects.values_list('id', flat=True)), [recipes[1].id])
+
+    def test_bulk_delete_with_unknown_id(self):
+        recipes = self.create_recipes(1)
+        response = self.client.delete(self.url, [recipes[0].id, recipes[0].id + 1], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Recipe.objects.exists())
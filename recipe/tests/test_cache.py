@@ -0,0 +1,133 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipe.cache import chef_id_key, get_chef_id
+from recipe.models import Recipe
+
+
+class TestRecipeResponseCache(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = '/recipes/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.other_chef = User.objects.create_user(username='otherchef', password='testpassword')
+        self.client.force_authenticate(user=self.chef)
+        self.recipe = self.create_recipe('Recipe', self.chef)
+
+    def create_recipe(self, name: str, chef: User) -> Recipe:
+        return Recipe.objects.create(
+            name=name,
+            ingredients='Ingredients',
+            instructions='Instructions',
+            prep_time=timezone.timedelta(minutes=10),
+            cook_time=timezone.timedelta(minutes=20),
+            chef=chef,
+        )
+
+    def names(self, url: str, **params) -> list:
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data['results']]
+
+    def test_cached_list_and_detail(self):
+        for url in [self.url, self.url + '%d/' % self.recipe.id]:
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(first.data, second.data)
+            self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_normalized_query_string(self):
+        self.client.get(self.url, {'name': 'Recipe', 'chef_username': 'testchef'})
+        with self.assertNumQueries(0):
+            self.client.get(self.url + '?chef_username=testchef&name=Recipe')
+
+    def test_invalidation_on_create_update_delete(self):
+        self.assertEqual(self.names(self.url), ['Recipe'])
+        recipe = self.create_recipe('New recipe', self.chef)
+        self.assertEqual(self.names(self.url), ['New recipe', 'Recipe'])
+
+        detail_url = self.url + '%d/' % recipe.id
+        self.assertEqual(self.client.get(detail_url).data['name'], 'New recipe')
+        self.client.patch(detail_url, {'name': 'Renamed recipe'}, format='json')
+        self.assertEqual(self.client.get(detail_url).data['name'], 'Renamed recipe')
+
+        self.client.delete(detail_url)
+        self.assertEqual(self.client.get(detail_url).status_code, 404)
+        self.assertEqual(self.names(self.url), ['Recipe'])
+
+    def test_invalidation_on_bulk_create(self):
+        self.assertEqual(self.names(self.url), ['Recipe'])
+        self.client.post(self.url + 'bulk/', [{
+            'name': 'Bulk recipe', 'ingredients': 'Ingredients', 'instructions': 'Instructions',
+            'prep_time': '00:10:00', 'cook_time': '00:20:00',
+        }], format='json')
+        self.assertEqual(self.names(self.url), ['Bulk recipe', 'Recipe'])
+
+    def test_chef_list_is_kept_on_writes_of_other_chefs(self):
+        self.assertEqual(self.names(self.url, chef_username='testchef'), ['Recipe'])
+        self.create_recipe('Other recipe', self.other_chef)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(self.url, chef_username='testchef'), ['Recipe'])
+        self.assertEqual(self.names(self.url), ['Other recipe', 'Recipe'])
+        self.create_recipe('New recipe', self.chef)
+        self.assertEqual(self.names(self.url, chef_username='testchef'), ['New recipe', 'Recipe'])
+
+    def test_invalidation_on_username_change(self):
+        self.assertEqual(self.client.get(self.url).data['results'][0]['chef'], 'testchef')
+        self.assertEqual(get_chef_id('testchef'), self.chef.id)
+        self.chef.username = 'renamedchef'
+        self.chef.save()
+        self.assertEqual(self.client.get(self.url).data['results'][0]['chef'], 'renamedchef')
+        self.assertEqual(self.names(self.url, chef_username='testchef'), [])
+        # The previous username no longer resolves to the chef
+        self.assertEqual(get_chef_id('testchef'), 0)
+
+    def test_not_modified(self):
+        for url in [self.url, self.url + '%d/' % self.recipe.id]:
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+            self.create_recipe('New recipe', self.chef).delete()
+            self.recipe.save()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_read_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.create_recipe('Draft recipe', self.chef)
+            # A read of another client before the commit, cached under the version bumped by the write
+            self.assertEqual(self.names(self.url), ['Draft recipe', 'Recipe'])
+            # Written without signals, as the rows the other clients read once committed
+            Recipe.objects.filter(id=recipe.id).update(name='New recipe')
+        self.assertEqual(self.names(self.url), ['New recipe', 'Recipe'])
+
+    def test_invalidation_of_padded_id(self):
+        url = self.url + '0%d/' % self.recipe.id
+        self.assertEqual(self.client.get(url).data['name'], 'Recipe')
+        self.client.patch(self.url + '%d/' % self.recipe.id, {'name': 'Renamed recipe'}, format='json')
+        self.assertEqual(self.client.get(url).data['name'], 'Renamed recipe')
+
+    def test_chef_id_key(self):
+        username = 'chef with spaces ' + 'x' * 300
+        key = chef_id_key(username)
+        self.assertLess(len(key), 250)
+        self.assertNotIn(' ', key)
+        self.assertEqual(key, chef_id_key(username.upper()))
+
+    def test_missing_chef_is_cached_shortly(self):
+        self.assertEqual(get_chef_id('newchef'), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_chef_id('newchef'), 0)
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 3600):
+            with self.assertNumQueries(1):
+                self.assertEqual(get_chef_id('newchef'), 0)
+        self.assertEqual(get_chef_id('testchef'), self.chef.id)
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 3600):
+            with self.assertNumQueries(0):
+                self.assertEqual(get_chef_id('testchef'), self.chef.id)
@@ -0,0 +1,96 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APITestCase
+
+from recipe.models import Recipe
+
+
+# The response cache is disabled to check the validators computed from the database
+@override_settings(API_CACHE_ENABLED=False)
+class TestRecipeConditionalGet(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.recipes = [self.create_recipe('Recipe %d' % i) for i in range(3)]
+        self.detail_url = self.url + '%d/' % self.recipes[0].id
+
+    def create_recipe(self, name: str) -> Recipe:
+        return Recipe.objects.create(
+            name=name,
+            ingredients='Ingredients',
+            instructions='Instructions',
+            prep_time=timezone.timedelta(minutes=10),
+            cook_time=timezone.timedelta(minutes=20),
+            chef=self.chef,
+        )
+
+    def get_list_etag(self, **params):
+        # Without the response cache, the ETag of a list is only computed for conditional requests
+        return self.client.get(self.url, params, HTTP_IF_NONE_MATCH='"unknown"')['ETag']
+
+    def test_list_etag_only_when_conditional(self):
+        self.assertNotIn('ETag', self.client.get(self.url))
+        with self.settings(API_CACHE_ENABLED=True):
+            self.assertIn('ETag', self.client.get(self.url))
+
+    def test_list_not_modified(self):
+        etag = self.get_list_etag()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_list_modified(self):
+        etag = self.get_list_etag()
+        self.recipes[1].save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = self.get_list_etag()
+        self.recipes[1].delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_modified_chef(self):
+        etag = self.get_list_etag()
+        self.chef.username = 'renamedchef'
+        self.chef.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['chef'], 'renamedchef')
+
+    def test_list_etag_depends_on_filters(self):
+        etag = self.get_list_etag()
+        response = self.client.get(self.url, {'name': 'Recipe 1'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.recipes[2].save()  # Not part of the filtered list
+        self.assertEqual(self.client.get(self.url, {'name': 'Recipe 1'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_detail_not_modified(self):
+        response = self.client.get(self.detail_url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(last_modified, http_date(self.recipes[0].updated_at.timestamp()))
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_detail_modified(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.recipes[0].name = 'Renamed'
+        self.recipes[0].save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Renamed')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_modified_chef(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.chef.username = 'renamedchef'
+        self.chef.save()
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_not_found(self):
+        response = self.client.get(self.url + '%d/' % (self.recipes[-1].id + 1), HTTP_IF_NONE_MATCH='"etag"')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import AsyncClient
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipe.models import Recipe
+
+
+class TestRecipeExport(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/export/'
+        self.chefs = [
+            User.objects.create_user(username='testchef%d' % i, password='testpassword') for i in range(2)
+        ]
+        for i in range(5):
+            Recipe.objects.create(
+                name='Recipe %d' % i,
+                description='Description, with "quotes"\r\nand lines' if i % 2 else None,
+                ingredients='Ingredients',
+                instructions='Instructions',
+                prep_time=timezone.timedelta(minutes=10 + i),
+                cook_time=timezone.timedelta(hours=1),
+                servings=i + 1,
+                chef=self.chefs[i % 2],
+            )
+
+    def read(self, response) -> str:
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_export_ndjson(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        # The rows must match the representation of the API
+        expected = json.loads(self.client.get('/recipes/', {'page_size': 100}).content)['results']
+        self.assertEqual(rows, expected)
+
+    def test_export_csv(self):
+        response = self.client.get(self.url, {'output': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(self.read(response), newline='')))
+        self.assertEqual(len(rows), 5)
+        recipe = Recipe.objects.get(name=rows[0]['name'])
+        self.assertEqual(rows[0]['chef'], recipe.chef.username)
+        self.assertEqual(rows[0]['prep_time'], '00:14:00')
+        self.assertEqual(rows[1]['description'], 'Description, with "quotes"\r\nand lines')
+
+    async def test_export_asgi(self):
+        response = await AsyncClient().get(self.url, {'output': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(content, newline='')))
+        self.assertEqual([row['name'] for row in rows], ['Recipe %d' % i for i in reversed(range(5))])
+
+    def test_export_with_filters(self):
+        response = self.client.get(self.url, {'chef_username': 'testchef1'})
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(sorted(row['name'] for row in rows), ['Recipe 1', 'Recipe 3'])
+
+    def test_export_invalid_format(self):
+        response = self.client.get(self.url, {'output': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command(self):
+        stdout = io.StringIO()
+        call_command('export_recipes', '--filter', 'name=Recipe 2', '--chunk-size', '2', stdout=stdout)
+        rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Recipe 2'])
+
+    def test_export_command_invalid_filter(self):
+        with self.assertRaises(CommandError):
+            call_command('export_recipes', '--filter', 'unknown=value', stdout=io.StringIO())
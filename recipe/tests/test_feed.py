@@ -0,0 +1,192 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipe.feed import Feed, FeedRing, get_feed_size, get_recipe_key
+from recipe.models import Recipe
+
+
+class TestFeedRing(SimpleTestCase):
+    def setUp(self):
+        self.ring = FeedRing([(1, 1, 1), (2, 2, 2), (3, 3, 3), (4, 4, 4)], complete=False)
+
+    def test_get_page(self):
+        self.assertEqual(self.ring.get_page(None, False, 2), [(4, 4, 4), (3, 3, 3)])
+        self.assertEqual(self.ring.get_page((3, 3, 3), False, 2), [(2, 2, 2), (1, 1, 1)])
+        # Older recipes than the ring may exist
+        self.assertIsNone(self.ring.get_page((2, 2, 2), False, 2))
+        self.ring.complete = True
+        self.assertEqual(self.ring.get_page((2, 2, 2), False, 2), [(1, 1, 1)])
+
+    def test_get_previous_page(self):
+        self.assertEqual(self.ring.get_page((1, 1, 1), True, 2), [(2, 2, 2), (3, 3, 3)])
+        self.assertIsNone(self.ring.get_page((0, 0, 0), True, 2))
+
+    def test_add_and_remove(self):
+        self.ring.add([(5, 5, 5), (0, 0, 0), (2, 3, 6)], size=5)
+        # The recipe older than the ring is left out, the ring keeps the newest 5
+        self.assertEqual(self.ring.entries, [(2, 2, 2), (2, 3, 6), (3, 3, 3), (4, 4, 4), (5, 5, 5)])
+        self.ring.remove({3, 6})
+        self.assertEqual(self.ring.entries, [(2, 2, 2), (4, 4, 4), (5, 5, 5)])
+        self.assertTrue(self.ring.is_usable(5))
+        self.assertFalse(self.ring.is_usable(8))
+
+
+@override_settings(API_CACHE_ENABLED=False)
+class TestRecipeFeed(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        cache.clear()
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.other_chef = User.objects.create_user(username='otherchef', password='testpassword')
+        self.client.force_authenticate(user=self.chef)
+        self.recipes = [self.create_recipe(i, self.chef if i % 2 else self.other_chef) for i in range(5)]
+
+    def create_recipe(self, index, chef):
+        return Recipe.objects.create(
+            name='Recipe %d' % index,
+            ingredients='Ingredients',
+            instructions='Instructions',
+            prep_time=timezone.timedelta(minutes=10),
+            cook_time=timezone.timedelta(minutes=20),
+            chef=chef,
+        )
+
+    def get_ids(self, params=None):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def walk(self, params):
+        """
+        :return: Tuple with the ids of every page following the `next` links, and of every page following the
+                 `previous` links back
+        """
+        ids = []
+        data = self.client.get(self.url, params).json()
+        ids.extend(recipe['id'] for recipe in data['results'])
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            ids.extend(recipe['id'] for recipe in data['results'])
+        previous_ids = [recipe['id'] for recipe in data['results']]
+        while data['previous']:
+            data = self.client.get(data['previous']).json()
+            previous_ids = [recipe['id'] for recipe in data['results']] + previous_ids
+        return ids, previous_ids
+
+    def test_first_page_without_sorting(self):
+        with CaptureQueriesContext(connection) as context:
+            ids = self.get_ids()
+        self.assertEqual(ids, [recipe.id for recipe in reversed(self.recipes)])
+        # Built on the first read, then the page is read by id
+        sql = context.captured_queries[-1]['sql']
+        self.assertIn('IN (', sql)
+        self.assertNotIn('ORDER BY', sql)
+
+        with CaptureQueriesContext(connection) as context:
+            self.get_ids()
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('ORDER BY', context.captured_queries[-1]['sql'])
+
+    def test_pages_match_the_database(self):
+        for params in ({'page_size': 2}, {'page_size': 2, 'chef_username': 'testchef'}):
+            with self.settings(RECIPE_FEED_SIZE=0):
+                expected = self.walk(params)
+            self.assertEqual(self.walk(params), expected)
+            # Pages older than the ring are read from the database
+            cache.clear()
+            with self.settings(RECIPE_FEED_SIZE=3):
+                self.assertEqual(self.walk(params), expected)
+
+    def test_writes_update_the_feed(self):
+        self.get_ids()
+        response = self.client.post(self.url, {
+            'name': 'New recipe',
+            'ingredients': 'Ingredients',
+            'instructions': 'Instructions',
+            'prep_time': '00:10:00',
+            'cook_time': '00:20:00',
+        }, format='json')
+        recipe_id = response.json()['id']
+        self.assertEqual(self.get_ids()[0], recipe_id)
+        self.assertEqual(self.get_ids({'chef_username': 'testchef'})[0], recipe_id)
+
+        self.client.delete('%s%d/' % (self.url, recipe_id))
+        self.assertNotIn(recipe_id, self.get_ids())
+        self.assertNotIn(recipe_id, [key[2] for key in Feed().get_ring().entries])
+
+    def test_chef_change_moves_the_recipe(self):
+        self.assertEqual(self.get_ids({'chef_username': 'otherchef'}), [
+            recipe.id for recipe in reversed(self.recipes) if recipe.chef == self.other_chef
+        ])
+        self.get_ids({'chef_username': 'testchef'})
+        recipe = Recipe.objects.get(id=self.recipes[4].id)
+        recipe.chef = self.chef
+        recipe.save()
+        self.assertNotIn(recipe.id, self.get_ids({'chef_username': 'otherchef'}))
+        self.assertEqual(self.get_ids({'chef_username': 'testchef'})[0], recipe.id)
+
+    def test_commit_applies_the_changes_again(self):
+        self.get_ids()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            recipe = self.create_recipe(5, self.chef)
+        self.assertTrue(callbacks)
+        self.assertEqual(Feed().get_ring().entries.count(get_recipe_key(recipe)), 1)
+
+        # Built again before the commit, from the database without the recipe
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.create_recipe(6, self.chef)
+            Feed().drop()
+            with mock.patch.object(Feed, 'build_ring', lambda feed, size: FeedRing([], complete=True)):
+                Feed().get_ring()
+        self.assertEqual(Feed().get_ring().entries, [get_recipe_key(recipe)])
+
+    def test_older_writes_leave_the_ring(self):
+        with self.settings(RECIPE_FEED_SIZE=3):
+            self.get_ids()
+            with mock.patch.object(Feed, 'update') as update:
+                self.recipes[0].save()
+                self.recipes[1].delete()
+                update.assert_not_called()
+                self.recipes[4].save()
+                update.assert_called_once_with([self.recipes[4].id], [get_recipe_key(self.recipes[4])])
+
+    def test_lock_held_by_others(self):
+        self.get_ids()
+        cache.add(Feed().key + ':lock', 1)
+        with mock.patch('recipe.feed.time.sleep') as sleep:
+            # The update gives up after a few short sleeps, the ring is built again on the next read
+            Feed().update(removed_ids=[self.recipes[4].id])
+            self.assertEqual(sleep.call_count, 3)
+            self.assertIsNone(Feed().get_ring())
+        cache.delete(Feed().key + ':lock')
+        self.assertEqual(self.get_ids(), [recipe.id for recipe in reversed(self.recipes)])
+
+    def test_stale_ring_is_dropped(self):
+        self.get_ids()
+        # A recipe created by a transaction rolled back
+        Feed().update(added_keys=[(timezone.now(), timezone.now(), 999)])
+        self.assertEqual(self.get_ids(), [recipe.id for recipe in reversed(self.recipes)])
+        self.assertNotIn(999, [key[2] for key in Feed().get_ring().entries])
+
+    @override_settings(RECIPE_FEED_SIZE=0)
+    def test_disabled(self):
+        with CaptureQueriesContext(connection) as context:
+            self.get_ids()
+        self.assertIn('ORDER BY', context.captured_queries[-1]['sql'])
+
+    @override_settings(RECIPE_FEED_SIZE=10)
+    def test_disabled_without_shared_cache(self):
+        # The local-memory cache is only fine with a single process
+        self.assertEqual(get_feed_size(), 10)
+        with self.settings(WEB_CONCURRENCY=4):
+            self.assertEqual(get_feed_size(), 0)
+            shared_cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/unused'}
+            with self.settings(CACHES={'default': shared_cache}):
+                self.assertEqual(get_feed_size(), 10)
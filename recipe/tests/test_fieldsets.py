@@ -0,0 +1,107 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipe.models import Recipe
+
+
+class TestRecipeSparseFieldsets(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.client.force_authenticate(user=self.chef)
+        self.recipes = [
+            Recipe.objects.create(
+                name='Recipe %d' % i,
+                description='Description',
+                ingredients='Ingredients',
+                instructions='Instructions',
+                prep_time=timezone.timedelta(minutes=10),
+                cook_time=timezone.timedelta(minutes=20),
+                chef=self.chef,
+            )
+            for i in range(3)
+        ]
+
+    def get_list(self, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        # The page is the last query, after the count of the validators
+        return response.json(), context.captured_queries[-1]['sql']
+
+    def test_fields(self):
+        data, sql = self.get_list({'fields': 'id,name'})
+        self.assertEqual(data['results'], [{'id': recipe.id, 'name': recipe.name} for recipe in reversed(self.recipes)])
+        # Neither the text columns nor the chef are read
+        self.assertNotIn('instructions', sql)
+        self.assertNotIn('auth_user', sql)
+
+        data, sql = self.get_list({'fields': 'name,chef'})
+        self.assertEqual(data['results'][0], {'chef': 'testchef', 'name': 'Recipe 2'})
+        self.assertIn('auth_user', sql)
+
+    def test_omit(self):
+        data, sql = self.get_list({'omit': 'description,ingredients,instructions'})
+        self.assertEqual(set(data['results'][0]), {
+            'id', 'chef', 'total_time', 'created_at', 'updated_at', 'name', 'prep_time', 'cook_time', 'servings',
+        })
+        self.assertNotIn('"description"', sql)
+
+        # Both parameters, repeated or not
+        data, sql = self.get_list([('fields', 'id,name'), ('fields', 'servings'), ('omit', 'id')])
+        self.assertEqual(data['results'][0], {'name': 'Recipe 2', 'servings': 1})
+
+    def test_invalid_fields(self):
+        response = self.client.get(self.url, {'fields': 'name,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unknown fields: secret.', response.json()['fields'][0])
+        response = self.client.get(self.url, {'omit': 'password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('omit', response.json())
+        self.assertEqual(self.client.get(self.url, {'fields': ''}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'fields': 'name', 'omit': 'name'}).status_code, 400)
+
+    def test_pages_keep_the_fields(self):
+        data, sql = self.get_list({'fields': 'name', 'page_size': 2})
+        # The columns of the cursor are read, but not serialized
+        self.assertEqual(data['results'], [{'name': 'Recipe 2'}, {'name': 'Recipe 1'}])
+        response = self.client.get(data['next'])
+        self.assertEqual(response.json()['results'], [{'name': 'Recipe 0'}])
+
+        data, sql = self.get_list({'fields': 'name', 'ordering': 'total_time', 'page_size': 2})
+        self.assertEqual(self.client.get(data['next']).json()['results'], [{'name': 'Recipe 2'}])
+
+    def test_retrieve(self):
+        url = '%s%d/' % (self.url, self.recipes[0].id)
+        response = self.client.get(url, {'fields': 'name,servings'})
+        self.assertEqual(response.json(), {'name': 'Recipe 0', 'servings': 1})
+
+        # Each fieldset is another representation, with its own ETag
+        full = self.client.get(url)
+        self.assertNotEqual(response['ETag'], full['ETag'])
+        response = self.client.get(url, {'fields': 'name,servings'}, HTTP_IF_NONE_MATCH=full['ETag'])
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, {'fields': 'name,servings'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_responses(self):
+        with self.settings(API_CACHE_ENABLED=True):
+            self.assertEqual(len(self.client.get(self.url, {'fields': 'name'}).json()['results'][0]), 1)
+            self.assertEqual(len(self.client.get(self.url).json()['results'][0]), 12)
+
+    def test_export(self):
+        response = self.client.get(self.url + 'export/', {'output': 'csv', 'fields': 'name,servings'})
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [
+            'name,servings', 'Recipe 2,1', 'Recipe 1,1', 'Recipe 0,1',
+        ])
+
+    def test_write_actions_use_every_field(self):
+        response = self.client.patch(
+            '%s%d/?fields=name' % (self.url, self.recipes[0].id), {'servings': 4}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['servings'], 4)
+        self.assertIn('instructions', response.json())
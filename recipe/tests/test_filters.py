@@ -0,0 +1,109 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.query_plans import QueryPlanRecorder, find_plan_issues
+from recipe.models import Recipe
+
+
+class TestRecipeTimeFilters(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.client.force_authenticate(user=self.chef)
+        # (prep minutes, cook minutes, servings)
+        self.recipes = [
+            Recipe.objects.create(
+                name='Recipe %d' % i,
+                ingredients='Ingredients',
+                instructions='Instructions',
+                prep_time=timezone.timedelta(minutes=prep),
+                cook_time=timezone.timedelta(minutes=cook),
+                servings=servings,
+                chef=self.chef,
+            )
+            for i, (prep, cook, servings) in enumerate([(10, 50, 2), (30, 0, 4), (5, 20, 1), (45, 90, 8), (15, 15, 4)])
+        ]
+
+    def get_names(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()['results']]
+
+    def test_total_time(self):
+        response = self.client.get('/recipes/%d/' % self.recipes[0].id)
+        self.assertEqual(response.json()['total_time'], '01:00:00')
+
+        # The generated column is not returned by the UPDATE, it is computed from the saved times
+        response = self.client.patch('/recipes/%d/' % self.recipes[0].id, {'cook_time': '00:05:00'}, format='json')
+        self.assertEqual(response.json()['total_time'], '00:15:00')
+        self.assertEqual(Recipe.objects.get(id=self.recipes[0].id).total_time, timezone.timedelta(minutes=15))
+
+        response = self.client.patch(
+            '/recipes/bulk/', [{'id': self.recipes[1].id, 'prep_time': '00:01:00'}], format='json',
+        )
+        self.assertEqual(response.json()[0]['total_time'], '00:01:00')
+
+    def test_range_filters(self):
+        self.assertEqual(self.get_names({'total_time_max': '00:30:00'}), ['Recipe 4', 'Recipe 2', 'Recipe 1'])
+        self.assertEqual(
+            self.get_names({'total_time_min': '00:30:00', 'total_time_max': '01:00:00'}),
+            ['Recipe 4', 'Recipe 1', 'Recipe 0'],
+        )
+        self.assertEqual(self.get_names({'prep_time_min': '00:30:00'}), ['Recipe 3', 'Recipe 1'])
+        self.assertEqual(self.get_names({'prep_time_max': '00:10:00'}), ['Recipe 2', 'Recipe 0'])
+        self.assertEqual(self.get_names({'cook_time_min': '01:00:00'}), ['Recipe 3'])
+        self.assertEqual(self.get_names({'cook_time_max': '00:15:00'}), ['Recipe 4', 'Recipe 1'])
+        self.assertEqual(self.get_names({'servings_min': 4, 'servings_max': 4}), ['Recipe 4', 'Recipe 1'])
+        self.assertEqual(self.get_names({'servings_min': 4, 'cook_time_min': '00:15:00'}), ['Recipe 4', 'Recipe 3'])
+
+        response = self.client.get(self.url, {'total_time_min': 'soon'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('total_time_min', response.json())
+
+    def test_ordering(self):
+        self.assertEqual(
+            self.get_names({'ordering': 'total_time'}), ['Recipe 2', 'Recipe 1', 'Recipe 4', 'Recipe 0', 'Recipe 3'],
+        )
+        self.assertEqual(
+            self.get_names({'ordering': '-prep_time'}), ['Recipe 3', 'Recipe 1', 'Recipe 4', 'Recipe 0', 'Recipe 2'],
+        )
+        # Equal servings are ordered by id, in the direction of the ordering
+        self.assertEqual(
+            self.get_names({'ordering': '-servings'}), ['Recipe 3', 'Recipe 4', 'Recipe 1', 'Recipe 0', 'Recipe 2'],
+        )
+        self.assertEqual(self.client.get(self.url, {'ordering': 'name'}).status_code, 400)
+
+    def test_ordering_is_paginated(self):
+        # Equal total times, the id tiebreaker keeps the pages stable
+        Recipe.objects.create(
+            name='Recipe 5', ingredients='Ingredients', instructions='Instructions',
+            prep_time=timezone.timedelta(minutes=20), cook_time=timezone.timedelta(minutes=10), chef=self.chef,
+        )
+        names = []
+        url = self.url + '?ordering=total_time&page_size=2'
+        while url:
+            response = self.client.get(url)
+            names += [item['name'] for item in response.json()['results']]
+            url = response.json()['next']
+        self.assertEqual(names, ['Recipe 2', 'Recipe 1', 'Recipe 4', 'Recipe 5', 'Recipe 0', 'Recipe 3'])
+
+        response = self.client.get(self.url, {'ordering': 'total_time', 'page_size': 2})
+        response = self.client.get(self.client.get(response.json()['next']).json()['previous'])
+        self.assertEqual([item['name'] for item in response.json()['results']], ['Recipe 2', 'Recipe 1'])
+
+    def test_plans_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('The plans of %s depend on the size of the tables' % connection.vendor)
+        for params, index in (
+            ({'ordering': 'total_time'}, 'recipe_total_time_idx'),
+            ({'ordering': '-servings'}, 'recipe_servings_idx'),
+            # The range and the ordering are both resolved from the index
+            ({'ordering': 'total_time', 'total_time_max': '00:30:00'}, 'recipe_total_time_idx'),
+        ):
+            with QueryPlanRecorder() as recorder:
+                self.client.get(self.url, params)
+            page_sql, page_plan = recorder.plans[-1]
+            self.assertIn(index, '\n'.join(page_plan))
+            self.assertEqual(find_plan_issues(connection.vendor, page_sql, page_plan), [])
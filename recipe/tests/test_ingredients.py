@@ -0,0 +1,98 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipe.ingredients import normalize_ingredient, parse_ingredients
+from recipe.models import Ingredient, Recipe, RecipeIngredient
+
+
+class TestIngredientParser(TestCase):
+    def test_normalize_ingredient(self):
+        cases = [
+            ('1 colher de sopa de azeite', 'azeite'),
+            ('Meia colher de sopa de alho', 'alho'),
+            ('2 colheres de sopa de cebola picadinha', 'cebola picadinha'),
+            ('200 gramas, ou uma xícara de chá de bacalhau cozido e desfiado', 'bacalhau cozido e desfiado'),
+            ('2 batatas médias cozidas, descascadas e amassadas', 'batatas médias cozidas'),
+            ('Sal a gosto', 'sal'),
+            ('- 2 cloves garlic (minced)', 'garlic'),
+            ('1/2 cup of Olive   Oil', 'olive oil'),
+            ('1', ''),
+        ]
+        for line, expected in cases:
+            self.assertEqual(normalize_ingredient(line), expected, line)
+
+    def test_parse_ingredients(self):
+        text = '1 ovo batido\r\n2 dentes de alho\r\n\r\n1 ovo\r\nSal a gosto'
+        self.assertEqual(parse_ingredients(text), ['ovo batido', 'alho', 'ovo', 'sal'])
+
+
+class TestIngredientIndex(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.client.force_authenticate(user=self.chef)
+        self.bread = self.create_recipe('Garlic bread', '1 bread\n2 cloves garlic\n50 g butter')
+        self.pasta = self.create_recipe('Pasta', '200 g pasta\n1 clove garlic\n2 tbsp olive oil')
+        self.salad = self.create_recipe('Salad', 'Lettuce\nOlive oil\nSalt to taste')
+
+    def create_recipe(self, name: str, ingredients: str) -> Recipe:
+        return Recipe.objects.create(
+            name=name,
+            ingredients=ingredients,
+            instructions='Instructions',
+            prep_time=timezone.timedelta(minutes=10),
+            cook_time=timezone.timedelta(minutes=20),
+            chef=self.chef,
+        )
+
+    def filter(self, **params) -> set:
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.data['results']}
+
+    def test_index_on_save(self):
+        self.assertEqual(
+            list(self.bread.recipe_ingredients.values_list('ingredient__name', flat=True)),
+            ['bread', 'garlic', 'butter'],
+        )
+        self.bread.ingredients = 'Bread\nGarlic'
+        self.bread.save()
+        self.assertEqual(
+            list(self.bread.recipe_ingredients.values_list('ingredient__name', flat=True)), ['bread', 'garlic']
+        )
+        self.assertEqual(Ingredient.objects.filter(name='garlic').count(), 1)
+
+    def test_has_ingredient(self):
+        self.assertEqual(self.filter(has_ingredient='Garlic'), {self.bread.id, self.pasta.id})
+        self.assertEqual(self.filter(has_ingredient='butter, lettuce'), {self.bread.id, self.salad.id})
+        self.assertEqual(self.filter(has_ingredient='chocolate'), set())
+
+    def test_all_ingredients(self):
+        self.assertEqual(self.filter(all_ingredients='garlic,olive oil'), {self.pasta.id})
+        self.assertEqual(self.filter(all_ingredients='olive oil'), {self.pasta.id, self.salad.id})
+
+    def test_exclude_ingredient(self):
+        self.assertEqual(self.filter(exclude_ingredient='garlic'), {self.salad.id})
+        self.assertEqual(
+            self.filter(has_ingredient='olive oil', exclude_ingredient='lettuce'), {self.pasta.id}
+        )
+
+    def test_index_on_bulk_create(self):
+        response = self.client.post(self.url + 'bulk/', [{
+            'name': 'Garlic soup', 'ingredients': '3 cloves garlic\n1 l water', 'instructions': 'Boil',
+            'prep_time': '00:05:00', 'cook_time': '00:30:00',
+        }], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(response.data[0]['id'], self.filter(has_ingredient='garlic'))
+
+    def test_backfill_command(self):
+        RecipeIngredient.objects.all().delete()
+        self.assertEqual(self.filter(has_ingredient='garlic'), set())
+        call_command('backfill_ingredients', '--batch-size', '2', stdout=io.StringIO())
+        self.assertEqual(self.filter(has_ingredient='garlic'), {self.bread.id, self.pasta.id})
+        self.assertEqual(RecipeIngredient.objects.count(), 9)
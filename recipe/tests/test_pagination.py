@@ -0,0 +1,86 @@
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.pagination import KeysetPagination
+from recipe.models import Recipe
+
+
+class TestRecipePagination(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.recipes = [
+            Recipe.objects.create(
+                name='Recipe %d' % i,
+                ingredients='Ingredients',
+                instructions='Instructions',
+                prep_time=timezone.timedelta(minutes=10),
+                cook_time=timezone.timedelta(minutes=20),
+                chef=self.chef,
+            )
+            for i in range(7)
+        ]
+
+    def walk(self, url):
+        """
+        Follow the `next` links starting from the given url
+        :param url: First page url
+        :return: List with the pages returned by the API
+        """
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def test_list_is_paginated(self):
+        response = self.client.get(self.url + '?page_size=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_walk_all_pages(self):
+        pages = self.walk(self.url + '?page_size=3')
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        ids = [item['id'] for page in pages for item in page['results']]
+        self.assertEqual(ids, [recipe.id for recipe in reversed(self.recipes)])
+
+    def test_walk_all_pages_with_equal_timestamps(self):
+        # The id tiebreaker must keep the pages stable when the timestamps collide
+        now = timezone.now()
+        Recipe.objects.update(created_at=now, updated_at=now)
+        pages = self.walk(self.url + '?page_size=2')
+        ids = [item['id'] for page in pages for item in page['results']]
+        self.assertEqual(ids, sorted((recipe.id for recipe in self.recipes), reverse=True))
+
+    def test_previous_page(self):
+        first = self.client.get(self.url + '?page_size=3').data
+        second = self.client.get(first['next']).data
+        previous = self.client.get(second['previous']).data
+        self.assertEqual(
+            [item['id'] for item in previous['results']],
+            [item['id'] for item in first['results']],
+        )
+        self.assertIsNone(previous['previous'])
+        self.assertIsNotNone(previous['next'])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(self.url + '?page_size=%d' % (KeysetPagination().get_max_page_size() + 1))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.data['results']), KeysetPagination().get_max_page_size())
+        # Read on each request
+        with self.settings(PAGINATION_MAX_PAGE_SIZE=2):
+            self.assertEqual(len(self.client.get(self.url + '?page_size=5').data['results']), 2)
+
+    def test_pagination_with_filter(self):
+        pages = self.walk(self.url + '?page_size=1&name=Recipe 1')
+        self.assertEqual([item['id'] for page in pages for item in page['results']], [self.recipes[1].id])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url + '?cursor=invalid')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['detail'], 'Invalid cursor')
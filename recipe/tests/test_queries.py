@@ -0,0 +1,157 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.query_plans import QueryPlanRecorder
+from recipe.models import Recipe
+
+
+@override_settings(API_CACHE_ENABLED=False, RECIPE_FEED_SIZE=0)
+class TestRecipeQueryCount(APITestCase):
+    """
+    Pin the number of queries run by each endpoint, so that the count does not grow with the number of
+    recipes or chefs (e.g. N+1 lookups of `chef.username`). The response cache and the feed (see
+    `test_feed`) are disabled to measure the queries of a cache miss.
+    """
+    # Expected number of queries for each endpoint
+    expected_queries = {
+        'list': 1,
+        'list_filtered': 1,
+        'retrieve': 1,
+        # insert, ingredient index (insert ingredients, select their ids, insert links) and stats of the chef
+        'create': 5,
+        'update': 3,  # select, update and stats of the chef
+        'partial_update': 3,
+        'destroy': 4,  # select, delete ingredient links, delete and stats of the chef
+    }
+
+    def setUp(self):
+        self.url = '/recipes/'
+        self.chefs = [
+            User.objects.create_user(username='testchef%d' % i, password='testpassword') for i in range(3)
+        ]
+        self.chef = self.chefs[0]
+        self.client.force_authenticate(user=self.chef)
+        self.data = {
+            'name': 'Bolinho de bacalhau',
+            'description': 'Description',
+            'ingredients': 'Ingredients',
+            'instructions': 'Instructions',
+            'prep_time': '00:45:00',
+            'cook_time': '00:00:00',
+            'servings': 20,
+        }
+        self.create_recipes(1)
+        cache.clear()
+
+    def create_recipes(self, count: int) -> list:
+        """
+        Create recipes spread among the chefs
+        :param count: Number of recipes to be created
+        :return: List with the created recipes
+        """
+        return [
+            Recipe.objects.create(
+                name='Recipe %d' % i,
+                ingredients='Ingredients',
+                instructions='Instructions',
+                prep_time=timezone.timedelta(minutes=10),
+                cook_time=timezone.timedelta(minutes=20),
+                chef=self.chefs[i % len(self.chefs)],
+            )
+            for i in range(count)
+        ]
+
+    def assertConstantQueries(self, endpoint: str, request) -> None:
+        """
+        Check the endpoint runs the expected number of queries, before and after more recipes are created
+        :param endpoint: Key of the endpoint in `expected_queries`
+        :param request: Callable that receives one of the chef's recipes, performs the request and returns
+        the response
+        """
+        for _ in range(2):
+            recipe = Recipe.objects.filter(chef=self.chef).first()
+            with self.assertNumQueries(self.expected_queries[endpoint]):
+                response = request(recipe)
+            self.assertLess(response.status_code, 300)
+            self.create_recipes(10)
+
+    def test_list_queries(self):
+        self.assertConstantQueries('list', lambda recipe: self.client.get(self.url))
+
+    def test_list_filtered_queries(self):
+        self.assertConstantQueries(
+            'list_filtered', lambda recipe: self.client.get(self.url + '?name=Recipe&chef_username=testchef1')
+        )
+
+    def test_retrieve_queries(self):
+        self.assertConstantQueries('retrieve', lambda recipe: self.client.get(self.url + '%d/' % recipe.id))
+
+    def test_create_queries(self):
+        self.assertConstantQueries('create', lambda recipe: self.client.post(self.url, self.data, format='json'))
+
+    def test_update_queries(self):
+        self.assertConstantQueries(
+            'update', lambda recipe: self.client.put(self.url + '%d/' % recipe.id, self.data, format='json')
+        )
+
+    def test_partial_update_queries(self):
+        self.assertConstantQueries(
+            'partial_update',
+            lambda recipe: self.client.patch(self.url + '%d/' % recipe.id, {'servings': 2}, format='json'),
+        )
+
+    def test_destroy_queries(self):
+        self.assertConstantQueries('destroy', lambda recipe: self.client.delete(self.url + '%d/' % recipe.id))
+
+
+@override_settings(API_CACHE_ENABLED=False)
+class TestRecipeQueryPlans(APITestCase):
+    def setUp(self):
+        self.chefs = [User.objects.create_user(username='testchef%d' % i) for i in range(3)]
+        for i in range(6):
+            Recipe.objects.create(
+                name='Recipe %d' % i,
+                ingredients='1 tomato',
+                instructions='Instructions',
+                prep_time=timezone.timedelta(minutes=10),
+                cook_time=timezone.timedelta(minutes=20),
+                chef=self.chefs[i % len(self.chefs)],
+            )
+
+    def test_indexes(self):
+        with connection.cursor() as cursor:
+            recipe_indexes = connection.introspection.get_constraints(cursor, 'recipe_recipe')
+            user_indexes = connection.introspection.get_constraints(cursor, 'auth_user')
+        self.assertEqual(recipe_indexes['recipe_chef_ordering_idx']['columns'][0], 'chef_id')
+        self.assertIn('auth_user_username_upper_idx', user_indexes)
+
+    def test_chef_username_uses_the_indexes(self):
+        with QueryPlanRecorder() as recorder:
+            response = self.client.get('/recipes/', {'chef_username': 'TESTCHEF1'})
+        self.assertEqual([recipe['name'] for recipe in response.json()['results']], ['Recipe 4', 'Recipe 1'])
+        plans = '\n'.join(line for sql, plan in recorder.plans for line in plan)
+        self.assertIn('auth_user_username_upper_idx', plans)
+        self.assertIn('recipe_chef_ordering_idx', plans)
+        self.assertNotIn('SCAN auth_user', plans)
+
+    def test_audit_command(self):
+        stdout = io.StringIO()
+        call_command('audit_query_plans', '--max-filters', '1', '--analyze', stdout=stdout)
+        self.assertIn('of 16 filter combinations with issues', stdout.getvalue())
+
+        stdout = io.StringIO()
+        call_command('audit_query_plans', '--max-filters', '0', '--verbosity', '2', stdout=stdout)
+        self.assertIn('(no filters)', stdout.getvalue())
+        self.assertIn('recipe_recipe', stdout.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('audit_query_plans', '--value', 'unknown=value', stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('audit_query_plans', '--max-filters', '1', '--fail', stdout=io.StringIO())
@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from core.routers import ReplicaRoutingMiddleware
+from recipe.models import Recipe
+
+
+# The test database has no replica, the reads routed to `replica_1` are counted and served by the primary
+@override_settings(DATABASE_REPLICA_ALIASES=['replica_1'])
+class TestRecipeReplicaReads(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.chef).key)
+        self.recipe = Recipe.objects.create(
+            name='Recipe',
+            ingredients='Ingredients',
+            instructions='Instructions',
+            prep_time=timezone.timedelta(minutes=10),
+            cook_time=timezone.timedelta(minutes=20),
+            chef=self.chef,
+        )
+        # Without the recent writes of the setup
+        cache.clear()
+        patcher = mock.patch.object(ReplicaRoutingMiddleware, 'choose_replica', return_value='default')
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_recipe(self):
+        response = self.client.post(self.url, {
+            'name': 'New recipe',
+            'ingredients': 'Ingredients',
+            'instructions': 'Instructions',
+            'prep_time': '00:10:00',
+            'cook_time': '00:20:00',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_safe_requests_read_from_replicas(self):
+        self.assertEqual(self.client.get('%s%d/' % (self.url, self.recipe.id)).status_code, 200)
+        # Once for all the queries of the request
+        self.choose_replica.assert_called_once_with(['replica_1'])
+
+    def test_writes_use_the_primary(self):
+        self.create_recipe()
+        self.choose_replica.assert_not_called()
+
+    def test_sticky_after_write(self):
+        self.create_recipe()
+        self.assertEqual(len(self.client.get(self.url).json()['results']), 2)
+        self.choose_replica.assert_not_called()
+        # Other clients still read from the replicas, when the response is not cached yet
+        self.assertEqual(APIClient().get(self.url, {'name': 'new'}).status_code, 200)
+        self.assertTrue(self.choose_replica.called)
+
+        # Until the end of the pin
+        cache.clear()
+        self.choose_replica.reset_mock()
+        self.client.get(self.url, {'name': 'recipe'})
+        self.assertTrue(self.choose_replica.called)
+
+    def test_cached_responses(self):
+        client = APIClient()
+        client.get(self.url)
+        with self.assertNumQueries(0):
+            client.get(self.url)
+
+        # After a write, the responses read from the replicas are not cached, they may miss the write
+        self.create_recipe()
+        client.get(self.url)
+        with self.assertNumQueries(1):
+            client.get(self.url)
+        # The chef reads from the primary, the response is cached for every client
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(client.get(self.url).json()['results']), 2)
@@ -0,0 +1,85 @@
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipe.models import Recipe
+
+
+# The recipes are also changed with `bulk_create`, which the response cache cannot see
+@override_settings(API_CACHE_ENABLED=False)
+class TestRecipeSearch(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.garlic_bread = self.create_recipe('Garlic bread', 'Bread\nGarlic\nButter', 'Crunchy bread')
+        self.pasta = self.create_recipe('Pasta', 'Pasta\nGarlic\nOlive oil', 'Quick pasta with garlic')
+        self.cake = self.create_recipe('Bolo de cenoura', 'Cenoura\nAçúcar\nOvos', 'Bolo de cenoura com calda')
+
+    def create_recipe(self, name: str, ingredients: str, description: str) -> Recipe:
+        return Recipe.objects.create(
+            name=name,
+            description=description,
+            ingredients=ingredients,
+            instructions='Instructions',
+            prep_time=timezone.timedelta(minutes=10),
+            cook_time=timezone.timedelta(minutes=20),
+            chef=self.chef,
+        )
+
+    def search(self, query: str, **params) -> list:
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_search_by_relevance(self):
+        # The match on the name ranks higher than the matches on ingredients and description
+        self.assertEqual(self.search('garlic'), [self.garlic_bread.id, self.pasta.id])
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite full-text index')
+    def test_search_match_runs_once(self):
+        with CaptureQueriesContext(connection) as context:
+            self.search('garlic')
+        # The rank is read from the joined index, not from a match per recipe
+        page_sql = context.captured_queries[-1]['sql']
+        self.assertEqual(page_sql.count(' MATCH '), 1)
+        self.assertIn('INNER JOIN "recipe_recipe_fts"', page_sql)
+
+    def test_search_all_terms(self):
+        self.assertEqual(self.search('garlic olive'), [self.pasta.id])
+
+    def test_search_prefix_and_accents(self):
+        self.assertEqual(self.search('acucar'), [self.cake.id])
+        self.assertEqual(self.search('cenou'), [self.cake.id])
+
+    def test_search_without_match(self):
+        self.assertEqual(self.search('chocolate'), [])
+
+    def test_search_with_special_characters(self):
+        self.assertEqual(self.search('"garlic" (bread'), [self.garlic_bread.id])
+        self.assertEqual(len(self.search('*"()')), 3)
+
+    def test_search_index_follows_changes(self):
+        self.cake.name = 'Chocolate cake'
+        self.cake.save()
+        self.assertEqual(self.search('chocolate'), [self.cake.id])
+        self.assertEqual(self.search('cenoura'), [self.cake.id])  # Still in the description
+        self.pasta.delete()
+        self.assertEqual(self.search('garlic'), [self.garlic_bread.id])
+        Recipe.objects.bulk_create([
+            Recipe(name='Garlic soup', ingredients='Garlic', instructions='Boil',
+                   prep_time=timezone.timedelta(minutes=5), cook_time=timezone.timedelta(minutes=5), chef=self.chef),
+        ])
+        self.assertEqual(len(self.search('garlic')), 2)
+
+    def test_search_pagination(self):
+        first = self.client.get(self.url, {'q': 'garlic', 'page_size': 1}).data
+        second = self.client.get(first['next']).data
+        self.assertEqual(
+            [item['id'] for item in first['results'] + second['results']], [self.garlic_bread.id, self.pasta.id]
+        )
+        self.assertIsNone(second['next'])
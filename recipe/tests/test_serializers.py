@@ -1,12 +1,16 @@
 from typing import Optional
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
 from django.utils import timezone
+from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 
+from core.serializers import ValuesSerializer
 from recipe.models import Recipe
-from recipe.serializers import RecipeSerializer
+from recipe.serializers import RecipeSerializer, RecipeValuesSerializer
 
 
 class TestRecipeSerializer(TestCase):
@@ -211,3 +215,63 @@ class TestRecipeSerializer(TestCase):
         # Check if validation was triggered correctly
         self.assertIn('Only chefs can register recipes', str(context.exception))
         self.assertFalse(serializer.is_valid(raise_exception=False))
+
+
+class TestRecipeValuesSerializer(TestCase):
+    def setUp(self):
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        durations = [
+            timezone.timedelta(minutes=10), timezone.timedelta(days=2, hours=3), timezone.timedelta(microseconds=1500),
+            timezone.timedelta(minutes=10), timezone.timedelta(0),
+        ]
+        for index, duration in enumerate(durations):
+            Recipe.objects.create(
+                name='Recipe %d' % index,
+                description=None if index % 2 else 'Descrição com acentos e "aspas"',
+                ingredients='1 egg',
+                instructions='Instructions',
+                prep_time=duration,
+                cook_time=timezone.timedelta(minutes=index),
+                servings=index + 1,
+                chef=self.chef,
+            )
+
+    def assertSameOutput(self):
+        queryset = Recipe.objects.order_by('id')
+        expected = RecipeSerializer(queryset.select_related('chef'), many=True).data
+        rows = list(queryset.values(*RecipeValuesSerializer.get_lookups()))
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(RecipeValuesSerializer(rows, many=True).data), renderer.render(expected))
+        self.assertEqual(
+            renderer.render(RecipeValuesSerializer(rows[1]).data),
+            renderer.render(RecipeSerializer(queryset.select_related('chef')[1]).data),
+        )
+
+    def test_same_output(self):
+        self.assertSameOutput()
+
+    def test_same_output_in_another_timezone(self):
+        with timezone.override('America/Sao_Paulo'):
+            self.assertSameOutput()
+
+    @override_settings(REST_FRAMEWORK={'DATETIME_FORMAT': '%d/%m/%Y %H:%M'})
+    def test_same_output_with_datetime_format(self):
+        self.assertSameOutput()
+
+    def test_lookups(self):
+        self.assertEqual(
+            RecipeValuesSerializer.get_lookups()[:4], ['id', 'chef__username', 'total_time', 'created_at'],
+        )
+
+    def test_unsupported_field(self):
+        class MethodSerializer(RecipeSerializer):
+            title = serializers.SerializerMethodField()
+
+            def get_title(self, obj):
+                return obj.name.title()
+
+        class MethodValuesSerializer(ValuesSerializer):
+            serializer_class = MethodSerializer
+
+        with self.assertRaises(ImproperlyConfigured):
+            MethodValuesSerializer.get_lookups()
@@ -0,0 +1,172 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipe.models import ChefStats, Recipe
+from recipe.stats import rebuild_chef_stats
+
+
+class TestChefStats(APITestCase):
+    def setUp(self):
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.other_chef = User.objects.create_user(username='otherchef', password='testpassword')
+        self.client.force_authenticate(user=self.chef)
+
+    def create_recipe(self, chef: User, minutes: int = 10, servings: int = 2) -> Recipe:
+        return Recipe.objects.create(
+            name='Recipe',
+            ingredients='1 tomato',
+            instructions='Instructions',
+            prep_time=timezone.timedelta(minutes=minutes),
+            cook_time=timezone.timedelta(minutes=minutes * 2),
+            servings=servings,
+            chef=chef,
+        )
+
+    def assertStatsMatchRecipes(self) -> None:
+        """Check the stored stats equal the aggregate of the recipes"""
+        expected = {
+            row.pop('chef_id'): row
+            for row in Recipe.objects.order_by().values('chef_id').annotate(
+                recipe_count=Count('id'),
+                total_prep_time=Sum('prep_time'),
+                total_cook_time=Sum('cook_time'),
+                total_servings=Sum('servings'),
+            )
+        }
+        stats = {
+            row.pop('chef_id'): row
+            for row in ChefStats.objects.values(
+                'chef_id', 'recipe_count', 'total_prep_time', 'total_cook_time', 'total_servings',
+            )
+        }
+        for chef_id, row in stats.items():
+            self.assertEqual(row, expected.get(chef_id, {
+                'recipe_count': 0,
+                'total_prep_time': timezone.timedelta(),
+                'total_cook_time': timezone.timedelta(),
+                'total_servings': 0,
+            }))
+        self.assertEqual(set(expected) - set(stats), set())
+
+    def test_maintained_by_writes(self):
+        recipes = [self.create_recipe(self.chef, minutes=i + 1, servings=i + 1) for i in range(3)]
+        self.create_recipe(self.other_chef)
+        self.assertEqual(ChefStats.objects.get(chef=self.chef).recipe_count, 3)
+        self.assertStatsMatchRecipes()
+
+        recipes[0].prep_time = timezone.timedelta(minutes=30)
+        recipes[0].servings = 10
+        recipes[0].save()
+        self.assertStatsMatchRecipes()
+        # Saved twice, applied once
+        recipes[0].save()
+        self.assertStatsMatchRecipes()
+
+        recipe = Recipe.objects.get(id=recipes[1].id)
+        recipe.chef = self.other_chef
+        recipe.save()
+        self.assertEqual(ChefStats.objects.get(chef=self.other_chef).recipe_count, 2)
+        self.assertStatsMatchRecipes()
+
+        recipes[2].delete()
+        recipes[0].delete()
+        self.assertEqual(ChefStats.objects.get(chef=self.chef).recipe_count, 0)
+        self.assertStatsMatchRecipes()
+
+    def test_deferred_and_unloaded_recipes(self):
+        recipe = self.create_recipe(self.chef)
+        # The stored values of deferred or not loaded fields are unknown, the stats of the chef are recomputed
+        loaded = Recipe.objects.only('id', 'name', 'chef_id').get(id=recipe.id)
+        loaded.servings = 7
+        loaded.save()
+        self.assertStatsMatchRecipes()
+        Recipe(
+            id=recipe.id, name='Recipe', ingredients='1 tomato', instructions='Instructions',
+            prep_time=timezone.timedelta(minutes=1), cook_time=timezone.timedelta(), chef=self.chef,
+            created_at=recipe.created_at,
+        ).save()
+        self.assertStatsMatchRecipes()
+        Recipe.objects.only('id', 'chef_id').get(id=recipe.id).delete()
+        self.assertStatsMatchRecipes()
+
+    def test_bulk_endpoint(self):
+        data = [{
+            'name': 'Recipe %d' % i, 'ingredients': 'Ingredients', 'instructions': 'Instructions',
+            'prep_time': '00:10:00', 'cook_time': '00:20:00', 'servings': i + 1,
+        } for i in range(3)]
+        response = self.client.post('/recipes/bulk/', data, format='json')
+        ids = [item['id'] for item in response.json()]
+        self.assertStatsMatchRecipes()
+        self.client.patch('/recipes/bulk/', [{'id': ids[0], 'servings': 12}], format='json')
+        self.assertStatsMatchRecipes()
+        self.client.delete('/recipes/bulk/', ids[1:], format='json')
+        self.assertEqual(ChefStats.objects.get(chef=self.chef).total_servings, 12)
+        self.assertStatsMatchRecipes()
+
+    def test_chef_deleted(self):
+        self.create_recipe(self.chef)
+        self.create_recipe(self.chef)
+        self.chef.delete()
+        self.assertFalse(ChefStats.objects.exists())
+
+    def test_rebuild_locks_missing_row(self):
+        self.create_recipe(self.chef)
+        ChefStats.objects.all().delete()
+        with CaptureQueriesContext(connection) as context:
+            rebuild_chef_stats([self.chef.id, self.other_chef.id])
+        # The row is inserted before it is locked and the recipes are aggregated
+        statements = [query['sql'].split()[0] for query in context.captured_queries]
+        self.assertEqual(statements[1:5], ['SELECT', 'INSERT', 'UPDATE', 'SELECT'])
+        self.assertStatsMatchRecipes()
+        self.assertFalse(ChefStats.objects.filter(chef=self.other_chef).exists())
+
+    def test_rebuild_command(self):
+        self.create_recipe(self.chef)
+        self.create_recipe(self.other_chef)
+        # Writes that do not send signals
+        Recipe.objects.filter(chef=self.chef).update(servings=9)
+        Recipe.objects.bulk_create([Recipe(
+            name='Recipe', ingredients='1 egg', instructions='Instructions', prep_time=timezone.timedelta(minutes=1),
+            cook_time=timezone.timedelta(), chef=self.other_chef,
+        )])
+        ChefStats.objects.filter(chef=self.chef).update(recipe_count=100)
+        stdout = io.StringIO()
+        call_command('rebuild_chef_stats', '--batch-size', '1', stdout=stdout)
+        self.assertIn('Stats recomputed for 2 chefs', stdout.getvalue())
+        self.assertStatsMatchRecipes()
+
+    def test_endpoint(self):
+        for minutes in (10, 20, 45):
+            self.create_recipe(self.chef, minutes=minutes, servings=minutes // 5)
+        self.create_recipe(self.other_chef)
+        User.objects.create_user(username='newchef')
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/chefs/stats/')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([item['chef'] for item in results], ['testchef', 'otherchef'])
+        self.assertEqual(results[0], {
+            'chef': 'testchef',
+            'recipe_count': 3,
+            'average_prep_time': '00:25:00',
+            'average_cook_time': '00:50:00',
+            'average_servings': 5.0,
+            'updated_at': results[0]['updated_at'],
+        })
+
+        response = self.client.get('/chefs/stats/', {'page_size': 1})
+        self.assertEqual([item['chef'] for item in response.json()['results']], ['testchef'])
+        response = self.client.get(response.json()['next'])
+        self.assertEqual([item['chef'] for item in response.json()['results']], ['otherchef'])
+
+        self.assertEqual(self.client.get('/chefs/stats/otherchef/').json()['recipe_count'], 1)
+        self.assertEqual(self.client.get('/chefs/stats/newchef/').status_code, 404)
+        self.assertEqual(self.client.post('/chefs/stats/', {}).status_code, 405)
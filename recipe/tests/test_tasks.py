@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from core.models import Task
+from core.tasks import Worker
+from recipe.models import ChefStats, Recipe
+from recipe.tasks import INDEX_INGREDIENTS, REBUILD_CHEF_STATS
+
+
+@override_settings(TASK_QUEUE_ENABLED=True)
+class TestDeferredSideEffects(APITestCase):
+    def setUp(self):
+        self.url = '/recipes/'
+        cache.clear()
+        self.chef = User.objects.create_user(username='testchef', password='testpassword')
+        self.other_chef = User.objects.create_user(username='otherchef', password='testpassword')
+        self.client.force_authenticate(user=self.chef)
+        self.worker = Worker()
+
+    def recipe_data(self, name='Garlic soup'):
+        return {
+            'name': name,
+            'ingredients': '3 cloves garlic\n1 l water',
+            'instructions': 'Boil',
+            'prep_time': '00:05:00',
+            'cook_time': '00:30:00',
+            'servings': 2,
+        }
+
+    def filter(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.data['results']}
+
+    def get_tasks(self):
+        return sorted(Task.objects.values_list('name', 'key'))
+
+    def test_create(self):
+        response = self.client.post(self.url, self.recipe_data(), format='json')
+        self.assertEqual(response.status_code, 201)
+        recipe_id = response.data['id']
+        # The recipe is readable right away, the index and the stats are updated by the workers
+        self.assertIn(recipe_id, self.filter())
+        self.assertEqual(self.filter(has_ingredient='garlic'), set())
+        self.assertFalse(ChefStats.objects.exists())
+        self.assertEqual(self.get_tasks(), [
+            (INDEX_INGREDIENTS, 'ingredients:%s' % recipe_id), (REBUILD_CHEF_STATS, 'chef-stats:%s' % self.chef.id),
+        ])
+
+        self.assertEqual(self.worker.run_pending(), 2)
+        self.assertEqual(self.filter(has_ingredient='garlic'), {recipe_id})
+        self.assertEqual(ChefStats.objects.get(chef=self.chef).recipe_count, 1)
+
+    def test_repeated_writes_run_once(self):
+        response = self.client.post(self.url + 'bulk/', [self.recipe_data(), self.recipe_data('Onion soup')],
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        ids = [recipe['id'] for recipe in response.data]
+        for index in range(3):
+            self.client.patch('%s%d/' % (self.url, ids[0]), {'ingredients': 'Garlic\nOnion %d' % index}, format='json')
+        self.assertEqual(self.get_tasks(), [
+            (INDEX_INGREDIENTS, 'ingredients:%s' % ids[0]), (INDEX_INGREDIENTS, 'ingredients:%s' % ids[1]),
+            (REBUILD_CHEF_STATS, 'chef-stats:%s' % self.chef.id),
+        ])
+        self.worker.run_pending()
+        self.assertEqual(self.filter(has_ingredient='onion 2'), {ids[0]})
+        self.assertEqual(ChefStats.objects.get(chef=self.chef).recipe_count, 2)
+
+    def test_chef_change_and_delete(self):
+        response = self.client.post(self.url, self.recipe_data(), format='json')
+        self.worker.run_pending()
+        recipe = Recipe.objects.get(id=response.data['id'])
+        recipe.chef = self.other_chef
+        recipe.save()
+        self.worker.run_pending()
+        self.assertEqual(ChefStats.objects.get(chef=self.chef).recipe_count, 0)
+        self.assertEqual(ChefStats.objects.get(chef=self.other_chef).recipe_count, 1)
+
+        # Deleted before the workers index it
+        recipe.ingredients = 'Garlic'
+        recipe.save()
+        recipe.delete()
+        self.worker.run_pending()
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(ChefStats.objects.get(chef=self.other_chef).recipe_count, 0)
@@ -1,11 +1,29 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from core.async_views import async_read_view
 from recipe import views
 
 router = DefaultRouter()
 router.register(r'recipes', views.RecipeViewSet, basename='recipe')
+router.register(r'chefs/stats', views.ChefStatsViewSet, basename='chef-stats')
+
+# Same routes as the router for the list and the detail, with the reads served by the async actions
+async_urlpatterns = [
+    path('recipes/', async_read_view(
+        views.RecipeViewSet, {'get': 'list', 'post': 'create'}, basename='recipe', detail=False,
+    ), name='recipe-list'),
+    path('recipes/<int:pk>/', async_read_view(
+        views.RecipeViewSet,
+        {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'},
+        basename='recipe', detail=True,
+    ), name='recipe-detail'),
+]
 
 urlpatterns = [
     path('', include(router.urls)),
 ]
+
+if settings.RECIPE_ASYNC_READS:
+    urlpatterns = async_urlpatterns + urlpatterns
@@ -1,15 +1,66 @@
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import permissions, viewsets
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
+from rest_framework import permissions, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from core.async_views import AsyncReadMixin, is_asgi_request
+from core.batching import WriteBatcher
+from core.cache import CacheResponseMixin
+from core.conditional import ConditionalGetMixin
+from core.fieldsets import SPARSE_FIELDSET_PARAMETERS, SparseFieldsetMixin
+from core.pagination import KeysetPagination
+
+from .cache import alist_scopes, detail_scopes, get_chef_id, list_scopes
+from .exporters import EXPORT_FORMATS, RecipeExporter
+from .feed import Feed, FeedPagination
 from .filters import RecipeFilter
-from .models import Recipe
-from .serializers import RecipeSerializer
+from .models import ChefStats, Recipe
+from .serializers import ChefStatsSerializer, RecipeSerializer, RecipeValuesSerializer, bulk_create_recipes
+
+
+def flush_created_recipes(recipes):
+    with transaction.atomic():
+        return bulk_create_recipes(recipes)
+
+
+# Batchers of the recipes created by concurrent requests, by size and wait, see `RECIPE_CREATE_BATCHING`
+create_batchers = {}
+
+
+def get_create_batcher():
+    """
+    :return: `WriteBatcher` of the current `RECIPE_CREATE_BATCH_SIZE` and `RECIPE_CREATE_BATCH_WAIT_MS`
+    """
+    options = (settings.RECIPE_CREATE_BATCH_SIZE, settings.RECIPE_CREATE_BATCH_WAIT_MS)
+    batcher = create_batchers.get(options)
+    if batcher is None:
+        batcher = create_batchers.setdefault(
+            options, WriteBatcher(flush_created_recipes, max_size=options[0], max_wait=options[1] / 1000),
+        )
+    return batcher
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS),
+    retrieve=extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS),
+)
+class RecipeViewSet(
+    CacheResponseMixin, ConditionalGetMixin, AsyncReadMixin, SparseFieldsetMixin, viewsets.ModelViewSet,
+):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions for recipes.
+
+    `list` and `retrieve` also have async counterparts, served under ASGI (see `recipe.urls`).
+    `list`, `retrieve` and `export` return only the fields selected with `fields`/`omit` (see
+    `core.fieldsets`), e.g. `?fields=id,name` reads neither the text columns nor the chef.
     """
     model = Recipe
     queryset = Recipe.objects.all()
@@ -17,7 +68,230 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    pagination_class = FeedPagination
+    # The username of the chef is part of the representation of a recipe
+    validator_fields = ['chef__username']
+    # Heavy TextFields that are not loaded for actions that do not serialize the recipe
+    deferred_fields = ['description', 'ingredients', 'instructions']
+    # Read actions serialized from `.values()` rows by `RecipeValuesSerializer`, instead of model instances
+    values_actions = ('list', 'retrieve')
+    sparse_fieldset_actions = ('list', 'retrieve', 'export')
+    # Query parameters of the lists read from the feed (see `recipe.feed`), the other ones filter or order them
+    feed_query_params = {'cursor', 'page_size', 'fields', 'omit', 'format'}
+
+    def get_queryset(self):
+        """
+        Build the queryset according to the current action: the chef is joined for every action that
+        serializes recipes, only the columns used by the serializer are fetched and the heavy text
+        fields are skipped when the recipe is only being deleted.
+        """
+        queryset = super(RecipeViewSet, self).get_queryset()
+        if self.action == 'export':
+            # The exporter selects its own columns
+            return queryset
+        if self.action == 'destroy' or (self.action == 'bulk' and self.request.method == 'DELETE'):
+            return queryset.defer(*self.deferred_fields)
+        return queryset.select_related('chef').only(*self.get_serializer_columns())
+
+    def filter_queryset(self, queryset):
+        queryset = super(RecipeViewSet, self).filter_queryset(queryset)
+        if self.action in self.values_actions:
+            return queryset.values(*self.get_values_lookups(queryset))
+        return queryset
+
+    def get_values_lookups(self, queryset):
+        """
+        Get the columns of the `.values()` rows: the selected fields, plus the columns of the cursor of the
+        pagination for `list` and the ones of the validators for `retrieve`, which are read even when they are
+        not serialized
+        """
+        if self.action == 'list':
+            # The annotations (e.g. `search_rank`) may be part of the ordering
+            extra = [field.lstrip('-') for field in self.paginator.get_ordering(queryset)]
+            extra += queryset.query.annotations
+        else:
+            extra = ['id', 'updated_at', *self.validator_fields]
+        return list(dict.fromkeys([*RecipeValuesSerializer.get_lookups(self.get_sparse_fields()), *extra]))
+
+    def get_feed(self):
+        """
+        :return: `Feed` of the list, for the lists of the newest recipes of every chef or of a chef, else None
+        """
+        params = set(self.request.query_params) - self.feed_query_params
+        if not params:
+            return Feed()
+        if params == {'chef_username'}:
+            chef_id = get_chef_id(self.request.query_params['chef_username'])
+            # No such chef, the list is empty
+            return Feed(chef_id) if chef_id else None
+        return None
+
+    def get_cache_scopes(self, request, *args, **kwargs):
+        if self.action == 'retrieve':
+            return detail_scopes(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return list_scopes(request.query_params)
+
+    async def aget_cache_scopes(self, request, *args, **kwargs):
+        if self.action == 'retrieve':
+            return detail_scopes(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return await alist_scopes(request.query_params)
+
+    def get_serializer_columns(self):
+        """
+        Get the lookups of the columns read by the serializer
+        :return: List with the lookups to be passed to `QuerySet.only`
+        """
+        columns = []
+        fields = self.get_sparse_fields()
+        for name, field in self.get_serializer_class()().fields.items():
+            if field.write_only or (fields is not None and name not in fields):
+                continue
+            if len(field.source_attrs) > 1:
+                # Related field, e.g. `chef.username`
+                columns.append(field.source_attrs[0])
+            columns.append('__'.join(field.source_attrs))
+        return columns
+
+    def perform_create(self, serializer):
+        if not settings.RECIPE_CREATE_BATCHING:
+            return super(RecipeViewSet, self).perform_create(serializer)
+        # Validated by this request, inserted with the recipes of the concurrent ones
+        serializer.instance = get_create_batcher().submit(Recipe(**serializer.validated_data))
 
     def get_serializer(self, *args, **kwargs):
+        if self.action in self.values_actions and args:
+            kwargs.setdefault('context', self.get_serializer_context())
+            return RecipeValuesSerializer(*args, fields=self.get_sparse_fields(), **kwargs)
         kwargs['chef'] = self.request.user
         return super(RecipeViewSet, self).get_serializer(*args, **kwargs)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='output', type=str, enum=list(EXPORT_FORMATS), default='ndjson',
+                description='Format of the exported file',
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
+        ],
+        responses={(200, content_type): OpenApiTypes.BINARY for content_type in EXPORT_FORMATS.values()},
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def export(self, request, *args, **kwargs):
+        """
+        Stream every recipe matching the filters as NDJSON or CSV
+        """
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'output': 'Invalid format, choose one of: %s.' % ', '.join(EXPORT_FORMATS)})
+
+        exporter = RecipeExporter(self.filter_queryset(self.get_queryset()), fields=self.get_sparse_fields())
+        if is_asgi_request(request):
+            content = exporter.astream(export_format)
+        else:
+            content = exporter.stream(export_format)
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = 'attachment; filename="recipes.%s"' % export_format
+        return response
+
+    @extend_schema(
+        methods=['POST', 'PUT', 'PATCH'],
+        request=RecipeSerializer(many=True),
+        responses={201: RecipeSerializer(many=True), 200: RecipeSerializer(many=True)},
+    )
+    @extend_schema(
+        methods=['DELETE'],
+        request=serializers.ListField(child=serializers.IntegerField()),
+        responses={204: None},
+    )
+    @action(detail=False, methods=['post', 'put', 'patch', 'delete'], pagination_class=None)
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create (POST), update (PUT/PATCH, each item with its `id`) or delete (DELETE, list of ids) a batch
+        of recipes in a single transaction. When any item is invalid nothing is written, and the errors
+        are reported with the index of each item.
+        """
+        data = self.get_bulk_data(request)
+        instances = None
+        if request.method != 'POST':
+            instances, errors = self.get_bulk_instances(data)
+            if any(errors):
+                return Response(self.get_bulk_errors(errors), status=status.HTTP_400_BAD_REQUEST)
+
+        if request.method == 'DELETE':
+            with transaction.atomic():
+                self.get_queryset().filter(id__in=[recipe.id for recipe in instances]).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        serializer = self.get_serializer(instances, data=data, many=True, partial=request.method == 'PATCH')
+        if not serializer.is_valid():
+            return Response(self.get_bulk_errors(serializer.errors), status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            serializer.save()
+        status_code = status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK
+        return Response(serializer.data, status=status_code)
+
+    def get_bulk_data(self, request):
+        """
+        Check the body of a bulk request is a list within the maximum batch size
+        :return: List with the items of the request
+        """
+        data = request.data
+        max_batch_size = settings.RECIPE_BULK_MAX_BATCH_SIZE
+        if not isinstance(data, list):
+            message = 'Expected a list of items but got type "%s".' % type(data).__name__
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='not_a_list')
+        if not data:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: ['This list may not be empty.']}, code='empty')
+        if len(data) > max_batch_size:
+            message = 'Ensure this list has no more than %d items.' % max_batch_size
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='max_length')
+        return data
+
+    def get_bulk_instances(self, data):
+        """
+        Get the recipes referenced by the items of a bulk request, in a single query
+        :param data: List with ids or with dicts containing the `id`
+        :return: Tuple with the list of recipes and the list of errors, both in the same order as `data`
+        """
+        ids = [item.get('id') if isinstance(item, dict) else item for item in data]
+        errors = {}
+        seen = set()
+        for index, recipe_id in enumerate(ids):
+            if not isinstance(recipe_id, int) or isinstance(recipe_id, bool):
+                errors[index] = {'id': ['A valid integer is required.']}
+            elif recipe_id in seen:
+                errors[index] = {'id': ['Duplicated id.']}
+            else:
+                seen.add(recipe_id)
+
+        recipes = self.get_queryset().in_bulk(seen)
+        for index, recipe_id in enumerate(ids):
+            if index not in errors and recipe_id not in recipes:
+                errors[index] = {'id': ['Not found.']}
+        if errors:
+            return None, [errors.get(index, {}) for index in range(len(ids))]
+        return [recipes[recipe_id] for recipe_id in ids], []
+
+    @staticmethod
+    def get_bulk_errors(errors):
+        """
+        Keep only the items with errors, identified by their index in the request
+        :param errors: List with the errors of each item
+        """
+        return {'errors': [{'index': index, 'errors': error} for index, error in enumerate(errors) if error]}
+
+
+class ChefStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Recipe statistics of the chefs (number of recipes, average prep/cook time and servings), the chefs with the
+    most recipes first. The stats are stored and kept up to date when the recipes are written (see
+    `recipe.stats`), so reading them does not aggregate the recipes.
+    """
+    queryset = ChefStats.objects.select_related('chef').order_by('-recipe_count', '-id')
+    serializer_class = ChefStatsSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    filter_backends = []
+    pagination_class = KeysetPagination
+    lookup_field = 'chef__username'
+    lookup_url_kwarg = 'username'
+    lookup_value_regex = '[^/]+'
@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_api.settings')
+# The recipe reads are served natively by the event loop, see `RECIPE_ASYNC_READS`
+os.environ.setdefault('RECIPE_ASYNC_READS', '1')
+# The password of the signups is hashed without blocking the event loop, see `CHEF_ASYNC_SIGNUP`
+os.environ.setdefault('CHEF_ASYNC_SIGNUP', '1')
 
 application = get_asgi_application()
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,8 +52,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so the time of the other middlewares is measured
+    'core.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    # Database of the reads of the request, after the session, see `DATABASE_REPLICA_ALIASES`
+    'core.routers.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -81,13 +88,117 @@ WSGI_APPLICATION = 'recipe_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# The profile is chosen with `DATABASE_PROFILE`:
+# - `sqlite` (default): a file next to the project, tuned by `SQLITE_PRAGMAS` when each connection is opened
+# - `postgresql`: configured with the `DATABASE_*` variables, needs `psycopg` installed
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'sqlite')
+
+DATABASE_PROFILES = {
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+    },
+    'postgresql': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DATABASE_NAME', 'recipe_api'),
+        'USER': os.environ.get('DATABASE_USER', 'recipe_api'),
+        'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+        'HOST': os.environ.get('DATABASE_HOST', 'localhost'),
+        'PORT': os.environ.get('DATABASE_PORT', '5432'),
+        # Behind a pooler in transaction mode (PgBouncer), a session can move to another server connection
+        # between two transactions, so the server-side cursors of `.iterator()` must be disabled
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DATABASE_POOLER', '0') == '1',
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DATABASE_CONNECT_TIMEOUT', 5)),
+        },
+    },
+}
+
+if DATABASE_PROFILE not in DATABASE_PROFILES:
+    raise ImproperlyConfigured(
+        'Unknown DATABASE_PROFILE "%s", choose one of: %s.' % (DATABASE_PROFILE, ', '.join(DATABASE_PROFILES))
+    )
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        **DATABASE_PROFILES[DATABASE_PROFILE],
+        # Each thread keeps its connection across requests for this many seconds (0 closes it after each
+        # request), and checks it still works before reusing it in a new request
+        'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replicas of the default database: comma-separated names of the SQLite files (e.g. a copy of the primary
+# to try it locally), or hosts of the PostgreSQL servers, each one available as the alias `replica_<n>`.
+# The reads of the `DATABASE_REPLICA_MODELS` made by safe requests go to the replicas (see `core.routers`),
+# except for the clients that wrote in the last `DATABASE_REPLICA_STICKY_SECONDS`, which must exceed the lag
+# of the replicas. The cached responses may be built from a lagging replica, they are fresh again after
+# `API_CACHE_TIMEOUT` at worst.
+DATABASE_REPLICA_ALIASES = []
+for index, replica in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    DATABASES['replica_%d' % index] = {
+        **DATABASES['default'],
+        'NAME' if DATABASE_PROFILE == 'sqlite' else 'HOST': replica.strip(),
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICA_ALIASES.append('replica_%d' % index)
+DATABASE_REPLICA_MODELS = ['recipe.Recipe', 'auth.User']
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get('DATABASE_REPLICA_STICKY_SECONDS', 5))
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Pragmas run on each new SQLite connection (see `core.db.configure_sqlite`). WAL lets the readers go on
+# while a transaction writes, and with `synchronous=NORMAL` a commit does not wait for the disk, a power loss
+# can only lose the last commits. `mmap_size` is in bytes, a negative `cache_size` is in KiB.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024)),
+    'temp_store': 'memory',
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# The versions of the cached responses, the replica pins of the clients that wrote and the feed rings are kept
+# in the cache, and must be seen by every process: the local-memory cache is only fine with a single process.
+# With several web processes (`WEB_CONCURRENCY`, as read by gunicorn) or task workers, use a shared backend,
+# e.g. `django.core.cache.backends.redis.RedisCache`, or `python manage.py check` warns about it.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recipe-api',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Hasher of the new passwords, see `core.hashers`. Django's other hashers still check the existing hashes.
+PASSWORD_HASHERS = [
+    'core.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Cost of the password hashes: number of PBKDF2 iterations of each profile, None for Django's default.
+# `test` is only meant for tests and local data, it makes the hashes cheap to brute force.
+PASSWORD_HASHER_PROFILES = {
+    'default': None,
+    # Minimum recommended by OWASP for PBKDF2-HMAC-SHA256
+    'owasp': 600000,
+    'test': 1000,
+}
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'default')
+
+# Pool of threads hashing the passwords of the signups, see `core.hashing`: number of hashes computed at the
+# same time, and number of hashes waiting for a thread before the signups are rejected with a 503
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 2))
+PASSWORD_HASHING_MAX_PENDING = int(os.environ.get('PASSWORD_HASHING_MAX_PENDING', 32))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -134,13 +245,96 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # Token authentication with an in-process cache of the token lookup
+        'core.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    # JSON renderer/parser using orjson when installed (stdlib otherwise) with the same output as DRF's,
+    # the renderer accounts its time in the request metrics, see `core.instrumentation`
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # Keyset pagination, so deep pages cost the same as the first one
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Cache of the serialized responses of the read-only endpoints, see `core.cache.CacheResponseMixin`.
+# The cache of `API_CACHE_ALIAS` must be shared by the processes, see `CACHES`.
+API_CACHE_ENABLED = True
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 300
+
+# In-process cache of the token -> user lookup of `core.authentication.CachedTokenAuthentication`,
+# bounded by number of tokens and time to live (seconds)
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TTL = 300
+
+# Serve the recipe list and detail reads with the async ORM (see `core.async_views`), enabled by
+# `recipe_api.asgi`: under WSGI every async view would run in its own event loop
+RECIPE_ASYNC_READS = os.environ.get('RECIPE_ASYNC_READS', '0') == '1'
+
+# Serve the signups with `ChefCreateView.acreate` (see `core.async_views`), enabled by `recipe_api.asgi`
+CHEF_ASYNC_SIGNUP = os.environ.get('CHEF_ASYNC_SIGNUP', '0') == '1'
+
+# Request metrics of `core.instrumentation.RequestMetricsMiddleware`: `Server-Timing` header, number of
+# requests of each endpoint aggregated in the stats, and requests logged with their SQL (the first
+# `REQUEST_SLOW_MAX_QUERIES` statements) when slower than the threshold (milliseconds, None to disable). The
+# `Server-Timing` header shows the number and time of the queries to any client, it is off by default.
+REQUEST_SERVER_TIMING = os.environ.get('REQUEST_SERVER_TIMING', '0') == '1'
+REQUEST_STATS_WINDOW = 1000
+REQUEST_SLOW_THRESHOLD_MS = 500
+REQUEST_SLOW_MAX_QUERIES = 100
+
+# Upper bound for the `page_size` query parameter accepted by the paginated endpoints
+PAGINATION_MAX_PAGE_SIZE = 100
+
+# Write-behind batching of `POST /recipes/` (see `core.batching.WriteBatcher`): the recipes created by
+# concurrent requests are inserted with one `bulk_create` and one commit, in batches of up to
+# `RECIPE_CREATE_BATCH_SIZE` recipes, each request waiting up to `RECIPE_CREATE_BATCH_WAIT_MS` for others.
+# It trades latency for throughput under bursts of creates, and only batches requests served by threads of the
+# same process (e.g. gunicorn gthread workers). The batch is committed by one of its requests, do not enable it
+# with ATOMIC_REQUESTS.
+RECIPE_CREATE_BATCHING = os.environ.get('RECIPE_CREATE_BATCHING', '0') == '1'
+RECIPE_CREATE_BATCH_SIZE = int(os.environ.get('RECIPE_CREATE_BATCH_SIZE', 100))
+RECIPE_CREATE_BATCH_WAIT_MS = float(os.environ.get('RECIPE_CREATE_BATCH_WAIT_MS', 5))
+
+# Number of newest recipes kept in the rings of the feed, for all the recipes and for each chef (see
+# `recipe.feed`), 0 disables the feed. The rings expire after `RECIPE_FEED_TIMEOUT` seconds, bounding the
+# drift of a ring that missed a change, e.g. a deletion rolled back. The feed is disabled with a local-memory
+# cache and several web processes, the ring of a process would miss the writes of the others (see `CACHES`).
+RECIPE_FEED_SIZE = int(os.environ.get('RECIPE_FEED_SIZE', 1000))
+RECIPE_FEED_TIMEOUT = 3600
+
+# Task queue of `core.tasks`, stored in the database and run by `python manage.py run_tasks`. When enabled, the
+# ingredient index and the chef stats of the written recipes are updated by the workers, after the response:
+# the writes no longer depend on the size of the recipes, but the ingredient filters and the stats lag behind.
+# A task claimed by a worker is run again by another one when not done after `TASK_LEASE_SECONDS`. The workers
+# invalidate the cached responses, it needs a cache shared with the web processes (see `CACHES`).
+TASK_QUEUE_ENABLED = os.environ.get('TASK_QUEUE_ENABLED', '0') == '1'
+TASK_LEASE_SECONDS = int(os.environ.get('TASK_LEASE_SECONDS', 300))
+TASK_POLL_INTERVAL = float(os.environ.get('TASK_POLL_INTERVAL', 1))
+
+# Number of rows fetched from the database at a time when exporting recipes
+RECIPE_EXPORT_CHUNK_SIZE = 2000
+
+# Maximum number of recipes accepted by a single request to the bulk endpoint
+RECIPE_BULK_MAX_BATCH_SIZE = 1000
+
+# Serve the OpenAPI schema of `/api/schema/` computed once per process (see `core.schema`), from
+# `API_SCHEMA_FILE` when set (e.g. `schema.yml`, checked by `python manage.py check_schema`), else generated at
+# the first request
+API_SCHEMA_PRECOMPUTED = os.environ.get('API_SCHEMA_PRECOMPUTED', '1') == '1'
+API_SCHEMA_FILE = os.environ.get('API_SCHEMA_FILE') or None
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Recipes API',
     'DESCRIPTION': 'A simple API to manage recipes',
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+
+from core.schema import PrecomputedSchemaView
 
 
 urlpatterns = [
@@ -9,7 +11,7 @@ urlpatterns = [
     # User management
     path('api-auth/', include('rest_framework.urls')),
     # DRF auth token
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/schema/', PrecomputedSchemaView.as_view(), name='schema'),
     # Optional UI:
     path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),